@@ -1,4 +1,5 @@
 from google.adk.agents import Agent
+from modules.llm_cache import cached_model_call, store_model_response
 from modules.llm_bridge import GroqFallbackClient, GeminiFallbackClient
 from agents.tools import google_search_tool, save_deep_desc_tool
 
@@ -10,7 +11,7 @@ synthesis_model = GroqFallbackClient()  # Good instruction following for writing
 
 context_searcher_agent = Agent(
     name="ContextSearcherAgent",
-    model=research_model.model,
+    model=research_model.llm,
     description="Researcher. Finds external information.",
     instruction="""
     ROLE: Context Researcher
@@ -24,14 +25,16 @@ context_searcher_agent = Agent(
     3. Call `Google Search_tool(query)`.
     4. Return the raw search results.
     """,
-    tools=[google_search_tool]
+    tools=[google_search_tool],
+    before_model_callback=cached_model_call,
+    after_model_callback=store_model_response
 )
 
 # --- RAG STEP 2: EXTRACTION (The Guardrail) ---
 
 fact_extractor_agent = Agent(
     name="FactExtractorAgent",
-    model=research_model.model,
+    model=research_model.llm,
     description="Fact Checker. Extracts verifiable quotes from noise.",
     instruction="""
     ROLE: Fact Extractor
@@ -53,14 +56,16 @@ fact_extractor_agent = Agent(
     - Fact: [Quote] (Source: [Domain])
     """,
     # No external tools, just processing text
-    tools=[]
+    tools=[],
+    before_model_callback=cached_model_call,
+    after_model_callback=store_model_response
 )
 
 # --- RAG STEP 3: SYNTHESIS (Grounding) ---
 
 synthesizer_agent = Agent(
     name="SynthesizerAgent",
-    model=synthesis_model.model,
+    model=synthesis_model.llm,
     description="Writer. Combines visual facts and history into a cited abstract.",
     instruction="""
     ROLE: Synthesizer
@@ -83,5 +88,7 @@ synthesizer_agent = Agent(
     
     ACTION: Call `save_deep_desc_tool(artifact_id, text)`.
     """,
-    tools=[save_deep_desc_tool]
+    tools=[save_deep_desc_tool],
+    before_model_callback=cached_model_call,
+    after_model_callback=store_model_response
 )
\ No newline at end of file
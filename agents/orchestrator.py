@@ -1,11 +1,12 @@
 from google.adk.agents import Agent
 from modules.llm_bridge import GroqFallbackClient
-from modules.db import get_connection
+from modules import db_async as adb
+from modules.llm_output import CoordinatorDecision
 
 # Initialize Model
 orch_model = GroqFallbackClient()
 
-def get_queue_metrics(check_updates: bool = True):
+async def get_queue_metrics(check_updates: bool = True):
     """
     Returns the count of artifacts in each stage of the pipeline
     and the next high-priority artifact ID for each stage.
@@ -13,37 +14,19 @@ def get_queue_metrics(check_updates: bool = True):
     Args:
         check_updates: Ignored dummy argument to ensure tool call robustness.
     """
-    conn = get_connection()
-    metrics = {}
-    next_tasks = {}
-    
-    try:
-        with conn.cursor() as cur:
-            # Get Counts
-            cur.execute("SELECT status, COUNT(*) FROM artifact_queue GROUP BY status")
-            rows = dict(cur.fetchall())
-            metrics = {
-                "PENDING": rows.get("PENDING", 0),       # Needs Extraction
-                "EXTRACTED": rows.get("EXTRACTED", 0),   # Needs Vision/Research
-                "RESEARCHED": rows.get("RESEARCHED", 0), # Needs Review
-                "APPROVED": rows.get("APPROVED", 0),     # Needs Upload
-                "ARCHIVED": rows.get("ARCHIVED", 0)
-            }
-            
-            # Get Next Priorities
-            for status in ["APPROVED", "RESEARCHED", "EXTRACTED", "PENDING"]:
-                cur.execute("SELECT id, url, museum_name FROM artifact_queue WHERE status = %s ORDER BY created_at ASC LIMIT 1", (status,))
-                item = cur.fetchone()
-                if item:
-                    next_tasks[status] = item
-                    
-            return {"metrics": metrics, "next_task": next_tasks}
-    finally:
-        conn.close()
+    rows, next_tasks = await adb.get_queue_snapshot()
+    metrics = {
+        "PENDING": rows.get("PENDING", 0),       # Needs Extraction
+        "EXTRACTED": rows.get("EXTRACTED", 0),   # Needs Vision/Research
+        "RESEARCHED": rows.get("RESEARCHED", 0), # Needs Review
+        "APPROVED": rows.get("APPROVED", 0),     # Needs Upload
+        "ARCHIVED": rows.get("ARCHIVED", 0)
+    }
+    return {"metrics": metrics, "next_task": next_tasks}
 
 coordinator_agent = Agent(
     name="CoordinatorAgent",
-    model=orch_model.model,
+    model=orch_model.llm,
     description="The Chief Curator. Manages the global state and assigns tasks to specialized squads.",
     instruction="""
     You are the Chief Curator (Coordinator).
@@ -52,7 +35,7 @@ coordinator_agent = Agent(
     Maintain a smooth flow of artifacts from 'Discovery' to 'Archival'.
     
     PROTOCOL:
-    1. Call `get_queue_metrics(check_updates=True)` to assess metrics.
+    1. Read the queue metrics given in the request.
     2. PRIORITIZE tasks strictly in this order (Downstream > Upstream):
        - PRIORITY 1 [ARCHIVAL]: If 'APPROVED' > 0, assign 'ARCHIVE_JOB' for that ID.
        - PRIORITY 2 [REVIEW]: If 'RESEARCHED' > 0, assign 'REVIEW_JOB' for that ID.
@@ -65,9 +48,9 @@ coordinator_agent = Agent(
     {
         "action": "ARCHIVE_JOB" | "REVIEW_JOB" | "ANALYZE_JOB" | "EXTRACT_JOB" | "DISCOVER_JOB" | "SLEEP",
         "target_id": "PRM_12345" or null,
-        "context": { "url": "..." } or null,
         "reasoning": "Brief explanation of why this task was chosen."
     }
     """,
-    tools=[get_queue_metrics]
+    # Schema-constrained reply; metrics are prefetched by the dispatcher (output_schema agents take no tools)
+    output_schema=CoordinatorDecision
 )
\ No newline at end of file
@@ -1,4 +1,5 @@
 from google.adk.agents import Agent
+from modules.llm_cache import cached_model_call, store_model_response
 from modules.llm_bridge import GroqFallbackClient
 from agents.tools import (
     visit_page_tool, click_next_page_tool, extract_links_tool, 
@@ -13,7 +14,7 @@ scout_model = GroqFallbackClient()
 
 navigator_agent = Agent(
     name="NavigatorAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="Browser Operator. Navigates pages.",
     instruction="""
     ROLE: Navigator
@@ -30,7 +31,7 @@ navigator_agent = Agent(
 
 link_extractor_agent = Agent(
     name="LinkExtractorAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="HTML Analyst. Finds artifact links.",
     instruction="""
     ROLE: Link Extractor
@@ -43,7 +44,7 @@ link_extractor_agent = Agent(
 
 deduplicator_agent = Agent(
     name="DeduplicatorAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="Database Gatekeeper. Checks for duplicates.",
     instruction="""
     ROLE: Deduplicator
@@ -57,7 +58,7 @@ deduplicator_agent = Agent(
 
 queue_manager_agent = Agent(
     name="QueueManagerAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="Queue Clerk. Adds items to DB.",
     instruction="""
     ROLE: Queue Manager
@@ -71,7 +72,7 @@ queue_manager_agent = Agent(
 
 html_parser_agent = Agent(
     name="HTMLParserAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="Metadata Scraper. Extracts text and asset URLs.",
     instruction="""
     ROLE: HTML Parser
@@ -82,12 +83,14 @@ html_parser_agent = Agent(
     3. Call `save_draft_tool(artifact_id, metadata_json)`.
     4. CRITICAL: Output the `media_urls` list explicitly for the next agent.
     """,
-    tools=[scrape_metadata_tool, save_draft_tool]
+    tools=[scrape_metadata_tool, save_draft_tool],
+    before_model_callback=cached_model_call,
+    after_model_callback=store_model_response
 )
 
 downloader_agent = Agent(
     name="DownloaderAgent",
-    model=scout_model.model,
+    model=scout_model.llm,
     description="Asset Manager. Downloads binary files.",
     instruction="""
     ROLE: Asset Manager
@@ -1,23 +1,33 @@
 import os
-import time
 import json
 import shutil
 import requests
 import hashlib
 import asyncio
 import re
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from contextlib import aclosing
 from huggingface_hub import HfApi, create_repo
 from duckduckgo_search import DDGS
 from google.genai import types
 
-from modules.db import (
-    get_connection, log_thought, register_artifact, 
-    save_metadata_draft, log_media_asset
-)
+from modules import db_async as adb
+from modules import metrics
 from modules.browser import browser_instance
+from modules.http_fetcher import http_fetcher, looks_complete
+from modules.sites import get_site_profile
+from modules.html_parse import parse_page
+from modules.structured_data import (
+    extract_structured, find_iiif_manifest, is_sufficient, fill_missing, record_structured
+)
+from modules.templates import extract_with_template, learn_template
+from modules.content import compact_text, record_prompt, EXTRACT_PROMPT_MAX_CHARS
+from modules.rate_limit import rate_limiter
 from modules.llm_bridge import GeminiFallbackClient
+from modules.llm_cache import llm_cache, cache_key
+from modules.batching import MicroBatcher
+from modules.llm_output import (
+    ArtifactRecord, PageRecord, RECORD_FIELDS, JsonStream, json_config, schema_fingerprint, extract_json, parse_model
+)
 
 # Configuration
 TEMP_DOWNLOAD_DIR = "data/temp_downloads"
@@ -26,44 +36,79 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 HF_TOKEN = os.getenv("HF_TOKEN")
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID") 
 
-# Rate Limiting State
-LAST_ACCESS = {}
-DOMAIN_DELAY = 5.0 # Seconds between requests to the same domain
-
 # Initialize Intelligence for Scraping
 extraction_model = GeminiFallbackClient()
 
+# Batch Extraction: short pages from concurrent extract jobs share one LLM request
+EXTRACT_BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "4"))                      # 1 disables batching
+EXTRACT_BATCH_WAIT = float(os.getenv("EXTRACT_BATCH_WAIT", "1.5"))                   # Max seconds to wait for in-flight pages
+EXTRACT_BATCH_MAX_PAGE_CHARS = int(os.getenv("EXTRACT_BATCH_MAX_PAGE_CHARS", "4000"))  # Longer pages go alone
+EXTRACT_BATCH_MAX_CHARS = int(os.getenv("EXTRACT_BATCH_MAX_CHARS", "16000"))
+
 # --- CLUSTER A: DISCOVERY & NAVIGATION ---
 
+async def _load_html(url, use_cache=True):
+    """
+    HTTP-first page load. Serves a fresh copy from the on-disk page cache when
+    there is one (retries, re-extractions), otherwise uses plain HTTP when the
+    static HTML already carries the content; escalates to the browser for
+    JS-rendered pages (or museums flagged `js_rendered` in their site profile).
+    Returns (html, page) where page is None if the browser was not needed.
+    """
+    js_rendered = get_site_profile(url).get("js_rendered")
+    if use_cache:
+        cached = await http_fetcher.cached_html(url)
+        if cached:
+            html, meta = cached
+            if meta.get("rendered") or (not js_rendered and looks_complete(html)):
+                http_fetcher.record(url, "cached")
+                metrics.add(cache_hits=1)
+                return html, None
+
+    if not js_rendered:
+        html = await http_fetcher.fetch_html(url)
+        if looks_complete(html):
+            http_fetcher.record(url, "http")
+            return html, None
+        http_fetcher.record(url, "escalated")
+
+    page = browser_instance.current_page()
+    if not page or page.url != url:
+        status = await visit_page_tool(url)
+        if status.startswith("ERROR"):
+            raise RuntimeError(status)
+        page = browser_instance.current_page()
+    http_fetcher.record(url, "browser")
+    html = await page.content()
+    metrics.add(bytes=len(html))
+    await http_fetcher.store_rendered(url, html)
+    return html, page
+
+@metrics.traced()
 async def visit_page_tool(url: str) -> str:
     """Navigates the browser to a URL with strict Politeness Rate Limiting."""
     try:
-        # Politeness Check
-        domain = urlparse(url).netloc
-        if domain in LAST_ACCESS:
-            elapsed = time.time() - LAST_ACCESS[domain]
-            if elapsed < DOMAIN_DELAY:
-                wait_time = DOMAIN_DELAY - elapsed
-                print(f"[Politeness] ⏳ Waiting {wait_time:.2f}s for {domain}...")
-                await asyncio.sleep(wait_time)
-        
-        # Update Lock
-        LAST_ACCESS[domain] = time.time()
+        await rate_limiter.acquire(url)
 
-        if not browser_instance.page: await browser_instance.launch()
+        page = await browser_instance.active_page()
+        browser_instance.prepare_navigation(page, url)
         # Increased timeout for museum archives which are often slow
-        await browser_instance.page.goto(url, timeout=90000, wait_until="domcontentloaded")
-        await asyncio.sleep(3)
+        response = await page.goto(url, timeout=90000, wait_until="domcontentloaded")
+        if response:
+            rate_limiter.feedback(url, response.status, response.headers.get("retry-after"))
+        browser_instance.note_navigation(page)
+        await browser_instance.wait_until_ready(page, url)
         return f"SUCCESS: Visited {url}"
     except Exception as e: return f"ERROR: {e}"
 
+@metrics.traced()
 async def click_next_page_tool() -> str:
     """
     Robustly finds and clicks the 'Next' pagination button.
     Supports standard patterns: 'Next', '>', '›', or 'rel=next'.
     """
-    if not browser_instance.page: return "ERROR: Browser inactive."
-    page = browser_instance.page
+    page = browser_instance.current_page()
+    if not page: return "ERROR: Browser inactive."
     try:
         # Common Pagination Selectors
         selectors = [
@@ -78,22 +123,27 @@ async def click_next_page_tool() -> str:
         
         for sel in selectors:
             if await page.locator(sel).first.is_visible():
+                await rate_limiter.acquire(page.url)
                 await page.locator(sel).first.click()
                 await page.wait_for_load_state("domcontentloaded")
-                await asyncio.sleep(3) # Politeness wait
+                browser_instance.note_navigation(page)
+                await browser_instance.wait_until_ready(page)
                 return f"SUCCESS: Navigated to {page.url}"
                 
         return "END_OF_ARCHIVE: No next button found."
     except Exception as e:
         return f"ERROR: Navigation failed - {e}"
 
+@metrics.traced()
 async def extract_links_tool(base_url: str, selector: str = "a") -> str:
     """Finds artifact links, strictly filtering out nav/noise."""
-    if not browser_instance.page: return "ERROR: Browser inactive."
     try:
-        html = await browser_instance.page.content()
-        soup = BeautifulSoup(html, "html.parser")
-        links = [urljoin(base_url, a['href']) for a in soup.select(selector) if a.get('href')]
+        page = browser_instance.current_page()
+        if page and page.url == base_url:
+            html = await page.content()  # Already rendered by the navigator
+        else:
+            html, _ = await _load_html(base_url, use_cache=False)  # Listings change; only revalidate
+        links = parse_page(base_url, html).links(selector)
         
         # Strict Noise Filter
         valid_links = []
@@ -106,59 +156,195 @@ async def extract_links_tool(base_url: str, selector: str = "a") -> str:
         return json.dumps(valid_links[:20]) # Limit batch size
     except Exception as e: return f"ERROR: {e}"
 
+@metrics.traced()
 async def check_db_tool(url: str) -> str:
     """Checks if URL is already queued."""
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT status FROM artifact_queue WHERE url = %s", (url,))
-            return f"EXISTS: {cur.fetchone()['status']}" if cur.fetchone() else "NEW"
-    finally:
-        conn.close()
+    status = await adb.get_artifact_status_by_url(url)
+    return f"EXISTS: {status}" if status else "NEW"
 
+@metrics.traced()
 async def add_to_queue_tool(url: str, museum_name: str) -> str:
     """Adds URL to the queue."""
     # Create deterministic ID
     obj_id = f"{museum_name}_{hashlib.md5(url.encode()).hexdigest()[:8]}"
-    register_artifact(obj_id, url, museum_name)
+    await adb.register_artifact(obj_id, url, museum_name)
     return f"QUEUED: {obj_id}"
 
 # --- CLUSTER B: COGNITIVE EXTRACTION (LLM + VISION) ---
 
-async def _call_llm_extractor(contents):
-    """Helper to send content (Text or Image) to Gemini."""
+def _extractor_key(contents, schema=None):
+    extra = {"schema": schema_fingerprint(schema)} if schema is not None else None
+    return cache_key(extraction_model.model, contents, extra)
+
+async def _call_llm_extractor(contents, use_cache=True, schema=None, stop_when=None):
+    """
+    Helper to send content (Text or Image) to Gemini.
+    With a `schema`, the model is asked for JSON constrained to it and the stream is
+    read incrementally: it stops once the document closes or `stop_when(stream)`
+    holds, and the decoded value is returned as JSON text.
+    Identical prompts (and image bytes) are answered from the LLM response cache
+    unless use_cache=False.
+    """
+    key = None
+    if use_cache and llm_cache.enabled:
+        key = _extractor_key(contents, schema)
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            return cached
+
     response_text = ""
+    complete = True
+    stream = JsonStream() if schema is not None else None
     try:
-        async for chunk in extraction_model.generate_content_async(contents=contents):
-            if hasattr(chunk, 'text'):
-                response_text += chunk.text
-            elif hasattr(chunk, 'candidates'):
-                response_text += chunk.candidates[0].content.parts[0].text
+        # aclosing: stopping early hands the provider slot back straight away
+        async with aclosing(extraction_model.generate_content_async(
+            contents=contents, config=json_config(schema) if schema is not None else None
+        )) as chunks:
+            async for chunk in chunks:
+                piece = ""
+                if hasattr(chunk, 'text'):
+                    piece = chunk.text or ""
+                elif hasattr(chunk, 'candidates'):
+                    piece = chunk.candidates[0].content.parts[0].text
+                response_text += piece
+                if stream is not None:
+                    stream.feed(piece)
+                    if stream.done or (stop_when and stop_when(stream)):
+                        break
     except Exception as e:
+        complete = False
         print(f"[Tools] LLM Extraction Partial Error: {e}")
-        
+
+    if stream is not None and stream.kind is not None and not stream.done:
+        # Stopped early (or cut off): keep only the members that fully arrived
+        response_text = json.dumps(stream.value())
+        complete = complete and stop_when is not None and stop_when(stream)
+    
+    # Partial streams are never cached
+    if key and complete and response_text.strip():
+        await llm_cache.put(key, response_text, model=extraction_model.model)
     return response_text
 
+def _valid_title(data):
+    title = data.get("title") if isinstance(data, dict) else None
+    return isinstance(title, str) and title != "Unknown" and len(title) > 3
+
+async def _run_extraction_batch(items):
+    """One request for several pages; returns a result per item, None where it must be retried alone."""
+    pages = {f"P{i}": item for i, item in enumerate(items, 1)}
+    blocks = "\n\n".join(
+        f"=== PAGE {page_id} ===\nURL: {item['url']}\nIMAGE CANDIDATES: {json.dumps(item['images'][:10])}\nPAGE TEXT:\n{item['text']}"
+        for page_id, item in pages.items()
+    )
+    prompt_text = f"""
+        You are a Museum Archivist. Extract the Dublin Core metadata for EACH of the {len(pages)} museum object pages below.
+        
+        {blocks}
+        
+        INSTRUCTIONS:
+        1. For every page, extract: 'title', 'accession_number', 'creator', 'subject' (category), 'spatial' (location), 'temporal' (date), 'desc' (description).
+        2. For every page, select 'media_urls' from ITS OWN image candidates (high-resolution object images; ignore icons/logos).
+        3. Never mix information between pages.
+        4. Return ONLY a JSON array with one object per page, each including its 'page_id' (e.g. "P1"). No markdown formatting.
+        """
+    reply = await _call_llm_extractor(
+        [types.Part(text=prompt_text)], use_cache=False, schema=list[PageRecord],
+        stop_when=lambda stream: len(stream.items) >= len(pages)
+    )
+    records = extract_json(reply)
+    if isinstance(records, dict):
+        records = records.get("pages") or records.get("results") or []
+    by_id = {}
+    for raw in records if isinstance(records, list) else []:
+        try:
+            record = PageRecord.model_validate(raw)
+        except ValueError:
+            continue  # That page is retried alone
+        by_id[record.page_id] = record
+
+    results = []
+    for page_id in pages:
+        record = by_id.get(page_id)
+        data = record.model_dump(exclude_none=True, exclude={"page_id"}) if record is not None else None
+        results.append(data if _valid_title(data) else None)
+    return results
+
+extraction_batcher = MicroBatcher("extract", _run_extraction_batch, max_items=EXTRACT_BATCH_SIZE,
+                                   max_wait=EXTRACT_BATCH_WAIT, max_chars=EXTRACT_BATCH_MAX_CHARS)
+
+async def _extract_in_batch(url, clean_text, img_candidates, contents):
+    """
+    Batched text extraction for a short page. Returns the JSON reply text, or None
+    when the page should take the single-page path (alone in its window, or its
+    record came back missing/invalid). Results are cached under the single-page key
+    so a retry of this artifact is still free.
+    """
+    key = _extractor_key(contents, ArtifactRecord)
+    cached = await llm_cache.get(key) if llm_cache.enabled else None
+    if cached is not None:
+        return cached
+    record = await extraction_batcher.submit(
+        {"url": url, "text": clean_text, "images": img_candidates}, size=len(clean_text)
+    )
+    if record is None:
+        return None
+    reply = json.dumps(record)
+    if llm_cache.enabled:
+        await llm_cache.put(key, reply, model=extraction_model.model)
+    return reply
+
+@metrics.traced()
 async def scrape_metadata_tool(url: str) -> str:
     """
-    Cognitive Scraper: Uses LLM to parse HTML, with Visual Fallback.
+    Cognitive Scraper: Uses embedded structured data when the page has enough of it,
+    otherwise the LLM to parse HTML, with Visual Fallback.
     """
-    if not browser_instance.page: return "ERROR: Browser inactive."
-    
+    # Lets the batcher know this page may still join a batch
+    with extraction_batcher.expecting():
+        return await _scrape_metadata(url)
+
+async def _scrape_metadata(url):
     try:
-        # 1. Get Cleaned HTML
-        raw_html = await browser_instance.page.content()
-        soup = BeautifulSoup(raw_html, "html.parser")
+        # 1. Get Cleaned HTML (plain HTTP when possible, browser otherwise)
+        raw_html, page = await _load_html(url)
+        parsed = parse_page(url, raw_html)
+        
+        # Fast path: JSON-LD / microdata / Dublin Core & OpenGraph meta, then the IIIF manifest if still short
+        structured, sources = extract_structured(parsed)
+        if not is_sufficient(structured):
+            manifest_url = find_iiif_manifest(parsed)
+            if manifest_url:
+                manifest = await http_fetcher.fetch_json(manifest_url)
+                if manifest:
+                    structured, sources = extract_structured(parsed, manifest)
+        if is_sufficient(structured):
+            record_structured(url, sources, hit=True)
+            print(f"[Scraper] ⚡ Structured data ({', '.join(sources)}) covers {url}. Skipping LLM.")
+            structured["original_url"] = url
+            return json.dumps(structured)
+        record_structured(url, sources, hit=False)
         
-        # Remove noise to save tokens
-        for tag in soup(['script', 'style', 'nav', 'footer', 'iframe', 'svg']):
-            tag.decompose()
+        # Known layout: the museum's learned selectors replace the LLM call
+        try:
+            templated = await extract_with_template(url, parsed, structured)
+        except Exception as e:
+            print(f"[Templates] ⚠️ Template lookup failed for {url}: {e}")
+            templated = None
+        if templated:
+            print(f"[Scraper] 🧩 Template extraction for {url}. Skipping LLM.")
+            fill_missing(templated, structured)
+            templated["original_url"] = url
+            return json.dumps(templated)
         
         # Extract potential images for the LLM to choose from
-        img_tags = soup.find_all('img')
-        img_candidates = [urljoin(url, img['src']) for img in img_tags if img.get('src') and len(img.get('src')) > 10]
+        img_candidates = parsed.images()
         
-        clean_text = soup.get_text(separator='\n', strip=True)[:25000] # Limit context
+        # Catalogue fields + main content only (menus, carousels, banners dropped) to save tokens
+        full_text = parsed.text()
+        clean_text, _ = compact_text(parsed)
+        if not clean_text.strip():
+            clean_text = full_text[:EXTRACT_PROMPT_MAX_CHARS]  # Isolation found nothing; send the page text
+        record_prompt(url, min(len(full_text), 25000), len(clean_text))
         
         # 2. Construct Prompt for Text Extraction
         prompt_text = f"""
@@ -177,28 +363,43 @@ async def scrape_metadata_tool(url: str) -> str:
         """
         
         print(f"[Scraper] Attempting Text Extraction for {url}...")
-        json_response = await _call_llm_extractor([types.Part(text=prompt_text)])
+        contents = [types.Part(text=prompt_text)]
+        json_response = None
+        if extraction_batcher.enabled and len(clean_text) <= EXTRACT_BATCH_MAX_PAGE_CHARS:
+            json_response = await _extract_in_batch(url, clean_text, img_candidates, contents)
+        if json_response is None:
+            json_response = await _call_llm_extractor(
+                contents, schema=ArtifactRecord, stop_when=lambda stream: stream.has(RECORD_FIELDS)
+            )
         
         # 3. Validation & Visual Fallback
         is_valid = False
         data = {}
         
         try:
-            # Clean generic markdown block wrappers if present
-            clean_json = json_response.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_json)
+            data = fill_missing(parse_model(ArtifactRecord, json_response).to_dict(), structured)
             
             # Simple validation: If title is missing or "Unknown", try vision
-            if data.get("title") and data.get("title") != "Unknown" and len(data.get("title")) > 3:
-                is_valid = True
-        except:
-            pass
+            is_valid = _valid_title(data)
+        except ValueError as e:
+            print(f"[Scraper] Text extraction reply unusable for {url}: {e}")
             
-        if not is_valid:
+        if is_valid:
+            # Teach the museum's template where each field lives on the page
+            try:
+                await learn_template(url, parsed, data)
+            except Exception as e:
+                print(f"[Templates] ⚠️ Could not learn from {url}: {e}")
+        else:
             print(f"[Scraper] Text Extraction Weak. Engaging Gemini Vision...")
             
-            # Take Screenshot
-            screenshot_bytes = await browser_instance.page.screenshot(type='jpeg', quality=80)
+            # Take Screenshot (the page may only have been fetched over HTTP so far)
+            if page is None:
+                status = await visit_page_tool(url)
+                if status.startswith("ERROR"):
+                    return status
+                page = browser_instance.current_page()
+            screenshot_bytes = await page.screenshot(type='jpeg', quality=80)
             
             vision_prompt = """
             Read this museum object page. Extract the metadata as JSON.
@@ -210,11 +411,10 @@ async def scrape_metadata_tool(url: str) -> str:
             vision_response = await _call_llm_extractor([
                 types.Part(text=vision_prompt),
                 types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=screenshot_bytes))
-            ])
+            ], schema=ArtifactRecord)
             
             try:
-                clean_json_vis = vision_response.replace("```json", "").replace("```", "").strip()
-                vision_data = json.loads(clean_json_vis)
+                vision_data = parse_model(ArtifactRecord, vision_response).to_dict()
                 # Merge: Prefer Vision for text, but keep Text-extracted images if any
                 vision_data["media_urls"] = data.get("media_urls", [])
                 data = vision_data
@@ -223,6 +423,7 @@ async def scrape_metadata_tool(url: str) -> str:
                 return f"ERROR: Vision Parsing Failed - {e}"
 
         # Ensure required keys exist
+        fill_missing(data, structured)
         data["original_url"] = url
         if "media_urls" not in data: data["media_urls"] = []
         
@@ -231,11 +432,13 @@ async def scrape_metadata_tool(url: str) -> str:
     except Exception as e:
         return f"ERROR: Critical Scraper Fail - {e}"
 
+@metrics.traced()
 async def save_draft_tool(artifact_id: str, metadata_json: str) -> str:
     """Saves parsed metadata to the DB (Dublin Core Mapping)."""
-    conn = get_connection()
     try:
-        data = json.loads(metadata_json)
+        data = extract_json(metadata_json)
+        if not isinstance(data, dict):
+            return "ERROR: metadata_json is not a JSON object."
         
         # MAPPING: Scraper Keys -> DB Columns (Dublin Core)
         # Defaults
@@ -252,57 +455,40 @@ async def save_draft_tool(artifact_id: str, metadata_json: str) -> str:
             "desc": data.get("desc", data.get("description", ""))
         }
 
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO archives (
-                    id, original_url, accession_number, title, 
-                    subject, creator, spatial_coverage, temporal_coverage, 
-                    rights_holder, description_museum
-                ) VALUES (
-                    %(id)s, %(url)s, %(acc_num)s, %(title)s, 
-                    %(subject)s, %(creator)s, %(spatial)s, %(temporal)s, 
-                    %(rights)s, %(desc)s
-                )
-                ON CONFLICT (id) DO UPDATE SET
-                    title = EXCLUDED.title,
-                    description_museum = EXCLUDED.description_museum
-                """,
-                db_record
-            )
-            # We don't change status to ANALYZED yet, wait for images
-        conn.commit()
+        # We don't change status to ANALYZED yet, wait for images
+        await adb.save_archive_draft(db_record)
         return "SUCCESS: Draft Saved."
     except Exception as e: 
         return f"ERROR: {e}"
-    finally:
-        conn.close()
 
+@metrics.traced()
 async def download_image_tool(image_url: str, artifact_id: str) -> str:
     """Downloads the raw image file."""
     try:
         if not image_url: return "ERROR: Empty Image URL"
         
-        r = requests.get(image_url, stream=True, timeout=20, headers={"User-Agent": "Mozilla/5.0"})
-        if r.status_code != 200: return f"ERROR: HTTP {r.status_code}"
-        
-        ext = ".jpg"
-        if "png" in r.headers.get("Content-Type", ""): ext = ".png"
-        
-        # Unique filename for multi-image support
-        file_hash = hashlib.md5(image_url.encode()).hexdigest()[:6]
-        filename = f"{artifact_id}_{file_hash}{ext}"
-        filepath = os.path.join(TEMP_DOWNLOAD_DIR, filename)
-        
-        with open(filepath, "wb") as f:
-            for chunk in r.iter_content(8192): f.write(chunk)
+        async with http_fetcher.stream(image_url, timeout=20, headers={"Accept": "image/*,*/*;q=0.8"}) as r:
+            if r.status_code != 200: return f"ERROR: HTTP {r.status_code}"
+            
+            ext = ".jpg"
+            if "png" in r.headers.get("Content-Type", ""): ext = ".png"
             
-        log_media_asset(artifact_id, image_url, role="Primary")
+            # Unique filename for multi-image support
+            file_hash = hashlib.md5(image_url.encode()).hexdigest()[:6]
+            filename = f"{artifact_id}_{file_hash}{ext}"
+            filepath = os.path.join(TEMP_DOWNLOAD_DIR, filename)
+            
+            with open(filepath, "wb") as f:
+                async for chunk in r.aiter_bytes(8192): f.write(chunk)
+            metrics.add(bytes=r.num_bytes_downloaded)
+            
+        await adb.log_media_asset(artifact_id, image_url, role="Primary")
         return f"SUCCESS: Saved {filename}"
     except Exception as e: return f"ERROR: {e}"
 
 # --- CLUSTER C (Vision) ---
 
+@metrics.traced()
 async def analyze_image_tool(artifact_id: str) -> str:
     """Finds ALL local files for Vision Analysis (Multi-View)."""
     files = [f for f in os.listdir(TEMP_DOWNLOAD_DIR) if f.startswith(artifact_id)]
@@ -311,22 +497,15 @@ async def analyze_image_tool(artifact_id: str) -> str:
     file_paths = [os.path.join(TEMP_DOWNLOAD_DIR, f) for f in files]
     return json.dumps({"action": "analyze", "file_paths": file_paths})
 
+@metrics.traced()
 async def save_visual_analysis_tool(artifact_id: str, analysis: str) -> str:
     """Updates the media_assets table."""
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE media_assets SET visual_analysis_raw = %s WHERE artifact_id = %s",
-                (analysis, artifact_id)
-            )
-        conn.commit()
-        return "SUCCESS: Visual Analysis Saved."
-    finally:
-        conn.close()
+    await adb.save_visual_analysis(artifact_id, analysis)
+    return "SUCCESS: Visual Analysis Saved."
 
 # --- CLUSTER D (History) ---
 
+@metrics.traced()
 async def google_search_tool(query: str) -> str:
     """Real DuckDuckGo Search."""
     try:
@@ -336,32 +515,21 @@ async def google_search_tool(query: str) -> str:
         return "\n".join([f"- {r['body']}" for r in results])[:2000]
     except Exception as e: return f"ERROR: {e}"
 
+@metrics.traced()
 async def save_deep_desc_tool(artifact_id: str, description: str) -> str:
     """Saves the AI synthesis."""
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE archives SET description_ai = %s WHERE id = %s",
-                (description, artifact_id)
-            )
-            cur.execute("UPDATE artifact_queue SET status='RESEARCHED' WHERE id=%s", (artifact_id,))
-        conn.commit()
-        return "SUCCESS: Description Saved."
-    finally:
-        conn.close()
+    await adb.save_deep_description(artifact_id, description)
+    return "SUCCESS: Description Saved."
 
 # --- CLUSTER E (Archival) ---
 
+@metrics.traced()
 async def send_telegram_review_tool(artifact_id: str) -> str:
     """Sends the artifact to Telegram for manual approval."""
     if not TELEGRAM_TOKEN: return "ERROR: No Token."
     
-    conn = get_connection()
     try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT title, description_ai FROM archives WHERE id=%s", (artifact_id,))
-            row = cur.fetchone()
+        row = await adb.get_review_summary(artifact_id)
             
         text = f"🏛️ *REVIEW REQUEST*\n\n*ID:* `{artifact_id}`\n*Title:* {row['title']}\n\n*AI Analysis:*\n{row['description_ai'][:800]}..."
         
@@ -380,14 +548,13 @@ async def send_telegram_review_tool(artifact_id: str) -> str:
             "reply_markup": json.dumps(keyboard)
         }
         
-        requests.post(url, json=payload)
+        await asyncio.to_thread(requests.post, url, json=payload)
         return f"SUCCESS: Sent {artifact_id} to Telegram."
             
     except Exception as e:
         return f"ERROR: {e}"
-    finally:
-        conn.close()
 
+@metrics.traced()
 async def upload_to_hf_tool(artifact_id: str) -> str:
     """Uploads the specific artifact files to Hugging Face."""
     if not HF_TOKEN: return "ERROR: No HF Token."
@@ -397,13 +564,15 @@ async def upload_to_hf_tool(artifact_id: str) -> str:
     
     api = HfApi(token=HF_TOKEN)
     repo_id = "nwokikeonyeka/igbo-museum-archive" 
-    create_repo(repo_id, repo_type="dataset", exist_ok=True)
+    # The HF client is blocking; keep it off the event loop
+    await asyncio.to_thread(create_repo, repo_id, repo_type="dataset", exist_ok=True, token=HF_TOKEN)
     
     uploaded_count = 0
     for f in files:
         local_path = os.path.join(TEMP_DOWNLOAD_DIR, f)
         path_in_repo = f"data/images/{f}"
-        api.upload_file(
+        await asyncio.to_thread(
+            api.upload_file,
             path_or_fileobj=local_path,
             path_in_repo=path_in_repo,
             repo_id=repo_id,
@@ -411,14 +580,11 @@ async def upload_to_hf_tool(artifact_id: str) -> str:
         )
         uploaded_count += 1
         
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute("UPDATE artifact_queue SET status='ARCHIVED' WHERE id=%s", (artifact_id,))
-    conn.commit()
-    conn.close()
+    await adb.lock_artifact_state(artifact_id, "ARCHIVED")
     
     return f"SUCCESS: Uploaded {uploaded_count} files."
 
+@metrics.traced()
 async def delete_temp_files_tool(artifact_id: str) -> str:
     """Cleans up local storage."""
     count = 0
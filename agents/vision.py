@@ -1,4 +1,5 @@
 from google.adk.agents import Agent
+from modules.llm_cache import cached_model_call, store_model_response
 from modules.llm_bridge import GeminiFallbackClient
 from agents.tools import analyze_image_tool, save_visual_analysis_tool
 
@@ -7,7 +8,7 @@ vision_model = GeminiFallbackClient()
 
 visual_analyst_agent = Agent(
     name="VisualAnalystAgent",
-    model=vision_model.model,
+    model=vision_model.llm,
     description="Visual Expert. Analyzes the physical reality of the artifact.",
     instruction="""
     You are the Visual Analyst.
@@ -19,5 +20,7 @@ visual_analyst_agent = Agent(
     3. Do NOT interpret history. Just describe what you see.
     4. Call `save_visual_analysis_tool(artifact_id, description)` to save the report.
     """,
-    tools=[analyze_image_tool, save_visual_analysis_tool]
+    tools=[analyze_image_tool, save_visual_analysis_tool],
+    before_model_callback=cached_model_call,
+    after_model_callback=store_model_response
 )
\ No newline at end of file
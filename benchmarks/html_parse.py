@@ -0,0 +1,82 @@
+"""
+CPU cost of processing saved museum pages: the old BeautifulSoup path
+(one html.parser tree for links, another for scraping) vs. the shared
+single-parse ParsedPage.
+
+    python -m benchmarks.html_parse [pages_dir] [iterations]
+
+pages_dir holds saved *.html files; without it, pages already in the
+on-disk page cache (HTML_CACHE_DIR) are used.
+"""
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+from modules import html_parse
+from modules.disk_cache import DiskCache
+from modules.http_fetcher import HTML_CACHE_DIR
+
+try:
+    from bs4 import BeautifulSoup   # Baseline only; not a runtime dependency
+except ImportError:
+    BeautifulSoup = None
+
+def load_pages(pages_dir):
+    pages = []
+    if pages_dir:
+        for name in sorted(os.listdir(pages_dir)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(pages_dir, name), encoding="utf-8", errors="replace") as f:
+                    pages.append((f"https://example.org/{name}", f.read()))
+        return pages
+    cache = DiskCache(HTML_CACHE_DIR, max_bytes=float("inf"))
+    keys = [row[0] for row in cache._db.execute("SELECT key FROM entries")]
+    for key in keys:
+        entry = cache.get(key)
+        if entry:
+            pages.append((key, entry[0].decode("utf-8", errors="replace")))
+    return pages
+
+def old_path(url, html):
+    soup = BeautifulSoup(html, "html.parser")
+    links = [urljoin(url, a["href"]) for a in soup.select("a") if a.get("href")]
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "nav", "footer", "iframe", "svg"]):
+        tag.decompose()
+    images = [urljoin(url, img["src"]) for img in soup.find_all("img") if img.get("src") and len(img.get("src")) > 10]
+    text = soup.get_text(separator="\n", strip=True)
+    return links, images, text
+
+def new_path(url, html):
+    page = html_parse.ParsedPage(url, html)
+    return page.links(), page.images(), page.text()
+
+def bench(label, fn, pages, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for url, html in pages:
+            fn(url, html)
+    per_page_ms = (time.perf_counter() - start) / (iterations * len(pages)) * 1e3
+    print(f"{label:<28} {per_page_ms:10.2f} ms/page")
+    return per_page_ms
+
+def main():
+    pages_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    pages = load_pages(pages_dir)
+    if not pages:
+        print("No sample pages found (pass a directory of saved .html files).")
+        return
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KB total")
+
+    new = bench("ParsedPage (lexbor, 1 parse)", new_path, pages, iterations)
+    if BeautifulSoup is None:
+        print("beautifulsoup4 not installed; skipping the baseline.")
+        return
+    old = bench("BeautifulSoup (2 parses)", old_path, pages, iterations)
+    print(f"Speedup: {old / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
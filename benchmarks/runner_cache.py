@@ -0,0 +1,39 @@
+"""
+Per-call overhead of obtaining a Runner: fresh construction (old behaviour)
+vs. the cached get_agent_runner().
+
+    python -m benchmarks.runner_cache [iterations]
+"""
+import sys
+import time
+from google.adk import Runner
+
+from modules.sessions import get_agent_runner, _global_session_service
+from agents.scout import html_parser_agent
+
+def bench(label, fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<24} {per_call_us:10.1f} µs/call")
+    return per_call_us
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    uncached = bench(
+        "Runner() per call",
+        lambda: Runner(agent=html_parser_agent, session_service=_global_session_service, app_name="IgboCurator"),
+        iterations
+    )
+    cached = bench(
+        "get_agent_runner()",
+        lambda: get_agent_runner(html_parser_agent, session_id="bench"),
+        iterations
+    )
+    print(f"Speedup: {uncached / cached:.0f}x over {iterations} calls")
+
+if __name__ == "__main__":
+    main()
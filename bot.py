@@ -4,7 +4,17 @@ import threading
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, ContextTypes
-from modules.db import set_system_status, get_connection
+from modules.db import get_pool_stats
+from modules import db_async as adb
+from modules.sessions import release_artifact_session, get_session_stats
+from modules.http_fetcher import http_fetcher
+from modules.rate_limit import rate_limiter
+from modules.structured_data import get_structured_stats
+from modules.templates import get_template_stats
+from modules.content import get_prompt_stats
+from modules.llm_cache import get_llm_cache_stats
+from modules.batching import get_batch_stats
+from modules.llm_bridge import get_llm_provider_stats
 
 logging.basicConfig(level=logging.INFO)
 
@@ -13,13 +23,96 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🏛️ **Curator Online.** Use /run to start.")
 
 async def run_agent(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    set_system_status("RUNNING")
+    """/run, or /run <museum> <listing_url> to also start crawling that listing."""
+    if len(context.args) == 2:
+        museum, url = context.args
+        await adb.start_discovery(museum, url)
+        await adb.set_system_status("RUNNING")
+        await update.message.reply_text(f"🚀 **System STARTED.** Crawling {museum} from {url}")
+        return
+    if context.args:
+        await update.message.reply_text("Usage: /run [<museum> <listing_url>]")
+        return
+    await adb.set_system_status("RUNNING")
     await update.message.reply_text("🚀 **System STARTED.**")
 
 async def stop_agent(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    set_system_status("STOPPED")
+    await adb.set_system_status("STOPPED")
     await update.message.reply_text("🛑 **System STOPPED.**")
 
+async def db_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    stats = get_pool_stats()
+    lines = [f"• {k}: {v}" for k, v in stats.items()]
+    await update.message.reply_text("🗄️ **DB Pool**\n" + "\n".join(lines))
+
+async def list_workers(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    workers = await adb.list_workers()
+    if not workers:
+        await update.message.reply_text("👷 No workers registered.")
+        return
+    lines = [f"• `{w['id']}` [{w['role']}] {w['stages'] or '-'} — {w['status']} ({w['last_heartbeat']:%H:%M:%S})" for w in workers]
+    await update.message.reply_text("👷 **Workers**\n" + "\n".join(lines))
+
+async def session_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    stats = get_session_stats()
+    lines = [f"• {k}: {v}" for k, v in stats.items()]
+    await update.message.reply_text("🧠 **Agent Sessions**\n" + "\n".join(lines))
+
+async def fetch_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    stats = http_fetcher.stats
+    limits = rate_limiter.snapshot()
+    if not stats and not limits:
+        await update.message.reply_text("🌐 No pages fetched yet.")
+        return
+    lines = [f"• {domain}: http {s['http']} / browser {s['browser']} / cache {s['cached']} (escalated {s['escalated']}, 304 {s['not_modified']}, errors {s['errors']})"
+             for domain, s in sorted(stats.items())]
+    lines += [f"• {domain}: {l['rate']}/{l['base_rate']} req/s, waited {l['waited_seconds']:.0f}s, throttled {l['throttled']}"
+              for domain, l in sorted(limits.items())]
+    await update.message.reply_text("🌐 **Fetch Paths**\n" + "\n".join(lines))
+
+async def extract_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    stats = get_structured_stats()
+    learned = get_template_stats()
+    prompts = get_prompt_stats()
+    if not stats and not learned and not prompts:
+        await update.message.reply_text("🧾 No pages extracted yet.")
+        return
+    lines = [f"• {domain}: structured {s['hits']}/{s['pages']} ({s['hit_rate']:.0%}), partial {s['partial']}"
+             for domain, s in sorted(stats.items())]
+    lines += [f"• {domain}: template {t['hits']} hits, {t['fallbacks']} fallbacks, learned from {t['learned']} pages"
+              for domain, t in sorted(learned.items())]
+    lines += [f"• {domain}: prompt ~{p['avg_tokens_before']} → ~{p['avg_tokens_after']} tokens ({p['reduction']:.0%} smaller, {p['pages']} pages)"
+              for domain, p in sorted(prompts.items())]
+    cache = get_llm_cache_stats()
+    lines.append(f"• LLM cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%}), {cache['entries']} entries")
+    lines += [f"• {name} batches: {b['batches']} calls for {b['batched_items']} pages ({b['items_per_call']} per call), {b['fallbacks']} retried alone"
+              for name, b in sorted(get_batch_stats().items()) if b['batches']]
+    await update.message.reply_text("🧾 **Extraction Without LLM**\n" + "\n".join(lines))
+
+async def llm_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    providers = get_llm_provider_stats()
+    lines = [f"• {name} ({p['model']}): {p['requests']} calls, {p['failures']} failed, {p['throttled']} throttled, "
+             f"{p['fallbacks']} handed off, waited {p['waited_seconds']:.0f}s, circuit {p['circuit']}"
+             for name, p in sorted(providers.items())]
+    await update.message.reply_text("🧠 **LLM Providers**\n" + "\n".join(lines))
+
+async def latency_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """p50/p95 per stage and its slowest agents/tools over the last 24h (all workers, from stage_metrics)."""
+    rows = await adb.get_stage_latency(24)
+    if not rows:
+        await update.message.reply_text("⏱️ No traced work in the last 24h.")
+        return
+    lines = []
+    for r in rows:
+        if r["kind"] == "llm":
+            continue  # Already counted inside the agents/tools that made the calls
+        indent = "" if r["kind"] == "stage" else "   "
+        lines.append(
+            f"{indent}• {r['stage'] or '-'} / {r['name']}: p50 {r['p50_ms'] / 1000:.1f}s, p95 {r['p95_ms'] / 1000:.1f}s "
+            f"({r['calls']} runs, {r['errors']} failed, {r['tokens_in'] + r['tokens_out']} tok, ${float(r['cost_usd']):.4f})"
+        )
+    await update.message.reply_text("⏱️ **Latency (24h)**\n" + "\n".join(lines[:40]))
+
 # --- Interactive Review Handler ---
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the Approve/Reject buttons."""
@@ -29,27 +122,26 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     data = query.data.split(":") # e.g., "APPROVE:PRM_123"
     action, artifact_id = data[0], data[1]
     
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            if action == "APPROVE":
-                cur.execute("UPDATE artifact_queue SET status='APPROVED' WHERE id=%s", (artifact_id,))
-                new_text = f"✅ **APPROVED:** {artifact_id}\nQueued for Upload."
-            elif action == "REJECT":
-                cur.execute("UPDATE artifact_queue SET status='REJECTED' WHERE id=%s", (artifact_id,))
-                new_text = f"❌ **REJECTED:** {artifact_id}\nDiscarded."
-        conn.commit()
-        
-        # Edit the message to remove buttons and show result
-        await query.edit_message_caption(caption=new_text)
-        
-    finally:
-        conn.close()
+    if action == "APPROVE":
+        await adb.lock_artifact_state(artifact_id, "APPROVED")
+        new_text = f"✅ **APPROVED:** {artifact_id}\nQueued for Upload."
+    elif action == "REJECT":
+        await adb.lock_artifact_state(artifact_id, "REJECTED")
+        await release_artifact_session(artifact_id)
+        new_text = f"❌ **REJECTED:** {artifact_id}\nDiscarded."
+    
+    # Edit the message to remove buttons and show result
+    await query.edit_message_caption(caption=new_text)
 
 # --- Launcher ---
+# "all" runs the whole pipeline next to the bot (single-service deploys).
+# "control" keeps only discovery + the lease reaper here; run the stages
+# separately with `python main.py worker --stages ...` on as many hosts as needed.
+BOT_LOOP_ROLE = os.getenv("BOT_LOOP_ROLE", "all")
+
 def start_worker():
     import main
-    asyncio.run(main.main())
+    asyncio.run(main.main(role=BOT_LOOP_ROLE))
 
 if __name__ == '__main__':
     TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -63,6 +155,13 @@ if __name__ == '__main__':
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("run", run_agent))
     app.add_handler(CommandHandler("stop", stop_agent))
+    app.add_handler(CommandHandler("dbstats", db_stats))
+    app.add_handler(CommandHandler("workers", list_workers))
+    app.add_handler(CommandHandler("sessions", session_stats))
+    app.add_handler(CommandHandler("fetchstats", fetch_stats))
+    app.add_handler(CommandHandler("extractstats", extract_stats))
+    app.add_handler(CommandHandler("llmstats", llm_stats))
+    app.add_handler(CommandHandler("latency", latency_stats))
     # Register the Button Handler
     app.add_handler(CallbackQueryHandler(button_handler))
     
@@ -14,9 +14,27 @@ CREATE TABLE IF NOT EXISTS artifact_queue (
     museum_name TEXT,
     retry_count INT DEFAULT 0,
     last_error TEXT,                  -- NEW: Tracks the reason for failure
+    claimed_by TEXT,                  -- Worker currently holding the artifact
+    claimed_at TIMESTAMP,
+    lease_expires_at TIMESTAMP,       -- In-progress rows past this are reclaimed by the reaper
+    heartbeat_at TIMESTAMP,           -- Last lease renewal from the holding worker
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Upgrade path for queues created before work claiming existed
+ALTER TABLE artifact_queue ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE artifact_queue ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+ALTER TABLE artifact_queue ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP;
+ALTER TABLE artifact_queue ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+
+-- Serves claim_next(): oldest rows first within a status
+CREATE INDEX IF NOT EXISTS idx_artifact_queue_status_created
+    ON artifact_queue (status, created_at);
+
+-- Serves the lease reaper
+CREATE INDEX IF NOT EXISTS idx_artifact_queue_lease
+    ON artifact_queue (lease_expires_at) WHERE lease_expires_at IS NOT NULL;
+
 -- 3. The Master Archive Record (Dublin Core Standard)
 CREATE TABLE IF NOT EXISTS archives (
     id TEXT PRIMARY KEY REFERENCES artifact_queue(id),
@@ -80,4 +98,48 @@ CREATE TABLE IF NOT EXISTS discovery_state (
     current_search_url TEXT,          
     is_finished BOOLEAN DEFAULT FALSE,
     updated_at TIMESTAMP DEFAULT NOW()
-);
\ No newline at end of file
+);
+
+-- 8. Worker Registry (multi-process / multi-node mode)
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,              -- host:pid:nonce
+    hostname TEXT,
+    pid INT,
+    role TEXT,                        -- 'worker' | 'control' | 'all'
+    stages TEXT,                      -- Comma-separated stages served
+    status TEXT DEFAULT 'ONLINE',
+    started_at TIMESTAMP DEFAULT NOW(),
+    last_heartbeat TIMESTAMP DEFAULT NOW()
+);
+
+-- 9. Extraction Templates (selectors learned per museum from successful LLM extractions)
+CREATE TABLE IF NOT EXISTS extraction_templates (
+    domain TEXT PRIMARY KEY,          -- e.g. 'britishmuseum.org'
+    rules JSONB NOT NULL DEFAULT '{}',  -- field -> {"label": ...} | {"css": ...}, with per-field confirmations
+    status TEXT DEFAULT 'LEARNING',   -- LEARNING, ACTIVE
+    pages_learned INT DEFAULT 0,
+    hits INT DEFAULT 0,               -- Pages extracted by the template alone
+    failures INT DEFAULT 0,           -- Consecutive validation failures (demoted at the limit)
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- 10. Stage Metrics (one row per traced stage job, agent run, tool call and LLM call)
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    worker_id TEXT,
+    artifact_id TEXT,                 -- NULL for work outside a stage job (e.g. discovery)
+    stage TEXT,                       -- extract, analyze, review, archive
+    kind TEXT,                        -- stage | agent | tool | llm
+    name TEXT,                        -- e.g. 'extract', 'VisualAnalystAgent', 'scrape_metadata_tool', 'groq'
+    model TEXT,
+    started_at TIMESTAMP,
+    duration_ms INT,
+    tokens_in INT DEFAULT 0,
+    tokens_out INT DEFAULT 0,
+    cost_usd NUMERIC(12, 6) DEFAULT 0,
+    bytes_fetched BIGINT DEFAULT 0,
+    cache_hits INT DEFAULT 0,
+    outcome TEXT                      -- ok | error | timeout | cancelled
+);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_started ON stage_metrics (started_at);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_artifact ON stage_metrics (artifact_id);
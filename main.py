@@ -1,18 +1,25 @@
+import argparse
 import asyncio
 import json
+import os
+import socket
 import time
-import re
+import uuid
 from google.genai import types
 
 # Imports
-from modules.sessions import get_agent_runner, create_session_if_needed
-from modules.db import (
-    init_db, get_system_status, get_connection, 
-    lock_artifact_state, handle_artifact_failure # NEW IMPORT
-)
+from modules.sessions import get_agent_runner, create_session_if_needed, release_artifact_session
+from modules import db_async as adb
+from modules.scheduler import SCHEDULER_MODE, STAGE_ACTIONS, RuleScheduler
+from modules.stage_executor import StageExecutor
+from modules.db import PIPELINE_STAGES
+from modules.browser import browser_instance
+from modules.http_fetcher import http_fetcher
+from modules import metrics
+from modules.llm_output import ArtifactRecord, CoordinatorDecision, extract_json, parse_model
 
 # Agents
-from agents.orchestrator import coordinator_agent
+from agents.orchestrator import coordinator_agent, get_queue_metrics
 from agents.scout import (
     navigator_agent, link_extractor_agent, deduplicator_agent, 
     queue_manager_agent, html_parser_agent, downloader_agent
@@ -20,17 +27,35 @@ from agents.scout import (
 from agents.vision import visual_analyst_agent
 from agents.historian import context_searcher_agent, synthesizer_agent, fact_extractor_agent
 from agents.archivist import draft_reviewer_agent, hf_uploader_agent, cleaner_agent
+from agents.tools import (
+    visit_page_tool, click_next_page_tool, extract_links_tool, check_db_tool, add_to_queue_tool,
+    scrape_metadata_tool, save_draft_tool, download_image_tool,
+    send_telegram_review_tool, upload_to_hf_tool, delete_temp_files_tool
+)
 
 # --- CONFIGURATION ---
 USER_ID = "admin"
-MAX_CONCURRENT_TASKS = 5  # Semaphore limit
-background_tasks = set()  # Track active tasks to prevent garbage collection
+# Unique per process so many workers (on many hosts) can share one artifact_queue
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+# Per-stage concurrency lives in modules/stage_executor.py (STAGE_CONCURRENCY env)
+
+# "direct" calls single-tool steps (download, upload, clean, review, dedupe, queue)
+# straight from Python; "agent" routes them through their LLM agents as before.
+JOB_EXECUTION_MODE = os.getenv("JOB_EXECUTION_MODE", "direct").lower()
+# Assumed cost of one agent round-trip until real agent timings have been observed
+AGENT_BASELINE_SECONDS = float(os.getenv("AGENT_BASELINE_SECONDS", "2.5"))
+
+# Coordinator action -> pipeline stage claimed in modules.db
+ACTION_STAGES = {action: stage for stage, action in STAGE_ACTIONS.items()}
 
-# Global Discovery Context
-DISCOVERY_CONTEXT = {
-    "active": False,
-    "current_url": ""
-}
+# Latency bookkeeping for the direct path: agent name -> {"calls", "seconds"}
+AGENT_STATS = {}
+DIRECT_STATS = {}
+
+def _record(stats, name, elapsed):
+    entry = stats.setdefault(name, {"calls": 0, "seconds": 0.0})
+    entry["calls"] += 1
+    entry["seconds"] += elapsed
 
 async def run_agent_task(agent, prompt, session_id, system_update=None):
     """
@@ -47,23 +72,78 @@ async def run_agent_task(agent, prompt, session_id, system_update=None):
     resp_text = ""
     msg = types.Content(role="user", parts=[types.Part(text=full_prompt)])
     
-    try:
-        async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=msg):
-            if event.content and event.content.role == "model":
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        resp_text += part.text
-    except Exception as e:
-        print(f"[{agent.name}] ⚠️ Error: {e}")
-        return f"ERROR: {e}"
+    started = time.perf_counter()
+    with metrics.span("agent", agent.name) as span:
+        try:
+            async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=msg):
+                if event.content and event.content.role == "model":
+                    for part in event.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            resp_text += part.text
+        except Exception as e:
+            print(f"[{agent.name}] ⚠️ Error: {e}")
+            span.fail()
+            return f"ERROR: {e}"
+        finally:
+            _record(AGENT_STATS, agent.name, time.perf_counter() - started)
     return resp_text
 
+async def run_direct(agent, tool, *args):
+    """
+    Calls the single tool `agent` would have called, skipping the LLM round-trip.
+    Raises on tool errors so the stage executor's retry handling kicks in.
+    """
+    started = time.perf_counter()
+    result = await tool(*args)
+    _record(DIRECT_STATS, agent.name, time.perf_counter() - started)
+    if isinstance(result, str) and result.startswith("ERROR"):
+        raise RuntimeError(f"{tool.__name__}: {result}")
+    return result
+
+def direct_savings_report():
+    """
+    Estimated seconds saved per agent: (observed agent latency - direct latency) x calls.
+    Falls back to AGENT_BASELINE_SECONDS when the agent has not run in this process.
+    """
+    report = {}
+    for name, d in DIRECT_STATS.items():
+        a = AGENT_STATS.get(name)
+        agent_avg = a["seconds"] / a["calls"] if a and a["calls"] else AGENT_BASELINE_SECONDS
+        direct_avg = d["seconds"] / d["calls"]
+        report[name] = {
+            "calls": d["calls"],
+            "direct_avg_s": round(direct_avg, 3),
+            "agent_avg_s": round(agent_avg, 3),
+            "saved_s": round(max(0.0, agent_avg - direct_avg) * d["calls"], 1)
+        }
+    return report
+
+DIRECT_REPORT_INTERVAL = 300  # Seconds between savings summaries
+_last_direct_report = 0.0
+
+def print_direct_savings(force=False):
+    global _last_direct_report
+    if not force and time.monotonic() - _last_direct_report < DIRECT_REPORT_INTERVAL:
+        return
+    _last_direct_report = time.monotonic()
+    report = direct_savings_report()
+    if report:
+        total = sum(r["saved_s"] for r in report.values())
+        calls = sum(r["calls"] for r in report.values())
+        print(f"[Direct] ⚡ {calls} LLM round-trips skipped, ~{total:.0f}s saved: {report}")
+
 # --- WORKER FUNCTIONS ---
 
 async def job_archive(target_id, session_id):
     print(f"📦 [Archivist] Starting upload for {target_id}")
-    await run_agent_task(hf_uploader_agent, f"Upload artifacts for ID: {target_id}", session_id)
-    await run_agent_task(cleaner_agent, f"Clean local files for ID: {target_id}", session_id)
+    if JOB_EXECUTION_MODE == "direct":
+        # A failed upload raises before cleanup, so local files survive for the retry
+        await run_direct(hf_uploader_agent, upload_to_hf_tool, target_id)
+        await run_direct(cleaner_agent, delete_temp_files_tool, target_id)
+    else:
+        await run_agent_task(hf_uploader_agent, f"Upload artifacts for ID: {target_id}", session_id)
+        await run_agent_task(cleaner_agent, f"Clean local files for ID: {target_id}", session_id)
+    await release_artifact_session(target_id)
     print(f"✅ [Archivist] Finished {target_id}")
 
 async def job_analyze_pipeline(target_id, session_id):
@@ -73,11 +153,7 @@ async def job_analyze_pipeline(target_id, session_id):
     await run_agent_task(visual_analyst_agent, f"Analyze all images for {target_id}", session_id)
     
     # B. Fetch Metadata
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute("SELECT title, spatial_coverage, rights_holder FROM artifact_queue JOIN archives USING(id) WHERE id=%s", (target_id,))
-        row = cur.fetchone()
-    conn.close()
+    row = await adb.get_artifact_context(target_id)
     
     museum = row['rights_holder'] if row['rights_holder'] else "the museum"
     search_prompt = f"Find context for '{row['title']}' from '{museum}' in '{row['spatial_coverage']}'."
@@ -92,117 +168,305 @@ async def job_analyze_pipeline(target_id, session_id):
 
 async def job_extract(target_id, url, session_id):
     print(f"⛏️ [Extractor] Scraping {target_id}")
-    parser_output = await run_agent_task(html_parser_agent, f"Scrape metadata from {url} for ID {target_id}", session_id)
+    if JOB_EXECUTION_MODE == "direct":
+        # The HTML parser agent only relays scrape -> save; the LLM work happens inside the scrape tool
+        parser_output = await run_direct(html_parser_agent, scrape_metadata_tool, url)
+        await run_direct(html_parser_agent, save_draft_tool, target_id, parser_output)
+    else:
+        parser_output = await run_agent_task(html_parser_agent, f"Scrape metadata from {url} for ID {target_id}", session_id)
     
-    # Download Logic
-    try:
-        json_match = re.search(r'\{.*\}', parser_output, re.DOTALL)
-        if json_match:
-            data = json.loads(json_match.group(0))
-            media_urls = data.get("media_urls", [])
-            for img_url in media_urls:
-                await run_agent_task(downloader_agent, f"Download {img_url} for {target_id}", session_id)
-            
-            # Finalize State
-            lock_artifact_state(target_id, "EXTRACTED")
-    except Exception as e:
-        print(f"⚠️ [Extractor] Failed: {e}")
-        handle_artifact_failure(target_id, str(e)) # Use new error handler
+    # Download Logic (failures propagate to the stage pool: same-stage retry, then FAILED + session release)
+    data = extract_json(parser_output)
+    if not isinstance(data, dict):
+        raise RuntimeError("extraction returned no usable record")
+    media_urls = ArtifactRecord.model_validate(data).media_urls
+    saved = 0
+    for img_url in media_urls:
+        # One bad image (404, hotlink block) shouldn't cost the whole artifact
+        try:
+            if JOB_EXECUTION_MODE == "direct":
+                await run_direct(downloader_agent, download_image_tool, img_url, target_id)
+            else:
+                result = await run_agent_task(downloader_agent, f"Download {img_url} for {target_id}", session_id)
+                if result.startswith("ERROR"):
+                    raise RuntimeError(result)
+            saved += 1
+        except Exception as e:
+            print(f"⚠️ [Extractor] Skipped image {img_url}: {e}")
+    if media_urls and not saved:
+        raise RuntimeError(f"none of {len(media_urls)} images could be downloaded")
+    
+    # Finalize State
+    await adb.lock_artifact_state(target_id, "EXTRACTED")
+
+async def job_review(target_id, session_id):
+    if JOB_EXECUTION_MODE == "direct":
+        await run_direct(draft_reviewer_agent, send_telegram_review_tool, target_id)
+    else:
+        await run_agent_task(draft_reviewer_agent, f"Send {target_id}", session_id)
+    # Parked until the human answers in Telegram (-> APPROVED / REJECTED)
+    await adb.lock_artifact_state(target_id, "AWAITING_REVIEW")
+
+async def queue_new_links(links, museum_name):
+    """Deduplicator + Queue Manager without the LLM: check each URL, queue the new ones."""
+    queued = 0
+    for link in links:
+        if await run_direct(deduplicator_agent, check_db_tool, link) == "NEW":
+            await run_direct(queue_manager_agent, add_to_queue_tool, link, museum_name)
+            queued += 1
+    return queued
 
 async def job_discovery(session_id):
-    # Wrapped Discovery logic would go here
-    pass 
+    """
+    Crawls one listing page of the active crawl (started with /run <museum> <url>)
+    and queues new object links. The crawl position lives in discovery_state, so
+    it survives restarts and can be started from the bot's process.
+    """
+    crawl = await adb.get_active_discovery()
+    if not crawl:
+        return
+    url = crawl["current_search_url"]
+    museum = crawl["source_name"]
 
-# --- BACKGROUND WRAPPER ---
+    if JOB_EXECUTION_MODE == "direct":
+        # Links come HTTP-first; the browser is only driven for pagination
+        links_raw = await run_direct(link_extractor_agent, extract_links_tool, url)
+        try:
+            links = json.loads(links_raw)
+        except ValueError:
+            raise RuntimeError(f"extract_links_tool returned no link list for {url}: {links_raw[:200]}")
+        queued = await queue_new_links(links, museum)
+        page = browser_instance.current_page()
+        if page is None or page.url != url:
+            await run_direct(navigator_agent, visit_page_tool, url)
+        next_status = await click_next_page_tool()
+        if next_status.startswith("ERROR"):
+            # Not the end of the archive: leave the crawl where it is and retry next pass
+            raise RuntimeError(f"click_next_page_tool: {next_status}")
+    else:
+        await run_agent_task(navigator_agent, f"GOTO {url}", session_id)
+        links_raw = await run_agent_task(link_extractor_agent, f"Extract links from {url}", session_id)
+        fresh = await run_agent_task(deduplicator_agent, f"Filter these URLs: {links_raw}", session_id)
+        await run_agent_task(queue_manager_agent, f"Queue for museum '{museum}': {fresh}", session_id)
+        queued = "?"
+        next_status = await run_agent_task(navigator_agent, "NEXT PAGE", session_id)
+
+    print(f"🔭 [Discovery] {url}: queued {queued} new artifacts")
+    next_url = None
+    if "SUCCESS" in next_status and "Navigated to " in next_status:
+        next_url = next_status.split("Navigated to ", 1)[1].strip()
+    else:
+        print(f"🏁 [Discovery] {museum}: no next page, crawl finished")
+    await adb.advance_discovery(museum, next_url)
 
-async def task_wrapper(coro, artifact_id=None):
+# --- SCHEDULING ---
+
+async def coordinator_decision(coord_session_id, executor):
     """
-    Wraps the job to handle errors and release the semaphore.
+    LLM scheduling mode (SCHEDULER_MODE=llm): the CoordinatorAgent picks the stage,
+    then the artifact is claimed atomically so concurrent loops never share a row.
+    Returns None when the response could not be parsed, the stage pool is full,
+    or nothing was claimable.
     """
+    # Metrics go in the prompt, saving the agent a tool-call round trip
+    queue_metrics = await get_queue_metrics()
+    decision_raw = await run_agent_task(
+        coordinator_agent, 
+        f"Current metrics: {json.dumps(queue_metrics, default=str)}\nAssign ONE job.", 
+        coord_session_id
+    )
+    
     try:
-        await coro
-    except Exception as e:
-        print(f"💥 Background Task Failed: {e}")
-        if artifact_id:
-            handle_artifact_failure(artifact_id, str(e))
+        decision = parse_model(CoordinatorDecision, decision_raw).model_dump()
+    except ValueError as e:
+        print(f"[Coordinator] ⚠️ Unusable decision: {e}")
+        return None
 
-# --- MAIN LOOP ---
+    stage = ACTION_STAGES.get(decision.get("action"))
+    if stage:
+        if executor.capacity(stage) <= 0:
+            return None
+        claimed = await adb.claim_next(stage, WORKER_ID, 1)
+        if not claimed:
+            return None
+        decision["row"] = claimed[0]
+    return decision
 
-async def main():
-    print("[System] 🏛️ Museum Curator Agent Starting...")
-    init_db()
-    
-    # The Semaphore limits us to 5 active workers
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+# --- STAGE HANDLERS ---
+# Each pool worker receives a claimed artifact_queue row.
+
+async def job_extract_isolated(target_id, url, session_id):
+    """
+    Extraction on its own pooled browser page so concurrent jobs don't share navigation.
+    The page is only taken from the pool if the job escalates to the browser.
+    """
+    async with browser_instance.checkout(lazy=True):
+        await job_extract(target_id, url, session_id)
+
+def build_stage_handlers():
+    session = lambda row: f"artifact_{row['id']}"
+    return {
+        "extract": lambda row: job_extract_isolated(row["id"], row["url"], session(row)),
+        "analyze": lambda row: job_analyze_pipeline(row["id"], session(row)),
+        "review": lambda row: job_review(row["id"], session(row)),
+        "archive": lambda row: job_archive(row["id"], session(row)),
+    }
+
+# --- CONTROL TASKS ---
+
+REAPER_INTERVAL = 60     # Seconds between sweeps for expired leases
+WORKER_HEARTBEAT = 30    # Seconds between worker registry heartbeats
+
+async def on_artifact_terminal(artifact_id, status):
+    """Drops per-artifact agent memory once nothing will run for it again."""
+    await release_artifact_session(artifact_id)
+
+async def lease_reaper():
+    """Returns artifacts held by crashed/stalled workers to their prior stage."""
+    while True:
+        try:
+            reclaimed = await adb.reap_expired_leases()
+            if reclaimed:
+                print(f"[Reaper] ♻️ Reclaimed {len(reclaimed)} expired leases: {[r['id'] for r in reclaimed]}")
+                for r in reclaimed:
+                    if r["new_status"] == "FAILED":
+                        await on_artifact_terminal(r["id"], "FAILED")
+            stale = await adb.mark_stale_workers(REAPER_INTERVAL * 5)
+            if stale:
+                print(f"[Reaper] 🪦 Workers went silent: {stale}")
+        except Exception as e:
+            print(f"[Reaper] ⚠️ Sweep failed: {e}")
+        await asyncio.sleep(REAPER_INTERVAL)
+
+async def registry_heartbeat(role, stages):
+    await adb.register_worker(WORKER_ID, socket.gethostname(), os.getpid(), role, stages)
+    while True:
+        await asyncio.sleep(WORKER_HEARTBEAT)
+        try:
+            await adb.worker_heartbeat(WORKER_ID)
+        except Exception as e:
+            print(f"[System] ⚠️ Registry heartbeat failed: {e}")
+
+# --- LOOPS ---
+
+async def dispatch_loop(executor, run_discovery=True):
+    """Claims work for this process's stage pools until cancelled."""
+    rule_scheduler = RuleScheduler()
     coord_session_id = "session_coordinator_main"
     
     while True:
         try:
             # 1. Check System Status
-            if get_system_status() != "RUNNING":
+            if await adb.get_system_status() != "RUNNING":
                 await asyncio.sleep(5)
                 continue
 
-            # 2. Coordinator Decision
-            if semaphore.locked():
-                print("[System] 🚦 Max capacity reached. Waiting for a slot...")
+            # 2. Backpressure: every stage pool is full
+            if not executor.has_capacity():
                 await asyncio.sleep(2)
                 continue
 
-            decision_raw = await run_agent_task(
-                coordinator_agent, 
-                "Assess metrics. Assign ONE job. Return JSON.", 
-                coord_session_id
-            )
-            
-            try:
-                clean_json = decision_raw.replace("```json", "").replace("```", "").strip()
-                decision = json.loads(clean_json)
+            # 3. Scheduling (claims artifacts and hands them to the stage pools)
+            if SCHEDULER_MODE == "llm":
+                decision = await coordinator_decision(coord_session_id, executor)
+                if not decision:
+                    await asyncio.sleep(2)
+                    continue
                 action = decision.get("action")
-                target_id = decision.get("target_id")
-                ctx = decision.get("context", {})
-            except:
-                continue
+                if decision.get("row"):
+                    await executor.submit(ACTION_STAGES[action], decision["row"])
+                    print(f"🚀 Dispatched {action} for {decision['row']['id']}. Pools: {executor.snapshot()}")
+                    await asyncio.sleep(0.5)
+                    continue
+                idle = True
+            else:
+                dispatched, counts = await rule_scheduler.fill(executor, WORKER_ID)
+                if dispatched:
+                    print(f"🚀 Dispatched {dispatched} artifacts. Pools: {executor.snapshot()}")
+                    print_direct_savings()
+                    await asyncio.sleep(0.5)
+                    continue
+                action = "DISCOVER_JOB"
+                # Nothing claimable: either queues are empty or every stage is backpressured
+                idle = not any(counts.get(status, 0) for status, _ in PIPELINE_STAGES.values())
 
-            if action == "SLEEP":
-                await asyncio.sleep(5)
-                continue
+            if run_discovery and action == "DISCOVER_JOB" and idle:
+                await job_discovery("general")
+            await asyncio.sleep(5 if idle else 2)
 
-            # 3. DISPATCHER LOGIC
-            job_coro = None
-            job_session_id = f"artifact_{target_id}" if target_id else "general"
+        except Exception as e:
+            print(f"[System] 💥 Critical Error: {e}")
+            await asyncio.sleep(5)
 
-            if action == "ARCHIVE_JOB":
-                lock_artifact_state(target_id, "ARCHIVING_IN_PROGRESS")
-                job_coro = job_archive(target_id, job_session_id)
+async def control_loop():
+    """Discovery for the lightweight control process (no stage pools)."""
+    while True:
+        try:
+            if await adb.get_system_status() == "RUNNING":
+                counts = await adb.get_queue_counts()
+                if not any(counts.get(status, 0) for status, _ in PIPELINE_STAGES.values()):
+                    await job_discovery("general")
+        except Exception as e:
+            print(f"[Control] 💥 Error: {e}")
+        await asyncio.sleep(10)
 
-            elif action == "ANALYZE_JOB":
-                lock_artifact_state(target_id, "ANALYZING_IN_PROGRESS")
-                job_coro = job_analyze_pipeline(target_id, job_session_id)
+# --- MAIN ---
 
-            elif action == "EXTRACT_JOB":
-                lock_artifact_state(target_id, "EXTRACTING_IN_PROGRESS")
-                job_coro = job_extract(target_id, ctx.get("url"), job_session_id)
-            
-            elif action == "REVIEW_JOB":
-                await run_agent_task(draft_reviewer_agent, f"Send {target_id}", job_session_id)
-                continue
+async def main(role="all", stages=None, concurrency=None):
+    """
+    role="all":     single process, every stage + reaper + discovery (default).
+    role="worker":  stage pools only; run as many as you like against the same DB.
+    role="control": reaper + discovery only (pairs with the Telegram bot).
+    """
+    stages = stages or list(PIPELINE_STAGES)
+    print(f"[System] 🏛️ Museum Curator Agent Starting... (role: {role}, id: {WORKER_ID}, scheduler: {SCHEDULER_MODE})")
+    await adb.init_db()
+    
+    background = [asyncio.create_task(registry_heartbeat(role, stages if role != "control" else []))]
+    background.append(asyncio.create_task(metrics.flush_loop(WORKER_ID)))
+    if metrics.METRICS_PORT:
+        background.append(asyncio.create_task(metrics.serve_metrics()))
+    if role in ("all", "control"):
+        background.append(asyncio.create_task(lease_reaper()))
+    if role == "control":
+        await control_loop()
+        return
 
-            # 4. SPAWN
-            if job_coro:
-                await semaphore.acquire()
-                task = asyncio.create_task(task_wrapper(job_coro, target_id))
-                task.add_done_callback(lambda t: semaphore.release())
-                background_tasks.add(task)
-                task.add_done_callback(background_tasks.discard)
-                
-                print(f"🚀 Dispatched {action} for {target_id}. Active Tasks: {len(background_tasks)}")
+    handlers = {stage: h for stage, h in build_stage_handlers().items() if stage in stages}
+    overrides = {stage: concurrency for stage in handlers} if concurrency else None
+    executor = StageExecutor(handlers, WORKER_ID, concurrency=overrides, on_terminal=on_artifact_terminal)
+    executor.start()
+    try:
+        await dispatch_loop(executor, run_discovery=(role == "all"))
+    finally:
+        await executor.stop()
+        await browser_instance.close()
+        await http_fetcher.close()
+        print_direct_savings(force=True)
+        await metrics.flush(WORKER_ID)
+        await adb.worker_heartbeat(WORKER_ID, status="OFFLINE")
 
-            await asyncio.sleep(0.5)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Museum Curator Agent")
+    sub = parser.add_subparsers(dest="role")
+    sub.add_parser("all", help="Everything in one process (default)")
+    worker = sub.add_parser("worker", help="Stage worker sharing the Postgres queue")
+    worker.add_argument("--stages", default=",".join(PIPELINE_STAGES),
+                        help="Comma-separated subset of: " + ", ".join(PIPELINE_STAGES))
+    worker.add_argument("--concurrency", type=int, default=None,
+                        help="Workers per selected stage (default: STAGE_CONCURRENCY)")
+    sub.add_parser("control", help="Reaper + discovery only (no stage workers)")
+    args = parser.parse_args(argv)
 
-        except Exception as e:
-            print(f"[System] 💥 Critical Error: {e}")
-            await asyncio.sleep(5)
+    role = args.role or "all"
+    stages = None
+    if role == "worker":
+        stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+        unknown = [s for s in stages if s not in PIPELINE_STAGES]
+        if unknown:
+            parser.error(f"unknown stages: {unknown}")
+    return role, stages, getattr(args, "concurrency", None)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    role, stages, concurrency = parse_args()
+    asyncio.run(main(role, stages, concurrency))
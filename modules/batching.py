@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import contextmanager
+
+_batchers = {}   # name -> MicroBatcher (for stats)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into one call of `run_batch(items)`.
+    A batch is flushed when it reaches max_items or max_chars, or max_wait
+    seconds after its first item. run_batch returns one result per item
+    (None = the caller should fall back to its single-item path).
+    A request still alone when the window closes resolves to None straight away.
+
+    Callers that may submit wrap their work in `expecting()`. A batch is only held
+    open while some of them have yet to submit, so a lone request never waits, and
+    the batch goes out as soon as everyone in flight has joined it.
+    """
+    def __init__(self, name, run_batch, max_items=4, max_wait=1.5, max_chars=16000):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.max_chars = max_chars
+        self._pending = []       # (item, size, future)
+        self._chars = 0
+        self._timer = None
+        self._expected = 0       # Callers inside expecting()
+        self.stats = {"batches": 0, "batched_items": 0, "fallbacks": 0, "singles": 0}
+        _batchers[name] = self
+
+    @property
+    def enabled(self):
+        return self.max_items > 1
+
+    @contextmanager
+    def expecting(self):
+        self._expected += 1
+        try:
+            yield
+        finally:
+            self._expected -= 1
+            if self._pending and len(self._pending) >= self._expected:
+                self._flush()   # Nobody left who could join
+
+    async def submit(self, item, size=0):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._pending and self._chars + size > self.max_chars:
+            self._flush()
+        self._pending.append((item, size, future))
+        self._chars += size
+        if (len(self._pending) >= self.max_items or self._chars >= self.max_chars
+                or len(self._pending) >= self._expected):
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._chars = self._pending, [], 0
+        if not batch:
+            return
+        if len(batch) == 1:
+            self.stats["singles"] += 1
+            _, _, future = batch[0]
+            if not future.done():
+                future.set_result(None)
+            return
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(batch)
+        try:
+            results = await self.run_batch([item for item, _, _ in batch])
+        except Exception as e:
+            print(f"[Batch] ⚠️ Batch of {len(batch)} failed: {e}")
+            results = [None] * len(batch)
+        for (_, _, future), result in zip(batch, list(results) + [None] * (len(batch) - len(results))):
+            if result is None:
+                self.stats["fallbacks"] += 1
+            if not future.done():
+                future.set_result(result)
+
+    def snapshot(self):
+        batches = self.stats["batches"]
+        return {**self.stats, "items_per_call": round(self.stats["batched_items"] / batches, 2) if batches else 0.0}
+
+def get_batch_stats():
+    return {name: batcher.snapshot() for name, batcher in _batchers.items()}
@@ -1,48 +1,349 @@
+import os
+import time
 import asyncio
+import weakref
+import contextvars
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
+from modules.sites import get_site_profile, host_matches, TRACKER_DOMAINS, USER_AGENT
+
+# Pool Configuration
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "3"))                 # Isolated contexts for concurrent jobs
+BROWSER_MAX_NAVIGATIONS = int(os.getenv("BROWSER_MAX_NAVIGATIONS", "50"))    # Recycle a context after this many page loads
+
+# Resolves once the DOM has seen no mutations for `quietMs` (false if `capMs` passes first)
+_DOM_QUIET_JS = """
+([quietMs, capMs]) => new Promise(resolve => {
+    let timer;
+    const finish = (quiet) => { observer.disconnect(); clearTimeout(timer); clearTimeout(cap); resolve(quiet); };
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(() => finish(true), quietMs); });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(() => finish(true), quietMs);
+    const cap = setTimeout(() => finish(false), capMs);
+})
+"""
+
+# Lease held by the current job: {"slot": None} until a page is taken from the pool
+# (tools read its page instead of the shared page)
+_current_lease = contextvars.ContextVar("current_lease", default=None)
 
 class BrowserManager:
     """
     Manages a persistent Playwright session.
+    `page` is the shared page used by discovery; jobs that run concurrently
+    check out their own isolated context/page from a bounded pool.
     """
-    def __init__(self):
+    def __init__(self, pool_size=BROWSER_POOL_SIZE, max_navigations=BROWSER_MAX_NAVIGATIONS):
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
 
-    async def launch(self):
-        """Launches the stealth browser."""
-        if self.page:
-            return self.page
+        self.pool_size = pool_size
+        self.max_navigations = max_navigations
+        self._idle = []          # Warm slots ready for checkout
+        self._slots = {}         # page -> slot
+        self._total = 0          # Slots alive or being created
+        self._cond = None
+        self._launch_lock = None
+        self.stats = {"checkouts": 0, "waits": 0, "created": 0, "recycled": 0, "crashed": 0, "relaunches": 0, "unused": 0}
 
-        self.playwright = await async_playwright().start()
-        
-        # We add arguments to avoid detection and crash in container environments.
-        self.browser = await self.playwright.chromium.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-blink-features=AutomationControlled"
-            ]
-        )
-        
-        self.context = await self.browser.new_context(
+        # Resource blocking: page -> site profile of the URL it is navigating to
+        self._site_policy = weakref.WeakKeyDictionary()
+        self.blocked = {}        # resource type / "tracker" -> requests aborted
+
+        # Readiness: which signal ended each wait, and total seconds spent waiting
+        self.readiness = {"selector": 0, "network_idle": 0, "dom_quiet": 0, "timeout": 0, "wait_seconds": 0.0}
+
+    def _locks(self):
+        # Created lazily so they bind to the loop that actually runs the browser
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+            self._launch_lock = asyncio.Lock()
+        return self._cond, self._launch_lock
+
+    async def _ensure_browser(self):
+        """Starts Chromium, or restarts it if it crashed/disconnected."""
+        _, launch_lock = self._locks()
+        async with launch_lock:
+            if self.browser and self.browser.is_connected():
+                return
+            if self.browser:
+                self.stats["relaunches"] += 1
+                print("[Browser] ♻️ Browser disconnected, relaunching...")
+                self.page = None
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+
+            # We add arguments to avoid detection and crash in container environments.
+            self.browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=[
+                    "--no-sandbox",
+                    "--disable-setuid-sandbox",
+                    "--disable-blink-features=AutomationControlled"
+                ]
+            )
+            print("[Browser] 🕵️ Stealth Browser Launched")
+
+    async def _new_context(self):
+        context = await self.browser.new_context(
             viewport={"width": 1280, "height": 800},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+            user_agent=USER_AGENT
         )
-        
+        await context.route("**/*", self._route_request)
+        return context
+
+    # --- Resource Blocking ---
+
+    def prepare_navigation(self, page, url):
+        """Applies the target museum's blocking policy before `page` navigates to `url`."""
+        self._site_policy[page] = get_site_profile(url)
+
+    def _block_reason(self, profile, resource_type, url):
+        if resource_type == "document":
+            return None
+        host = urlparse(url).netloc.lower().split(":")[0]
+        if any(host_matches(host, d) for d in TRACKER_DOMAINS):
+            return "tracker"
+        if not profile.get("block_resources", True):
+            return None
+        if any(host_matches(host, d) for d in profile.get("blocked_domains", [])):
+            return "domain"
+        if resource_type in profile.get("blocked_resource_types", []):
+            return resource_type
+        return None
+
+    async def _route_request(self, route):
+        request = route.request
+        try:
+            page = request.frame.page
+        except Exception:
+            page = None  # e.g. service worker requests
+        profile = self._site_policy.get(page) if page else None
+        reason = self._block_reason(profile or get_site_profile(request.url), request.resource_type, request.url)
+        try:
+            if reason:
+                self.blocked[reason] = self.blocked.get(reason, 0) + 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception:
+            pass  # Page closed mid-request
+
+    # --- Page Readiness ---
+
+    async def wait_until_ready(self, page, url=None):
+        """
+        Waits until `page` has actually rendered instead of sleeping a fixed time:
+        the museum's ready_selector if it has one, else the first of network idle
+        or DOM mutation quiescence. Capped at the profile's ready_timeout.
+        Returns the signal that fired.
+        """
+        profile = get_site_profile(url or page.url)
+        cap = float(profile.get("ready_timeout") or 8.0)
+        quiet_ms = int(profile.get("ready_quiet_ms") or 500)
+        selector = profile.get("ready_selector")
+        start = time.monotonic()
+
+        if selector:
+            waiters = {"selector": asyncio.ensure_future(page.wait_for_selector(selector, state="attached", timeout=cap * 1000))}
+        else:
+            waiters = {
+                "network_idle": asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=cap * 1000)),
+                "dom_quiet": asyncio.ensure_future(page.evaluate(_DOM_QUIET_JS, [quiet_ms, int(cap * 1000)])),
+            }
+        reason = "timeout"
+        pending = set(waiters.values())
+        deadline = start + cap
+        while pending and reason == "timeout":
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for name, task in waiters.items():
+                # A failed waiter (timeout, navigation mid-evaluate) or a DOM cap hit is not a ready signal
+                if task in done and not task.exception() and task.result() is not False:
+                    reason = name
+                    break
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        self.readiness[reason] += 1
+        self.readiness["wait_seconds"] += time.monotonic() - start
+        return reason
+
+    async def launch(self):
+        """Launches the stealth browser and the shared page."""
+        if self.page and not self.page.is_closed() and self.browser.is_connected():
+            return self.page
+
+        await self._ensure_browser()
+        if self.context is not None:
+            try:
+                await self.context.close()   # Don't leak the old Chromium context
+            except Exception:
+                pass  # Browser already gone
+        self.context = await self._new_context()
         self.page = await self.context.new_page()
-        print("[Browser] 🕵️ Stealth Browser Launched")
         return self.page
 
+    # --- Page Pool ---
+
+    async def _new_slot(self):
+        await self._ensure_browser()
+        context = await self._new_context()
+        page = await context.new_page()
+        slot = {"context": context, "page": page, "navigations": 0, "dead": False}
+        page.on("crash", lambda _: slot.__setitem__("dead", True))
+        self._slots[page] = slot
+        self.stats["created"] += 1
+        return slot
+
+    def _usable(self, slot):
+        return (
+            not slot["dead"]
+            and not slot["page"].is_closed()
+            and slot["navigations"] < self.max_navigations
+            and self.browser is not None and self.browser.is_connected()
+        )
+
+    async def _retire(self, slot):
+        """Closes a slot's context (frees Chromium memory). Caller holds the condition."""
+        self._slots.pop(slot["page"], None)
+        self._total -= 1
+        if slot["dead"] or slot["page"].is_closed():
+            self.stats["crashed"] += 1
+        else:
+            self.stats["recycled"] += 1
+        try:
+            await slot["context"].close()
+        except Exception:
+            pass
+
+    async def _acquire(self):
+        cond, _ = self._locks()
+        async with cond:
+            waited = False
+            while True:
+                while self._idle:
+                    slot = self._idle.pop()
+                    if self._usable(slot):
+                        return slot
+                    await self._retire(slot)
+                if self._total < self.pool_size:
+                    self._total += 1
+                    break
+                if not waited:
+                    self.stats["waits"] += 1
+                    waited = True
+                await cond.wait()
+        try:
+            return await self._new_slot()
+        except Exception:
+            async with cond:
+                self._total -= 1
+                cond.notify()
+            raise
+
+    async def _release(self, slot):
+        cond, _ = self._locks()
+        async with cond:
+            if self._usable(slot):
+                self._idle.append(slot)
+            else:
+                await self._retire(slot)
+            cond.notify()
+
+    async def _take(self, lease):
+        lease["slot"] = await self._acquire()
+        lease["taken"] = True
+        self.stats["checkouts"] += 1
+
+    async def _replace(self, lease):
+        """Swaps the lease's crashed slot for a fresh one (same pool seat), so the job can retry in place."""
+        cond, _ = self._locks()
+        dead, lease["slot"] = lease["slot"], None
+        async with cond:
+            await self._retire(dead)
+            self._total += 1   # Keep the seat for the replacement
+        try:
+            lease["slot"] = await self._new_slot()
+        except Exception:
+            async with cond:
+                self._total -= 1
+                cond.notify()
+            raise
+
+    @asynccontextmanager
+    async def checkout(self, lazy=False):
+        """
+        Checks out an isolated page for the current job. Tools called inside the
+        block (directly or through an agent) operate on it via current_page().
+        With lazy=True nothing is taken from the pool until a tool first needs a
+        page (active_page()), so jobs served over plain HTTP never hold a context;
+        the block then yields None.
+        """
+        lease = {"slot": None}
+        if not lazy:
+            await self._take(lease)
+        token = _current_lease.set(lease)
+        try:
+            yield lease["slot"]["page"] if lease["slot"] else None
+        finally:
+            _current_lease.reset(token)
+            if lease["slot"] is not None:
+                await self._release(lease["slot"])
+            elif not lease.get("taken"):
+                self.stats["unused"] += 1
+
+    def current_page(self):
+        """The page checked out by this job, else the shared page (may be None)."""
+        lease = _current_lease.get()
+        if lease is not None:
+            slot = lease["slot"]
+            if slot is None or slot["dead"] or slot["page"].is_closed():
+                return None   # Not taken yet (lazy) or crashed; active_page() provides a working one
+            return slot["page"]
+        return self.page
+
+    async def active_page(self):
+        """Like current_page(), but takes the job's pooled page or launches the shared one when nothing is open."""
+        lease = _current_lease.get()
+        if lease is not None:
+            if lease["slot"] is None:
+                await self._take(lease)
+            elif lease["slot"]["dead"] or lease["slot"]["page"].is_closed():
+                print("[Browser] ♻️ Checked-out page crashed, replacing it")
+                await self._replace(lease)
+        page = self.current_page()
+        if page is None or page.is_closed():
+            page = await self.launch()
+        return page
+
+    def note_navigation(self, page):
+        """Counts a page load towards the slot's recycle budget."""
+        slot = self._slots.get(page)
+        if slot:
+            slot["navigations"] += 1
+
+    def snapshot(self):
+        return {**self.stats, "open": self._total, "idle": len(self._idle), "max": self.pool_size,
+                "blocked": dict(self.blocked), "readiness": dict(self.readiness)}
+
     async def close(self):
+        cond, _ = self._locks()
+        async with cond:
+            while self._idle:
+                await self._retire(self._idle.pop())
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        self.browser = self.playwright = self.context = self.page = None
         print("[Browser] 🛑 Browser Closed")
 
 # Global Instance
-browser_instance = BrowserManager()
\ No newline at end of file
+browser_instance = BrowserManager()
@@ -0,0 +1,163 @@
+import os
+import re
+from modules.sites import site_key
+from modules.html_parse import node_text, child_elements, text_lines
+
+# Boilerplate removal for LLM extraction prompts: keep the object record, drop menus,
+# carousels of related objects, cookie banners and share widgets.
+EXTRACT_PROMPT_MAX_CHARS = int(os.getenv("EXTRACT_PROMPT_MAX_CHARS", "12000"))
+MAIN_MIN_CHARS = 200          # Smaller regions are not trusted as the main content
+MAIN_DESCEND_RATIO = 0.7      # Descend into a child holding at least this share of the text
+LINK_DENSITY_MAX = 0.6        # Blocks whose text is mostly links are navigation/related items
+BOILERPLATE_TAGS = frozenset(["aside", "form", "button", "select", "dialog"])
+CONTAINER_TAGS = frozenset(["div", "section", "article", "main"])   # Regions worth descending into
+
+_NEGATIVE = re.compile(
+    r"nav|menu|header|footer|sidebar|related|recommend|carousel|slider|cookie|consent|gdpr|banner|"
+    r"share|social|breadcrumb|promo|newsletter|subscribe|signup|login|search|advert|sponsor|skip|modal|popup",
+    re.I
+)
+_POSITIVE = re.compile(r"content|article|object|record|detail|main|collection|item|artwork|catalog", re.I)
+
+def _hint(node):
+    attrs = node.attributes
+    return " ".join(filter(None, [attrs.get("id"), attrs.get("class"), attrs.get("role"), attrs.get("aria-label")]))
+
+def _link_chars(node):
+    return sum(len(node_text(a)) for a in node.css("a"))
+
+def _in_content(node):
+    """Inside <main>/<article>, where a <header> holds the object's own title."""
+    parent = node.parent
+    while parent is not None:
+        if parent.tag in ("main", "article") or parent.attributes.get("role") == "main":
+            return True
+        parent = parent.parent
+    return False
+
+def is_boilerplate(node):
+    """Navigation, banners and link-farm blocks (judged by tag, id/class/role and link density)."""
+    if not node.is_element_node:
+        return False
+    if node.tag in BOILERPLATE_TAGS:
+        return True
+    if node.tag == "header" and not _in_content(node):
+        return True   # Page-level site header
+    hint = _hint(node)
+    if hint and _NEGATIVE.search(hint) and not _POSITIVE.search(hint):
+        return True
+    if node.tag in ("ul", "ol", "div", "section", "table") and len(node.css("a")) >= 3:
+        # Mostly links and little prose of its own (a wrapper around the record plus a big carousel is kept)
+        text_len = len(node_text(node))
+        links = _link_chars(node)
+        if text_len and links / text_len > LINK_DENSITY_MAX and text_len - links < MAIN_MIN_CHARS:
+            return True
+    return False
+
+class _PageScorer:
+    """Memoizes boilerplate verdicts and text lengths per element for one page."""
+    def __init__(self):
+        self._boilerplate = {}
+        self._lengths = {}
+
+    def is_boilerplate(self, node):
+        verdict = self._boilerplate.get(node.mem_id)
+        if verdict is None:
+            verdict = self._boilerplate[node.mem_id] = is_boilerplate(node)
+        return verdict
+
+    def content_len(self, node):
+        length = self._lengths.get(node.mem_id)
+        if length is None:
+            length = self._lengths[node.mem_id] = len("".join(text_lines(node, skip=self.is_boilerplate)))
+        return length
+
+def _contains(ancestor, node):
+    while node is not None:
+        if node.mem_id == ancestor.mem_id:
+            return True
+        node = node.parent
+    return False
+
+def main_content(parsed, scorer=None):
+    """
+    The element holding the object record: an explicit <main>/<article>/[role=main]
+    if it carries enough text, else the region found by descending from <body>
+    into whichever child container keeps most of the non-boilerplate text
+    (never past the object's <h1>).
+    """
+    scorer = scorer or _PageScorer()
+    tree = parsed.tree
+    for selector in ("main", "[role=main]", "article"):
+        node = tree.css_first(selector)
+        if node is not None and scorer.content_len(node) >= MAIN_MIN_CHARS:
+            return node
+
+    node = tree.body
+    if node is None:
+        return tree.root
+    total = scorer.content_len(node)
+    while True:
+        best, best_len = None, 0
+        for child in child_elements(node):
+            if child.tag not in CONTAINER_TAGS or scorer.is_boilerplate(child):
+                continue
+            length = scorer.content_len(child)
+            if length > best_len:
+                best, best_len = child, length
+        if best is None or best_len < MAIN_MIN_CHARS or best_len < total * MAIN_DESCEND_RATIO:
+            return node
+        heading = node.css_first("h1")
+        if heading is not None and not _contains(best, heading):
+            return node
+        node, total = best, best_len
+
+def compact_text(parsed, max_chars=EXTRACT_PROMPT_MAX_CHARS):
+    """
+    Field-dense page text for the extraction prompt: catalogue label/value pairs
+    first, then the main content region without boilerplate.
+    Returns (text, pairs).
+    """
+    pairs, seen = [], set()
+    for label, value in parsed.label_pairs():
+        key = (label.lower(), value.lower())
+        if key not in seen and len(value) <= 1000:
+            seen.add(key)
+            pairs.append((label, value))
+
+    scorer = _PageScorer()
+    lines = text_lines(main_content(parsed, scorer), skip=scorer.is_boilerplate)
+    paired = {v for _, v in pairs} | {l for l, _ in pairs} | {l + ":" for l, _ in pairs}
+    body = [line for line in lines if line not in paired]
+
+    sections = []
+    if pairs:
+        sections.append("CATALOGUE FIELDS:\n" + "\n".join(f"{label}: {value}" for label, value in pairs))
+    if body:
+        sections.append("MAIN TEXT:\n" + "\n".join(body))
+    return "\n\n".join(sections)[:max_chars], pairs
+
+# --- Prompt Size Instrumentation ---
+
+prompt_stats = {}   # domain -> {"pages": n, "chars_before": n, "chars_after": n}
+
+def estimate_tokens(chars):
+    return chars // 4   # ~4 characters per token for Latin-script text
+
+def record_prompt(url, chars_before, chars_after):
+    entry = prompt_stats.setdefault(site_key(url), {"pages": 0, "chars_before": 0, "chars_after": 0})
+    entry["pages"] += 1
+    entry["chars_before"] += chars_before
+    entry["chars_after"] += chars_after
+
+def get_prompt_stats():
+    out = {}
+    for domain, s in prompt_stats.items():
+        pages = s["pages"] or 1
+        out[domain] = {
+            **s,
+            "avg_tokens_before": estimate_tokens(s["chars_before"] // pages),
+            "avg_tokens_after": estimate_tokens(s["chars_after"] // pages),
+            "reduction": round(1 - s["chars_after"] / s["chars_before"], 3) if s["chars_before"] else 0.0,
+        }
+    return out
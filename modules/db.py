@@ -1,22 +1,260 @@
 import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DB_URL = os.getenv("DATABASE_URL")
 
-def get_connection():
+# Pool Configuration
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))             # Seconds to wait for a free slot
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # Recycle connections after 30 min
+DB_POOL_HEALTH_CHECK = float(os.getenv("DB_POOL_HEALTH_CHECK", "30"))   # Ping connections idle longer than this
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of warm Postgres connections.
+    Connections are pinged when they have been idle for a while and
+    recycled once they exceed their max lifetime.
+    """
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 max_lifetime=DB_POOL_MAX_LIFETIME, health_check=DB_POOL_HEALTH_CHECK):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+
+        self._cond = threading.Condition()
+        self._idle = deque()   # (conn, created_at, last_used)
+        self._born = {}        # id(conn) -> created_at
+        self._in_use = 0
+        self._closed = False
+        self.stats = {
+            "checkouts": 0, "waits": 0, "timeouts": 0,
+            "created": 0, "recycled": 0, "discarded": 0,
+            "peak_in_use": 0
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self.stats["created"] += 1
+        return conn
+
+    def _discard(self, conn, reason="discarded"):
+        with self._cond:
+            self._born.pop(id(conn), None)
+            self.stats[reason] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, created_at, last_used):
+        """Lifetime + liveness check, run outside the lock."""
+        now = time.monotonic()
+        if conn.closed:
+            return False, "discarded"
+        if now - created_at > self.max_lifetime:
+            return False, "recycled"
+        if now - last_used > self.health_check:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                return False, "discarded"
+        return True, None
+
+    def warm(self):
+        """Opens connections until the pool holds at least `minconn`."""
+        with self._cond:
+            missing = self.minconn - (len(self._idle) + self._in_use)
+        for _ in range(max(0, missing)):
+            conn = self._connect()
+            with self._cond:
+                self._idle.append((conn, self._born[id(conn)], time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            entry = None
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed.")
+                while not self._idle and self._in_use >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise PoolTimeout(f"No DB connection available after {self.timeout}s")
+                    if not waited:
+                        self.stats["waits"] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO keeps the warmest connection hot
+                self._in_use += 1
+                self.stats["checkouts"] += 1
+                self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self._in_use)
+
+            try:
+                if entry is None:
+                    return self._connect()
+                conn, created_at, last_used = entry
+                ok, reason = self._is_healthy(conn, created_at, last_used)
+                if ok:
+                    return conn
+                self._discard(conn, reason)
+                return self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, self._born.get(id(conn), time.monotonic()), time.monotonic()))
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                **self.stats,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max": self.maxconn
+            }
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled psycopg2 connection.
+    `close()` hands the connection back to the pool instead of closing the socket,
+    so existing `conn = get_connection() ... conn.close()` call sites reuse warm connections.
+    Also usable as `with get_connection() as conn:` (commit on success, rollback on
+    error, always returned to the pool). Dunder methods bypass __getattr__, so the
+    proxy defines its own instead of psycopg2's transaction-only ones.
+    """
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    @property
+    def closed(self):
+        return 1 if self._raw is None else self._raw.closed
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.putconn(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._raw is not None:
+                if exc_type is None:
+                    self._raw.commit()
+                else:
+                    self._raw.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Safety net for call sites that forget to close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
     if not DB_URL:
         raise ValueError("❌ DATABASE_URL missing in .env")
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_URL)
+    return _pool
+
+def get_connection():
+    """Checks out a warm connection. Call `.close()` to return it to the pool."""
+    pool = get_pool()
+    return PooledConnection(pool, pool.getconn())
+
+@contextmanager
+def db_connection():
+    """
+    Context-manager API: commits on success, rolls back on error,
+    and always returns the connection to the pool.
+    """
+    with get_connection() as conn:
+        yield conn
+
+def get_pool_stats():
+    """Pool counters for monitoring (checkouts, waits, peak, ...)."""
+    if _pool is None:
+        return {"status": "not_initialized"}
+    return _pool.snapshot()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
 
 def init_db():
     try:
+        get_pool().warm()
         conn = get_connection()
         conn.close()
-        print("[DB] ✅ Connected to Neon Postgres.")
+        print(f"[DB] ✅ Connected to Neon Postgres (pool {DB_POOL_MIN}-{DB_POOL_MAX}).")
     except Exception as e:
         print(f"[DB] ⚠️ Connection Failed: {e}")
 
@@ -114,11 +352,362 @@ def update_discovery_state(source_name, page_number):
     finally:
         conn.close()
 
+def start_discovery(source_name, url):
+    """Points a museum's crawl at a listing URL (restarts it if it had finished)."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO discovery_state (source_name, last_page_scraped, current_search_url, is_finished)
+                VALUES (%s, 0, %s, FALSE)
+                ON CONFLICT (source_name) DO UPDATE SET
+                last_page_scraped = 0,
+                current_search_url = EXCLUDED.current_search_url,
+                is_finished = FALSE,
+                updated_at = NOW()
+                """,
+                (source_name, url)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_active_discovery():
+    """The least recently advanced unfinished crawl, or None."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT source_name, current_search_url, last_page_scraped FROM discovery_state
+                WHERE NOT is_finished AND current_search_url IS NOT NULL
+                ORDER BY updated_at ASC LIMIT 1
+                """
+            )
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+def advance_discovery(source_name, next_url):
+    """Moves the crawl to its next listing page; `next_url=None` marks it finished."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE discovery_state SET
+                last_page_scraped = last_page_scraped + 1,
+                current_search_url = COALESCE(%s, current_search_url),
+                is_finished = %s,
+                updated_at = NOW()
+                WHERE source_name = %s
+                """,
+                (next_url, next_url is None, source_name)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+# --- Extraction Templates ---
+
+def get_extraction_template(domain):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT domain, rules, status, pages_learned, hits, failures FROM extraction_templates WHERE domain = %s",
+                (domain,)
+            )
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+def save_extraction_template(domain, rules, status, pages_learned, failures=0):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO extraction_templates (domain, rules, status, pages_learned, failures)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (domain) DO UPDATE SET
+                    rules = EXCLUDED.rules, status = EXCLUDED.status,
+                    pages_learned = EXCLUDED.pages_learned, failures = EXCLUDED.failures,
+                    updated_at = NOW()
+                """,
+                (domain, Json(rules), status, pages_learned, failures)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def record_template_use(domain, ok):
+    """Counts a template hit (resets the failure streak) or a validation failure; returns the failure streak."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            if ok:
+                cur.execute(
+                    "UPDATE extraction_templates SET hits = hits + 1, failures = 0 WHERE domain = %s RETURNING failures",
+                    (domain,)
+                )
+            else:
+                cur.execute(
+                    "UPDATE extraction_templates SET failures = failures + 1 WHERE domain = %s RETURNING failures",
+                    (domain,)
+                )
+            row = cur.fetchone()
+        conn.commit()
+        return row['failures'] if row else 0
+    finally:
+        conn.close()
+
+# --- Stage Metrics ---
+
+def save_stage_metrics(worker_id, rows):
+    """Bulk-inserts finished spans (see modules.metrics) in one round trip."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO stage_metrics (worker_id, artifact_id, stage, kind, name, model, started_at, duration_ms,
+                                           tokens_in, tokens_out, cost_usd, bytes_fetched, cache_hits, outcome)
+                VALUES %s
+                """,
+                [(worker_id, r["artifact_id"], r["stage"], r["kind"], r["name"], r["model"], r["started_at"],
+                  r["duration_ms"], r["tokens_in"], r["tokens_out"], r["cost_usd"], r["bytes_fetched"],
+                  r["cache_hits"], r["outcome"]) for r in rows],
+                template="(%s, %s, %s, %s, %s, %s, TO_TIMESTAMP(%s), %s, %s, %s, %s, %s, %s, %s)"
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_stage_latency(hours=24):
+    """p50/p95 latency, tokens, cost, bytes and cache hits per (stage, kind, name) across all workers."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT stage, kind, name, COUNT(*) AS calls,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration_ms) AS p50_ms,
+                       PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY duration_ms) AS p95_ms,
+                       SUM(tokens_in) AS tokens_in, SUM(tokens_out) AS tokens_out, SUM(cost_usd) AS cost_usd,
+                       SUM(bytes_fetched) AS bytes_fetched, SUM(cache_hits) AS cache_hits,
+                       COUNT(*) FILTER (WHERE outcome <> 'ok') AS errors
+                FROM stage_metrics
+                WHERE started_at > NOW() - %s * INTERVAL '1 hour'
+                GROUP BY stage, kind, name
+                ORDER BY stage NULLS LAST, kind, p95_ms DESC
+                """,
+                (hours,)
+            )
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+# --- Work Claiming ---
+
+# stage -> (status waiting for the stage, status while a worker holds it)
+PIPELINE_STAGES = {
+    "archive": ("APPROVED", "ARCHIVING_IN_PROGRESS"),
+    "review": ("RESEARCHED", "REVIEW_IN_PROGRESS"),  # -> AWAITING_REVIEW once sent
+    "analyze": ("EXTRACTED", "ANALYZING_IN_PROGRESS"),
+    "extract": ("PENDING", "EXTRACTING_IN_PROGRESS"),
+}
+
+# Seconds a claim stays valid without a heartbeat before the reaper takes it back
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "300"))
+
+# In-progress status -> status it returns to when its lease expires
+LEASE_RETURN_STATUS = {to_status: from_status for from_status, to_status in PIPELINE_STAGES.values()}
+
+def claim_next(stage, worker_id, n=1, lease_seconds=LEASE_SECONDS):
+    """
+    Atomically claims up to `n` of the oldest artifacts waiting for `stage`.
+    Rows locked by a concurrent claimer are skipped rather than waited on,
+    so two dispatchers (or two processes) can never receive the same artifact.
+    Each claim carries a lease that the worker must renew (renew_leases)
+    or the reaper returns the artifact to its prior stage.
+    Returns the claimed rows (id, url, museum_name, retry_count).
+    """
+    if stage not in PIPELINE_STAGES:
+        raise ValueError(f"Unknown stage '{stage}'")
+    from_status, to_status = PIPELINE_STAGES[stage]
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH picked AS (
+                    SELECT id FROM artifact_queue
+                    WHERE status = %s
+                    ORDER BY created_at ASC
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE artifact_queue q
+                SET status = %s, claimed_by = %s, claimed_at = NOW(),
+                    heartbeat_at = NOW(), lease_expires_at = NOW() + make_interval(secs => %s)
+                FROM picked
+                WHERE q.id = picked.id
+                RETURNING q.id, q.url, q.museum_name, q.retry_count
+                """,
+                (from_status, n, to_status, worker_id, lease_seconds)
+            )
+            rows = cur.fetchall()
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+def renew_leases(artifact_ids, worker_id, lease_seconds=LEASE_SECONDS):
+    """
+    Heartbeat: extends the leases this worker still holds.
+    Returns the ids that were renewed; anything missing was reclaimed.
+    """
+    if not artifact_ids:
+        return []
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE artifact_queue
+                SET heartbeat_at = NOW(), lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE id = ANY(%s) AND claimed_by = %s AND lease_expires_at IS NOT NULL
+                RETURNING id
+                """,
+                (lease_seconds, list(artifact_ids), worker_id)
+            )
+            renewed = [row['id'] for row in cur.fetchall()]
+        conn.commit()
+        return renewed
+    finally:
+        conn.close()
+
+def release_lease(artifact_id, worker_id):
+    """
+    Drops the lease once a job has moved the artifact out of its in-progress status.
+    Rows a job left in-progress keep their lease so the reaper retries them.
+    """
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE artifact_queue SET lease_expires_at = NULL
+                WHERE id = %s AND claimed_by = %s AND NOT (status = ANY(%s))
+                """,
+                (artifact_id, worker_id, list(LEASE_RETURN_STATUS))
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def reap_expired_leases(limit=50):
+    """
+    Returns artifacts whose lease expired (crashed or stalled worker) to the stage
+    they were claimed from, counting it as a failed attempt.
+    """
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, status, claimed_by FROM artifact_queue
+                WHERE lease_expires_at < NOW()
+                ORDER BY lease_expires_at ASC
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (limit,)
+            )
+            expired = cur.fetchall()
+            for row in expired:
+                retry_status = LEASE_RETURN_STATUS.get(row['status'], 'PENDING')
+                row['new_status'] = _record_failure(cur, row['id'], f"Lease expired (held by {row['claimed_by']})", retry_status)
+        conn.commit()
+        return expired
+    finally:
+        conn.close()
+
+# --- Worker Registry ---
+
+def register_worker(worker_id, hostname, pid, role, stages):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO workers (id, hostname, pid, role, stages, status, started_at, last_heartbeat)
+                VALUES (%s, %s, %s, %s, %s, 'ONLINE', NOW(), NOW())
+                ON CONFLICT (id) DO UPDATE SET
+                    status = 'ONLINE', role = EXCLUDED.role, stages = EXCLUDED.stages,
+                    last_heartbeat = NOW()
+                """,
+                (worker_id, hostname, pid, role, ",".join(stages))
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def worker_heartbeat(worker_id, status="ONLINE"):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE workers SET last_heartbeat = NOW(), status = %s WHERE id = %s",
+                (status, worker_id)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def mark_stale_workers(stale_seconds=300):
+    """Flags workers that stopped heart-beating (their artifacts are reaped via leases)."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE workers SET status = 'STALE'
+                WHERE status = 'ONLINE' AND last_heartbeat < NOW() - make_interval(secs => %s)
+                RETURNING id
+                """,
+                (stale_seconds,)
+            )
+            stale = [row['id'] for row in cur.fetchall()]
+        conn.commit()
+        return stale
+    finally:
+        conn.close()
+
+def list_workers():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, role, stages, status, last_heartbeat FROM workers
+                WHERE status <> 'OFFLINE' ORDER BY started_at
+                """
+            )
+            return cur.fetchall()
+    finally:
+        conn.close()
+
 # --- System Utils & OPS ---
 
 def lock_artifact_state(artifact_id, new_status="PROCESSING"):
     """
-    Atomically updates the status to prevent double-assignment.
+    Moves an artifact to `new_status` unconditionally.
+    Use claim_next() to acquire work; this is for finishing transitions.
     """
     conn = get_connection()
     try:
@@ -131,43 +720,54 @@ def lock_artifact_state(artifact_id, new_status="PROCESSING"):
     finally:
         conn.close()
 
-def handle_artifact_failure(artifact_id, error_msg):
+def _record_failure(cur, artifact_id, error_msg, retry_status='PENDING'):
+    """
+    Retry-or-kill decision shared by handle_artifact_failure and the lease reaper.
+    Returns the status the artifact ended up in.
+    """
+    cur.execute("SELECT retry_count FROM artifact_queue WHERE id=%s", (artifact_id,))
+    row = cur.fetchone()
+    current_retries = row['retry_count'] if row else 0
+    
+    if current_retries < 3:
+        # Retry
+        print(f"[Ops] 🔄 Retrying {artifact_id} from {retry_status} (Attempt {current_retries + 1}/3)")
+        cur.execute(
+            """
+            UPDATE artifact_queue 
+            SET status=%s, retry_count = retry_count + 1, last_error = %s,
+                claimed_by = NULL, claimed_at = NULL, lease_expires_at = NULL
+            WHERE id=%s
+            """,
+            (retry_status, str(error_msg), artifact_id)
+        )
+        return retry_status
+    else:
+        # Kill
+        print(f"[Ops] 💀 Killing {artifact_id} (Max Retries Exceeded)")
+        cur.execute(
+            """
+            UPDATE artifact_queue 
+            SET status='FAILED', last_error = %s, lease_expires_at = NULL
+            WHERE id=%s
+            """,
+            (str(error_msg), artifact_id)
+        )
+        return 'FAILED'
+
+def handle_artifact_failure(artifact_id, error_msg, retry_status='PENDING'):
     """
     Smart Retry Logic:
-    - If retries < 3: Increment retry, set status='PENDING' (to try again).
+    - If retries < 3: Increment retry, set status=`retry_status` (default 'PENDING', to try again).
     - If retries >= 3: Set status='FAILED' (Dead Letter Queue).
+    Returns the new status.
     """
     conn = get_connection()
     try:
         with conn.cursor() as cur:
-            # Check current retry count
-            cur.execute("SELECT retry_count FROM artifact_queue WHERE id=%s", (artifact_id,))
-            row = cur.fetchone()
-            current_retries = row['retry_count'] if row else 0
-            
-            if current_retries < 3:
-                # Retry
-                print(f"[Ops] 🔄 Retrying {artifact_id} (Attempt {current_retries + 1}/3)")
-                cur.execute(
-                    """
-                    UPDATE artifact_queue 
-                    SET status='PENDING', retry_count = retry_count + 1, last_error = %s
-                    WHERE id=%s
-                    """,
-                    (str(error_msg), artifact_id)
-                )
-            else:
-                # Kill
-                print(f"[Ops] 💀 Killing {artifact_id} (Max Retries Exceeded)")
-                cur.execute(
-                    """
-                    UPDATE artifact_queue 
-                    SET status='FAILED', last_error = %s
-                    WHERE id=%s
-                    """,
-                    (str(error_msg), artifact_id)
-                )
+            status = _record_failure(cur, artifact_id, error_msg, retry_status)
         conn.commit()
+        return status
     finally:
         conn.close()
 
@@ -203,4 +803,121 @@ def set_system_status(status):
             )
         conn.commit()
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+# --- Artifact Reads & Writes (used by tools) ---
+
+def get_artifact_status_by_url(url):
+    """Returns the queue status for a URL, or None if it was never queued."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status FROM artifact_queue WHERE url = %s", (url,))
+            row = cur.fetchone()
+            return row['status'] if row else None
+    finally:
+        conn.close()
+
+def save_archive_draft(record: dict):
+    """Upserts the Dublin Core draft produced by the scraper."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO archives (
+                    id, original_url, accession_number, title, 
+                    subject, creator, spatial_coverage, temporal_coverage, 
+                    rights_holder, description_museum
+                ) VALUES (
+                    %(id)s, %(url)s, %(acc_num)s, %(title)s, 
+                    %(subject)s, %(creator)s, %(spatial)s, %(temporal)s, 
+                    %(rights)s, %(desc)s
+                )
+                ON CONFLICT (id) DO UPDATE SET
+                    title = EXCLUDED.title,
+                    description_museum = EXCLUDED.description_museum
+                """,
+                record
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def save_visual_analysis(artifact_id, analysis):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE media_assets SET visual_analysis_raw = %s WHERE artifact_id = %s",
+                (analysis, artifact_id)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def save_deep_description(artifact_id, description):
+    """Stores the AI synthesis and advances the artifact to RESEARCHED."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE archives SET description_ai = %s WHERE id = %s",
+                (description, artifact_id)
+            )
+            cur.execute("UPDATE artifact_queue SET status='RESEARCHED' WHERE id=%s", (artifact_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_review_summary(artifact_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT title, description_ai FROM archives WHERE id=%s", (artifact_id,))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+def get_artifact_context(artifact_id):
+    """Title / location / museum used to seed the research prompt."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT title, spatial_coverage, rights_holder FROM artifact_queue JOIN archives USING(id) WHERE id=%s",
+                (artifact_id,)
+            )
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+def get_queue_counts():
+    """Number of artifacts per status (one cheap GROUP BY)."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, COUNT(*) AS n FROM artifact_queue GROUP BY status")
+            return {row['status']: row['n'] for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+def get_queue_snapshot():
+    """
+    Returns the count of artifacts per status and the oldest item
+    waiting in each actionable status.
+    """
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, COUNT(*) AS n FROM artifact_queue GROUP BY status")
+            counts = {row['status']: row['n'] for row in cur.fetchall()}
+            
+            next_tasks = {}
+            for status in ["APPROVED", "RESEARCHED", "EXTRACTED", "PENDING"]:
+                cur.execute("SELECT id, url, museum_name FROM artifact_queue WHERE status = %s ORDER BY created_at ASC LIMIT 1", (status,))
+                item = cur.fetchone()
+                if item:
+                    next_tasks[status] = item
+            return counts, next_tasks
+    finally:
+        conn.close()
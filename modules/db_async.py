@@ -0,0 +1,66 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import db
+
+# A dedicated executor sized to the connection pool, so DB calls never
+# queue behind browser/LLM work in the default executor and never
+# request more connections than the pool can hand out.
+_executor = ThreadPoolExecutor(max_workers=db.DB_POOL_MAX, thread_name_prefix="db")
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking DB function in the DB executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+def _async(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_db(fn, *args, **kwargs)
+    return wrapper
+
+# --- Async mirrors of modules.db (same names, awaitable) ---
+
+init_db = _async(db.init_db)
+
+register_artifact = _async(db.register_artifact)
+save_metadata_draft = _async(db.save_metadata_draft)
+log_media_asset = _async(db.log_media_asset)
+
+get_discovery_state = _async(db.get_discovery_state)
+update_discovery_state = _async(db.update_discovery_state)
+start_discovery = _async(db.start_discovery)
+get_active_discovery = _async(db.get_active_discovery)
+advance_discovery = _async(db.advance_discovery)
+
+get_extraction_template = _async(db.get_extraction_template)
+save_extraction_template = _async(db.save_extraction_template)
+record_template_use = _async(db.record_template_use)
+
+save_stage_metrics = _async(db.save_stage_metrics)
+get_stage_latency = _async(db.get_stage_latency)
+
+claim_next = _async(db.claim_next)
+renew_leases = _async(db.renew_leases)
+release_lease = _async(db.release_lease)
+reap_expired_leases = _async(db.reap_expired_leases)
+register_worker = _async(db.register_worker)
+worker_heartbeat = _async(db.worker_heartbeat)
+mark_stale_workers = _async(db.mark_stale_workers)
+list_workers = _async(db.list_workers)
+
+lock_artifact_state = _async(db.lock_artifact_state)
+handle_artifact_failure = _async(db.handle_artifact_failure)
+log_thought = _async(db.log_thought)
+get_system_status = _async(db.get_system_status)
+set_system_status = _async(db.set_system_status)
+
+get_artifact_status_by_url = _async(db.get_artifact_status_by_url)
+save_archive_draft = _async(db.save_archive_draft)
+save_visual_analysis = _async(db.save_visual_analysis)
+save_deep_description = _async(db.save_deep_description)
+get_review_summary = _async(db.get_review_summary)
+get_artifact_context = _async(db.get_artifact_context)
+get_queue_counts = _async(db.get_queue_counts)
+get_queue_snapshot = _async(db.get_queue_snapshot)
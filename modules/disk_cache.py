@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+class DiskCache:
+    """
+    Persistent, size-bounded LRU cache under `data/`.
+    Bodies are stored gzip-compressed, one file per key; a small SQLite index
+    holds per-entry metadata (headers, validators, timestamps) and access order.
+    Thread-safe; callers on the event loop should go through asyncio.to_thread.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, file TEXT NOT NULL, size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL, last_access REAL NOT NULL, meta TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        self._db.commit()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, key):
+        """Returns (body, meta, age_seconds) or None. Touches the entry for LRU."""
+        with self._lock:
+            row = self._db.execute("SELECT file, stored_at, meta FROM entries WHERE key = ?", (key,)).fetchone()
+            if not row:
+                self.stats["misses"] += 1
+                return None
+            name, stored_at, meta = row
+            try:
+                with gzip.open(self._path(name), "rb") as f:
+                    body = f.read()
+            except (OSError, EOFError):
+                # Body file lost or truncated: drop the index entry
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["misses"] += 1
+                return None
+            now = time.time()
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.stats["hits"] += 1
+            return body, json.loads(meta or "{}"), now - stored_at
+
+    def put(self, key, body, meta=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest() + ".gz"
+        data = gzip.compress(body, compresslevel=6)
+        with self._lock:
+            tmp = self._path(name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(name))
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, file, size, stored_at, last_access, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, name, len(data), now, now, json.dumps(meta or {}))
+            )
+            self._db.commit()
+            self.stats["writes"] += 1
+            self._evict()
+
+    def touch(self, key, meta=None):
+        """Marks an entry as freshly validated (e.g. after a 304), optionally merging new metadata."""
+        with self._lock:
+            now = time.time()
+            if meta:
+                row = self._db.execute("SELECT meta FROM entries WHERE key = ?", (key,)).fetchone()
+                if row:
+                    merged = {**json.loads(row[0] or "{}"), **meta}
+                    self._db.execute("UPDATE entries SET meta = ? WHERE key = ?", (json.dumps(merged), key))
+            self._db.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT file FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self._unlink(row[0])
+
+    def _unlink(self, name):
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drops least-recently-used entries until the cache fits max_bytes. Caller holds the lock."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, file, size FROM entries ORDER BY last_access").fetchall()
+        for key, name, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._unlink(name)
+            total -= size
+            self.stats["evictions"] += 1
+        self._db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
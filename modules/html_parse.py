@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from urllib.parse import urljoin
+from selectolax.lexbor import LexborHTMLParser
+
+# Subtrees that never carry object metadata (dropped from the LLM text to save tokens)
+NOISE_TAGS = frozenset(["script", "style", "nav", "footer", "iframe", "svg", "noscript", "template"])
+MIN_IMG_SRC = 10   # Shorter srcs are spacers/icons
+LABEL_MAX_CHARS = 60
+INLINE_LABEL_TAGS = "span, strong, b, em, label, h3, h4, h5, h6, div, p"
+
+def node_text(node):
+    """Whitespace-collapsed text of a node and its descendants."""
+    return " ".join(node.text(deep=True, separator=" ").split())
+
+def next_element(node):
+    sibling = node.next
+    while sibling is not None and not sibling.is_element_node:
+        sibling = sibling.next
+    return sibling
+
+def child_elements(node):
+    child, children = node.child, []
+    while child is not None:
+        if child.is_element_node:
+            children.append(child)
+        child = child.next
+    return children
+
+def in_noise(node):
+    """True if `node` sits under a NOISE_TAGS element (nav bars, footers, embedded widgets)."""
+    parent = node.parent
+    while parent is not None:
+        if parent.tag in NOISE_TAGS:
+            return True
+        parent = parent.parent
+    return False
+
+def text_lines(root, skip=None):
+    """
+    Stripped text nodes under `root` in document order, without NOISE_TAGS
+    subtrees or elements for which `skip(node)` is true. Does not modify the tree.
+    """
+    lines = []
+    stack = [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        tag = node.tag
+        if tag == "-text":
+            chunk = node.text_content.strip()
+            if chunk:
+                lines.append(chunk)
+            continue
+        if tag in NOISE_TAGS or (skip is not None and node.is_element_node and skip(node)):
+            continue
+        children = []
+        child = node.child
+        while child is not None:
+            children.append(child)
+            child = child.next
+        stack.extend(reversed(children))
+    return lines
+
+class ParsedPage:
+    """
+    One parse of a page (lexbor, C-backed) shared by every consumer:
+    links for discovery, image candidates and cleaned text for extraction.
+    Nothing mutates the tree, so the same document can serve all of them.
+    """
+    def __init__(self, url, html):
+        self.url = url
+        self.html = html
+        self.tree = LexborHTMLParser(html)
+        self._text = None
+        self._pairs = None
+
+    def links(self, selector="a"):
+        return [urljoin(self.url, href) for node in self.tree.css(selector)
+                if (href := node.attributes.get("href"))]
+
+    def images(self):
+        """Absolute <img> srcs, skipping images inside NOISE_TAGS (logos, footer badges)."""
+        return [urljoin(self.url, src) for node in self.tree.css("img")
+                if (src := node.attributes.get("src")) and len(src) > MIN_IMG_SRC and not in_noise(node)]
+
+    def text(self):
+        """Visible text, one stripped text node per line, skipping NOISE_TAGS subtrees."""
+        if self._text is None:
+            self._text = "\n".join(text_lines(self.tree.root))
+        return self._text
+
+    def label_pairs(self):
+        """
+        Catalogue-style (label, value) pairs: <dt>/<dd>, two-cell table rows,
+        and inline "Label:" elements followed by their value.
+        """
+        if self._pairs is None:
+            pairs = []
+            for dt in self.tree.css("dt"):
+                dd = next_element(dt)
+                if dd is not None and dd.tag == "dd":
+                    pairs.append((node_text(dt), node_text(dd)))
+            for row in self.tree.css("tr"):
+                cells = [c for c in child_elements(row) if c.tag in ("th", "td")]
+                if len(cells) == 2:
+                    pairs.append((node_text(cells[0]), node_text(cells[1])))
+            for node in self.tree.css(INLINE_LABEL_TAGS):
+                if len(child_elements(node)) > 1:
+                    continue  # Containers, not labels (also keeps this linear on deeply nested pages)
+                label = node_text(node)
+                if not label.endswith(":") or len(label) > LABEL_MAX_CHARS:
+                    continue
+                sibling = next_element(node)
+                if sibling is not None:
+                    value = node_text(sibling)
+                else:
+                    # <p><strong>Date:</strong> 1920</p>
+                    parent = node_text(node.parent) if node.parent is not None else ""
+                    value = parent[len(label):].strip() if parent.startswith(label) else ""
+                pairs.append((label, value))
+            self._pairs = [(label.rstrip(":").strip(), value) for label, value in pairs
+                           if value and 0 < len(label) <= LABEL_MAX_CHARS]
+        return self._pairs
+
+# Parsed documents for the pages jobs are currently working on (keyed by URL + content)
+_PARSE_CACHE_SIZE = 16
+_parse_cache = OrderedDict()
+
+def parse_page(url, html):
+    """Returns the ParsedPage for this URL/HTML, parsing only on first use."""
+    key = (url, len(html), hash(html))
+    page = _parse_cache.get(key)
+    if page is None:
+        page = _parse_cache[key] = ParsedPage(url, html)
+        while len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    else:
+        _parse_cache.move_to_end(key)
+    return page
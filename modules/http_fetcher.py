@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import asyncio
+from contextlib import asynccontextmanager
+import httpx
+from modules.sites import site_key, USER_AGENT
+from modules.rate_limit import rate_limiter
+from modules.disk_cache import DiskCache
+from modules import metrics
+
+# Lightweight HTTP path for server-rendered museum pages (Playwright is the fallback)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+MIN_STATIC_TEXT = int(os.getenv("MIN_STATIC_TEXT", "400"))   # Visible chars below which we assume JS rendering
+
+# Page Cache (retries and re-extractions are served from disk)
+HTML_CACHE_DIR = os.getenv("HTML_CACHE_DIR", "data/cache/html")
+HTML_CACHE_MAX_MB = int(os.getenv("HTML_CACHE_MAX_MB", "256"))
+HTML_CACHE_FRESH_SECONDS = float(os.getenv("HTML_CACHE_FRESH_SECONDS", "86400"))  # Served without revalidating until this age
+
+# Signs that the static HTML is an empty JS shell
+_JS_SHELL_PATTERNS = [
+    re.compile(r"<div[^>]+id=[\"'](root|app|__next|__nuxt)[\"'][^>]*>\s*</div>", re.I),
+    re.compile(r"(please )?enable javascript", re.I),
+    re.compile(r"requires javascript", re.I),
+]
+_STRIP_BLOCKS = re.compile(r"<(script|style|noscript|template)\b[^>]*>.*?</\1>", re.I | re.S)
+_STRIP_TAGS = re.compile(r"<[^>]+>")
+
+class HttpFetcher:
+    """
+    Shared async HTTP client: pooled keep-alive connections, compressed
+    transfers, and an on-disk page cache revalidated with ETag / Last-Modified.
+    """
+    def __init__(self, cache_dir=HTML_CACHE_DIR, cache_max_bytes=HTML_CACHE_MAX_MB * 1024 * 1024):
+        self._client = None
+        self._cache_dir = cache_dir
+        self._cache_max_bytes = cache_max_bytes
+        self._cache = None
+        self.stats = {}                    # domain -> {"http": n, "browser": n, "cached": n, "escalated": n, "not_modified": n, "errors": n}
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = DiskCache(self._cache_dir, self._cache_max_bytes)
+        return self._cache
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT,
+                follow_redirects=True,
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-GB,en;q=0.9",
+                },
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    def record(self, url, path):
+        """Counts which path (http / browser / escalated / ...) served a domain."""
+        entry = self.stats.setdefault(site_key(url), {"http": 0, "browser": 0, "cached": 0, "escalated": 0, "not_modified": 0, "errors": 0})
+        entry[path] = entry.get(path, 0) + 1
+
+    async def cached_html(self, url, max_age=HTML_CACHE_FRESH_SECONDS):
+        """
+        The cached page if it is younger than `max_age`, as (html, meta), else None.
+        meta["rendered"] is True when the HTML came from the browser.
+        """
+        entry = await asyncio.to_thread(self.cache.get, url)
+        if not entry:
+            return None
+        body, meta, age = entry
+        if age > max_age:
+            return None
+        return body.decode("utf-8", errors="replace"), meta
+
+    async def store_rendered(self, url, html):
+        """Caches browser-rendered HTML so a retry does not need to render again."""
+        await asyncio.to_thread(self.cache.put, url, html, {"rendered": True})
+
+    async def fetch_html(self, url):
+        """
+        GETs `url`, revalidating against the cached copy when we have validators for it.
+        Returns the HTML text, or None on network/HTTP errors or non-HTML responses.
+        """
+        headers = {}
+        cached = await asyncio.to_thread(self.cache.get, url)
+        meta = cached[1] if cached else {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        await rate_limiter.acquire(url)
+        try:
+            r = await self.client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"[HTTP] ⚠️ {url}: {e}")
+            self.record(url, "errors")
+            return None
+        rate_limiter.feedback(url, r.status_code, r.headers.get("Retry-After"))
+        metrics.add(bytes=r.num_bytes_downloaded)
+
+        if r.status_code == 304 and cached:
+            self.record(url, "not_modified")
+            metrics.add(cache_hits=1)
+            await asyncio.to_thread(self.cache.touch, url)
+            return cached[0].decode("utf-8", errors="replace")
+        if r.status_code != 200 or "html" not in r.headers.get("Content-Type", "html"):
+            self.record(url, "errors")
+            return None
+
+        html = r.text
+        await asyncio.to_thread(self.cache.put, url, html, {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "content_type": r.headers.get("Content-Type"),
+            "rendered": False,
+        })
+        return html
+
+    async def fetch_json(self, url, max_age=HTML_CACHE_FRESH_SECONDS):
+        """GETs a JSON document (e.g. a IIIF manifest), served from the page cache while fresh. None on failure."""
+        cached = await asyncio.to_thread(self.cache.get, url)
+        if cached and cached[2] <= max_age:
+            try:
+                data = json.loads(cached[0])
+                metrics.add(cache_hits=1)
+                return data
+            except ValueError:
+                pass
+        await rate_limiter.acquire(url)
+        try:
+            r = await self.client.get(url, headers={"Accept": "application/ld+json, application/json;q=0.9, */*;q=0.5"})
+        except httpx.HTTPError as e:
+            print(f"[HTTP] ⚠️ {url}: {e}")
+            self.record(url, "errors")
+            return None
+        rate_limiter.feedback(url, r.status_code, r.headers.get("Retry-After"))
+        metrics.add(bytes=r.num_bytes_downloaded)
+        if r.status_code != 200:
+            self.record(url, "errors")
+            return None
+        try:
+            data = r.json()
+        except ValueError:
+            self.record(url, "errors")
+            return None
+        await asyncio.to_thread(self.cache.put, url, r.content, {"content_type": r.headers.get("Content-Type")})
+        return data
+
+    @asynccontextmanager
+    async def stream(self, url, **kwargs):
+        """Rate-limited streaming GET (binary downloads). Yields the httpx response."""
+        await rate_limiter.acquire(url)
+        async with self.client.stream("GET", url, **kwargs) as r:
+            rate_limiter.feedback(url, r.status_code, r.headers.get("Retry-After"))
+            yield r
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+def looks_complete(html, min_text=MIN_STATIC_TEXT):
+    """
+    Cheap check that static HTML already carries the page content
+    (enough visible text, not an empty SPA shell).
+    """
+    if not html:
+        return False
+    body = _STRIP_BLOCKS.sub(" ", html)
+    text = _STRIP_TAGS.sub(" ", body)
+    visible = len(" ".join(text.split()))
+    if visible < min_text:
+        return False
+    if visible < min_text * 4 and any(p.search(html) for p in _JS_SHELL_PATTERNS):
+        return False
+    return True
+
+# Global Instance
+http_fetcher = HttpFetcher()
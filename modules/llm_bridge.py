@@ -1,6 +1,16 @@
 import os
+import re
+import time
+import asyncio
+import threading
+from collections import namedtuple
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from google.adk.agents import Agent
+from google.adk.models import BaseLlm
+from modules.rate_limit import DomainBucket, parse_retry_after
+from modules.content import estimate_tokens
+from modules import metrics
 
 # Load environment variables
 load_dotenv()
@@ -8,30 +18,389 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Since the ADK models are Pydantic-based, we'll use a simpler 
-# instantiation pattern to avoid the __pydantic_private__ error.
+# Provider budgets (defaults are the free-tier limits of the models below)
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "12000"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "10"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# USD per million tokens (input, output), for cost tracking
+GROQ_PRICE = (float(os.getenv("GROQ_PRICE_IN", "0.59")), float(os.getenv("GROQ_PRICE_OUT", "0.79")))
+GEMINI_PRICE = (float(os.getenv("GEMINI_PRICE_IN", "0.10")), float(os.getenv("GEMINI_PRICE_OUT", "0.40")))
 
-class GroqFallbackClient:
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))                # Same-provider retries before falling back
+LLM_MAX_RETRY_WAIT = float(os.getenv("LLM_MAX_RETRY_WAIT", "30"))       # Longer Retry-After -> fall back instead
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))      # Consecutive failures that open the circuit
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))   # Seconds before a trial request
+LLM_OUTPUT_TOKENS = 1024      # Assumed reply size when reserving tokens-per-minute budget
+IMAGE_TOKENS = 258            # Gemini's flat cost for one image
+
+THROTTLE_STATUSES = {429, 503}
+TRANSIENT_STATUSES = THROTTLE_STATUSES | {408, 500, 502, 504}
+AUTH_STATUSES = {401, 403}    # Bad/revoked key: counts toward the breaker, never retried
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit is open (or no provider could take the request)."""
+
+# --- Circuit Breaker ---
+
+class CircuitBreaker:
     """
-    A simplified wrapper to provide the Groq model name 
-    and key to the agents without inheritance conflicts.
+    CLOSED -> OPEN after `threshold` consecutive failures; OPEN -> HALF_OPEN after
+    `cooldown` seconds, letting one trial request through; its outcome closes or re-opens.
+    A trial that never reports back is replaced by a new one after another `cooldown`.
     """
-    def __init__(self):
-        self.model = "groq/llama-3.3-70b-versatile"
-        self.api_key = GROQ_API_KEY
+    def __init__(self, threshold=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "CLOSED"
+        self.failures = 0
+        self.retry_at = 0.0
+        self.opened = 0
+
+    def allow(self, now):
+        if self.state in ("OPEN", "HALF_OPEN") and now >= self.retry_at:
+            self.state, self.retry_at = "HALF_OPEN", now + self.cooldown
+            return True     # The trial request
+        return self.state == "CLOSED"
+
+    def success(self):
+        self.state, self.failures = "CLOSED", 0
+
+    def failure(self, now):
+        self.failures += 1
+        if self.state == "HALF_OPEN" or self.failures >= self.threshold:
+            self.trip(now, self.cooldown)
+
+    def trip(self, now, seconds):
+        """Opens the circuit for `seconds` (e.g. a Retry-After too long to wait out)."""
+        if self.state != "OPEN":
+            self.opened += 1
+        self.state, self.retry_at = "OPEN", max(self.retry_at, now + seconds)
+
+# --- Providers ---
+
+def _error_status(error):
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def _retry_after(error):
+    """Seconds the provider asked us to wait (Retry-After header or Gemini's RetryInfo), or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "litellm_response_headers", None)
+    if headers:
+        delay = parse_retry_after(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+    match = _RETRY_DELAY.search(str(error))
+    return float(match.group(1)) if match else None
+
+class Provider:
+    """
+    One LLM provider: concurrency cap, request- and token-per-minute buckets
+    (429s pause them for Retry-After), and a circuit breaker. Shared by every
+    client and agent routed through it.
+    """
+    def __init__(self, name, model, api_key, concurrency, rpm, tpm, supports_images, price=(0.0, 0.0)):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.price = price
+        self.supports_images = supports_images
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.requests = DomainBucket(rpm / 60, max(1, concurrency))
+        self.tokens = DomainBucket(tpm / 60, tpm)
+        self.breaker = CircuitBreaker()
+        # Threading lock: the bot's loop reads stats while workers reserve; nothing awaits while it is held
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "throttled": 0, "fallbacks": 0, "waited_seconds": 0.0}
+
+    @asynccontextmanager
+    async def slot(self, est_tokens):
+        """Holds one of the provider's concurrent slots, after waiting for RPM/TPM budget."""
+        with self._lock:
+            if not self.breaker.allow(time.monotonic()):
+                raise ProviderUnavailable(f"{self.name} circuit open")
+        async with self._semaphore:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.requests.reserve(now), self.tokens.reserve(now, est_tokens))
+                self.stats["requests"] += 1
+                self.stats["waited_seconds"] += wait
+            if wait > 0:
+                if wait >= 1:
+                    print(f"[LLM] ⏳ Waiting {wait:.1f}s for {self.name} budget...")
+                await asyncio.sleep(wait)
+            yield
+
+    def succeeded(self):
+        with self._lock:
+            self.breaker.success()
+
+    def failed(self, error):
+        """
+        Records a failed call. Returns (retry_delay, paused): the delay is None when
+        retrying this provider is pointless; paused means the wait is already in the buckets.
+        """
+        status = _error_status(error)
+        # No status: network-level failure, unless it is a bug on our side
+        transient = status in TRANSIENT_STATUSES or (
+            status is None and not isinstance(error, (ValueError, TypeError, AttributeError, KeyError))
+        )
+        with self._lock:
+            now = time.monotonic()
+            self.stats["failures"] += 1
+            if transient or status in AUTH_STATUSES:
+                was_open = self.breaker.state == "OPEN"
+                self.breaker.failure(now)
+                if self.breaker.state == "OPEN" and not was_open:
+                    print(f"[LLM] 🔌 {self.name} circuit open for {self.breaker.cooldown:.0f}s ({error})")
+            if not transient:
+                # A bad request or a bug on our side says nothing about the provider's health:
+                # leave the breaker's outage count as it was
+                return None, False
+            delay = _retry_after(error)
+            if delay is None:
+                delay = min(LLM_MAX_RETRY_WAIT, 2.0 ** self.breaker.failures)
+            if status in THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                print(f"[LLM] 🐢 {self.name} returned {status}; backing off {delay:.0f}s")
+                if delay > LLM_MAX_RETRY_WAIT:
+                    # Too long to queue behind: send everyone to the fallback provider meanwhile
+                    self.breaker.trip(now, delay)
+                else:
+                    # Everyone queued on this provider waits, not just this caller
+                    self.requests.pause(now, delay)
+                return delay, True
+            return delay, False
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "model": self.model, "circuit": self.breaker.state,
+                    "circuit_opened": self.breaker.opened, "concurrency": self.concurrency}
+
+PROVIDERS = {
+    "gemini": Provider("gemini", "gemini-2.0-flash-exp", GEMINI_API_KEY,
+                       GEMINI_MAX_CONCURRENCY, GEMINI_RPM, GEMINI_TPM, supports_images=True, price=GEMINI_PRICE),
+    "groq": Provider("groq", "groq/llama-3.3-70b-versatile", GROQ_API_KEY,
+                     GROQ_MAX_CONCURRENCY, GROQ_RPM, GROQ_TPM, supports_images=False, price=GROQ_PRICE),
+}
+
+def _estimate(value):
+    """Rough token count of prompt contents (text, images, ADK/genai Content objects)."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return estimate_tokens(len(value))
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate(v) for v in value)
+    if hasattr(value, "parts"):
+        return _estimate(value.parts)
+    if getattr(value, "inline_data", None) is not None:
+        return IMAGE_TOKENS
+    return _estimate(getattr(value, "text", None))
+
+def _usage(chunk):
+    """(prompt, completion) token counts reported on a response chunk, or None."""
+    usage = getattr(chunk, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+        return usage.prompt_token_count, usage.candidates_token_count or 0
+    return None
+
+def _chunk_chars(chunk):
+    text = getattr(chunk, "text", None)
+    if isinstance(text, str):
+        return len(text)
+    content = getattr(chunk, "content", None)
+    return sum(len(p.text or "") for p in (getattr(content, "parts", None) or []))
 
-class GeminiFallbackClient:
+def _record_llm(span, provider, prompt_tokens, chunks_chars, usage):
+    tokens_in, tokens_out = usage or (prompt_tokens, estimate_tokens(chunks_chars))
+    price_in, price_out = provider.price
+    span.add(tokens_in=tokens_in, tokens_out=tokens_out, model=provider.model,
+             cost_usd=(tokens_in * price_in + tokens_out * price_out) / 1_000_000)
+
+def _has_images(value):
+    if isinstance(value, (list, tuple)):
+        return any(_has_images(v) for v in value)
+    if hasattr(value, "parts"):
+        return _has_images(value.parts)
+    return getattr(value, "inline_data", None) is not None
+
+async def _route(chain, contents, open_stream):
     """
-    A simplified wrapper for Gemini-specific tasks.
+    Streams from the first provider in `chain` that can serve the request.
+    Transient errors are retried on the same provider (up to LLM_MAX_RETRIES, when the
+    wait is short), then the next provider is tried. A stream that already produced
+    output is never replayed elsewhere: its error is raised to the caller.
     """
+    prompt_tokens = _estimate(contents)
+    est_tokens = prompt_tokens + LLM_OUTPUT_TOKENS
+    images = _has_images(contents)
+    last_error = None
+    for position, name in enumerate(chain):
+        provider = PROVIDERS[name]
+        if images and not provider.supports_images:
+            continue
+        if position and last_error is not None:
+            print(f"[LLM] ↪️ Falling back to {name} ({last_error})")
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            started = False
+            # Not made current: the consumer runs between our yields
+            span = metrics.start_span("llm", name)
+            chars, usage, retry_wait = 0, None, 0.0
+            try:
+                async with provider.slot(est_tokens):
+                    async for chunk in open_stream(provider):
+                        started = True
+                        chars += _chunk_chars(chunk)
+                        usage = _usage(chunk) or usage
+                        yield chunk
+                return
+            except ProviderUnavailable as e:
+                span.fail("skipped")
+                last_error = e
+                break
+            except Exception as e:
+                span.fail()
+                delay, paused = provider.failed(e)
+                if started:
+                    raise
+                last_error = e
+                if delay is None or delay > LLM_MAX_RETRY_WAIT or attempt == LLM_MAX_RETRIES:
+                    break
+                if not paused:
+                    retry_wait = delay
+            finally:
+                # Also runs when the caller stops reading early (GeneratorExit), which is not a failure
+                if started and span.outcome == "ok":
+                    provider.succeeded()
+                if span.outcome != "skipped":
+                    if started:
+                        _record_llm(span, provider, prompt_tokens, chars, usage)
+                    metrics.finish_span(span)
+            if retry_wait:
+                await asyncio.sleep(retry_wait)
+        provider.stats["fallbacks"] += 1
+    raise last_error or ProviderUnavailable("no provider can serve this request")
+
+# --- Provider Calls (SDKs loaded on first use) ---
+
+TextChunk = namedtuple("TextChunk", "text")
+_gemini_client = None
+_adk_backends = {}
+
+def _gemini():
+    global _gemini_client
+    if _gemini_client is None:
+        from google import genai
+        _gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+    return _gemini_client
+
+async def _gemini_stream(provider, contents, config):
+    stream = await _gemini().aio.models.generate_content_stream(model=provider.model, contents=contents, config=config)
+    async for chunk in stream:
+        yield chunk
+
+def _messages(contents):
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    text = "\n".join(p if isinstance(p, str) else (getattr(p, "text", None) or "") for p in parts)
+    return [{"role": "user", "content": text}]
+
+async def _litellm_stream(provider, contents, config):
+    import litellm
+    kwargs = {}
+    if config is not None and getattr(config, "response_mime_type", None) == "application/json":
+        kwargs["response_format"] = {"type": "json_object"}
+    response = await litellm.acompletion(model=provider.model, api_key=provider.api_key,
+                                         messages=_messages(contents), stream=True, **kwargs)
+    async for part in response:
+        text = part.choices[0].delta.content if part.choices else None
+        if text:
+            yield TextChunk(text)
+
+def _adk_backend(name):
+    """The ADK model that talks to `name` (Gemini natively, others through LiteLLM)."""
+    backend = _adk_backends.get(name)
+    if backend is None:
+        provider = PROVIDERS[name]
+        if name == "gemini":
+            from google.adk.models import Gemini
+            backend = Gemini(model=provider.model)
+        else:
+            from google.adk.models.lite_llm import LiteLlm
+            backend = LiteLlm(model=provider.model, api_key=provider.api_key)
+        _adk_backends[name] = backend
+    return backend
+
+class ResilientLlm(BaseLlm):
+    """ADK model routing every agent call through the provider chain (limits, breaker, fallback)."""
+    chain: list[str]
+
+    @classmethod
+    def supported_models(cls):
+        return []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        contents = [llm_request.contents, getattr(llm_request.config, "system_instruction", None)]
+
+        def open_stream(provider):
+            llm_request.model = provider.model
+            return _adk_backend(provider.name).generate_content_async(llm_request, stream=stream)
+
+        async for response in _route(self.chain, contents, open_stream):
+            yield response
+
+# --- Clients ---
+
+class _FallbackClient:
+    """Model name/key of the primary provider, plus calls routed through `chain`."""
+    chain = ()
+
     def __init__(self):
-        self.model = "gemini-2.0-flash-exp"
-        self.api_key = GEMINI_API_KEY
+        primary = PROVIDERS[self.chain[0]]
+        self.model = primary.model
+        self.api_key = primary.api_key
+        self._llm = None
+
+    @property
+    def llm(self):
+        """ADK model for Agent(model=...)."""
+        if self._llm is None:
+            self._llm = ResilientLlm(model=self.model, chain=list(self.chain))
+        return self._llm
+
+    async def generate_content_async(self, contents, config=None):
+        """Streams a reply to genai-style `contents` (chunks expose `.text`)."""
+        def open_stream(provider):
+            if provider.name == "gemini":
+                return _gemini_stream(provider, contents, config)
+            return _litellm_stream(provider, contents, config)
+
+        async for chunk in _route(self.chain, contents, open_stream):
+            yield chunk
+
+class GroqFallbackClient(_FallbackClient):
+    """Groq first (fast instruction following), Gemini when Groq is throttled or down."""
+    chain = ("groq", "gemini")
+
+class GeminiFallbackClient(_FallbackClient):
+    """Gemini first (vision, long context), Groq for text when Gemini is throttled or down."""
+    chain = ("gemini", "groq")
+
+def get_llm_provider_stats():
+    return {name: provider.snapshot() for name, provider in PROVIDERS.items()}
 
 # Helper function to create an agent with the right config
 def create_curator_agent(name, instructions, tools=None):
     """
-    Factory to create agents using the ADK standard while 
+    Factory to create agents using the ADK standard while
     ensuring keys are passed correctly.
     """
     # We use Gemini as the default for most agents for better reasoning
@@ -39,6 +408,5 @@ def create_curator_agent(name, instructions, tools=None):
         name=name,
         instructions=instructions,
         tools=tools or [],
-        model="gemini-2.0-flash-exp", # Direct string is safer in 2026 ADK
-        api_key=GEMINI_API_KEY
-    )
\ No newline at end of file
+        model=GeminiFallbackClient().llm
+    )
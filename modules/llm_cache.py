@@ -0,0 +1,130 @@
+import os
+import json
+import asyncio
+import hashlib
+from google.adk.models import LlmResponse
+from modules.disk_cache import DiskCache
+from modules import metrics
+
+# Content-addressed cache of LLM responses: identical model + prompt (+ image bytes)
+# on a retry or re-run costs no tokens and no latency.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "data/cache/llm")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Session state key: set it to True to make an agent's next model calls skip the cache
+LLM_CACHE_BYPASS_STATE = "temp:llm_cache_bypass"
+_PENDING_KEY_STATE = "temp:llm_cache_key"
+
+def _normalize_text(text):
+    return " ".join(text.split())
+
+def _fingerprint(value):
+    """JSON-able identity of prompt contents: normalized text, hashed inline bytes, dumped structures."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return _normalize_text(value)
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _fingerprint(v) for k, v in sorted(value.items())}
+    if hasattr(value, "parts"):
+        return {"role": getattr(value, "role", None), "parts": _fingerprint(value.parts)}
+    if getattr(value, "text", None) is not None:
+        return {"text": _normalize_text(value.text)}
+    blob = getattr(value, "inline_data", None)
+    if blob is not None:
+        return {"mime": blob.mime_type, "sha256": hashlib.sha256(blob.data or b"").hexdigest()}
+    if hasattr(value, "model_dump"):
+        return _fingerprint(value.model_dump(mode="json", exclude_none=True))
+    return repr(value)
+
+def cache_key(model, contents, extra=None):
+    payload = json.dumps({"model": model, "contents": _fingerprint(contents), "extra": _fingerprint(extra)},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LlmCache:
+    """TTL + size-bounded LRU over DiskCache, with hit/miss counters."""
+    def __init__(self, directory=LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                 ttl=LLM_CACHE_TTL_SECONDS, enabled=LLM_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._store = None
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0}
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = DiskCache(self.directory, self.max_bytes)
+        return self._store
+
+    async def get(self, key):
+        entry = await asyncio.to_thread(self.store.get, key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        body, _, age = entry
+        if age > self.ttl:
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            await asyncio.to_thread(self.store.delete, key)
+            return None
+        self.stats["hits"] += 1
+        metrics.add(cache_hits=1)
+        return body.decode("utf-8")
+
+    async def put(self, key, text, model=None):
+        await asyncio.to_thread(self.store.put, key, text, {"model": model})
+        self.stats["writes"] += 1
+
+    def snapshot(self):
+        disk = self.store.snapshot() if self._store is not None else {}
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": disk.get("entries", 0), "bytes": disk.get("bytes", 0), "enabled": self.enabled}
+
+llm_cache = LlmCache()
+
+# --- ADK agent hooks (before_model_callback / after_model_callback) ---
+
+def _request_key(llm_request):
+    config = getattr(llm_request, "config", None)
+    extra = None
+    if config is not None:
+        try:
+            extra = config.model_dump(mode="json", exclude_none=True)
+        except Exception:
+            extra = repr(getattr(config, "system_instruction", None))
+    return cache_key(llm_request.model, llm_request.contents, extra)
+
+async def cached_model_call(callback_context, llm_request):
+    """Serves an agent's model call from the cache; remembers the key so the response can be stored."""
+    state = callback_context.state
+    if not llm_cache.enabled or state.get(LLM_CACHE_BYPASS_STATE):
+        return None
+    key = _request_key(llm_request)
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return LlmResponse.model_validate_json(cached)
+    state[_PENDING_KEY_STATE] = key
+    return None
+
+async def store_model_response(callback_context, llm_response):
+    """Caches complete, error-free agent responses for the key remembered above."""
+    state = callback_context.state
+    key = state.get(_PENDING_KEY_STATE)
+    if not key or llm_response.partial or llm_response.error_code or not llm_response.content:
+        return None
+    state[_PENDING_KEY_STATE] = None
+    await llm_cache.put(key, llm_response.model_dump_json(exclude_none=True))
+    return None
+
+def get_llm_cache_stats():
+    return llm_cache.snapshot()
@@ -0,0 +1,154 @@
+import json
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
+
+# Structured model output: the schemas we ask the model to fill, and a streaming
+# JSON reader that replaces the ad-hoc fence stripping + json.loads in every caller.
+
+# --- Schemas ---
+
+_RECORD_TEXT_FIELDS = ("title", "accession_number", "creator", "subject", "spatial", "temporal", "desc")
+
+class ArtifactRecord(BaseModel):
+    """Dublin Core draft for one museum object page."""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    title: Optional[str] = None
+    accession_number: Optional[str] = None
+    creator: Optional[str] = None
+    subject: Optional[str] = Field(None, description="Category")
+    spatial: Optional[str] = Field(None, description="Location / place of origin")
+    temporal: Optional[str] = Field(None, description="Date or period")
+    desc: Optional[str] = Field(None, description="Description")
+    media_urls: list[str] = Field(default_factory=list, description="High-resolution object images")
+
+    @field_validator(*_RECORD_TEXT_FIELDS, mode="before")
+    @classmethod
+    def _join_lists(cls, value):
+        # "creator": ["A", "B"] -> "A; B"
+        if isinstance(value, list):
+            return "; ".join(str(v) for v in value if v) or None
+        return value
+
+    def to_dict(self):
+        return self.model_dump(exclude_none=True)
+
+class PageRecord(ArtifactRecord):
+    """ArtifactRecord tagged with the page it belongs to (batched extraction)."""
+    page_id: str
+
+RECORD_FIELDS = frozenset(ArtifactRecord.model_fields)
+
+class CoordinatorDecision(BaseModel):
+    """The CoordinatorAgent's assignment. `reasoning` comes last so it can be cut short."""
+    action: Literal["ARCHIVE_JOB", "REVIEW_JOB", "ANALYZE_JOB", "EXTRACT_JOB", "DISCOVER_JOB", "SLEEP"]
+    target_id: Optional[str] = None
+    reasoning: Optional[str] = None
+
+def json_config(schema):
+    """Generation config asking for JSON constrained to `schema` (a model class or list[...] of one)."""
+    from google.genai import types   # Only needed here; the parsing below works without the SDK
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=schema)
+
+def schema_fingerprint(schema):
+    """JSON schema of `schema` (part of the LLM cache key, so a schema change is a cache miss)."""
+    return TypeAdapter(schema).json_schema()
+
+# --- Incremental Parsing ---
+
+class JsonStream:
+    """
+    Reads one JSON object or array from streamed text, one chunk at a time.
+    Text before the opening bracket (markdown fences, prose) is skipped. Each
+    top-level member (object key or array element) is decoded as soon as its
+    closing comma/bracket arrives, so callers can stop the stream early.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.kind = None         # "object" | "array"
+        self.members = {}        # Completed top-level keys (object)
+        self.items = []          # Completed top-level elements (array)
+        self.done = False
+        self.malformed = 0       # Members that failed to decode
+        self._pos = 0
+        self._start = None
+        self._end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        text = self.buffer
+        for i in range(self._pos, len(text)):
+            if self.done:
+                break
+            c = text[i]
+            if self._start is None:
+                if c in "{[":
+                    self._start, self._depth, self._member_start = i, 1, i + 1
+                    self.kind = "object" if c == "{" else "array"
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_member(i)
+                    self.done, self._end = True, i + 1
+            elif c == "," and self._depth == 1:
+                self._close_member(i)
+                self._member_start = i + 1
+        self._pos = len(text)
+        return self
+
+    def _close_member(self, end):
+        segment = self.buffer[self._member_start:end].strip()
+        if not segment:
+            return
+        try:
+            if self.kind == "object":
+                self.members.update(json.loads("{" + segment + "}"))
+            else:
+                self.items.append(json.loads(segment))
+        except ValueError:
+            self.malformed += 1
+
+    def has(self, keys):
+        return all(key in self.members for key in keys)
+
+    def value(self):
+        """The whole document once closed, else what has been decoded so far (None before it starts)."""
+        if self.done:
+            try:
+                return json.loads(self.buffer[self._start:self._end])
+            except ValueError:
+                pass
+        if self.kind is None:
+            return None
+        return dict(self.members) if self.kind == "object" else list(self.items)
+
+def extract_json(text):
+    """First complete JSON object/array in `text` (fenced or wrapped in prose), or None."""
+    stream = JsonStream().feed(text or "")
+    return stream.value() if stream.done else None
+
+def parse_model(schema, text):
+    """Validates the JSON in a model reply into `schema`. Raises ValueError when there is none or it doesn't fit."""
+    data = extract_json(text)
+    if data is None:
+        raise ValueError("no JSON document in reply")
+    try:
+        return TypeAdapter(schema).validate_python(data)
+    except ValidationError as e:
+        raise ValueError(f"reply does not match {getattr(schema, '__name__', schema)}: {e.error_count()} errors") from e
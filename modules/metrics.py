@@ -0,0 +1,271 @@
+import os
+import json
+import math
+import time
+import asyncio
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from modules import db_async as adb
+
+# Tracing for stage jobs, agent runs, tool calls and LLM calls: latency, tokens,
+# cost, bytes fetched and cache hits, keyed by artifact and stage.
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "30"))   # Rows are written to stage_metrics in batches
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "500"))                  # Recent durations kept per span name for p50/p95
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))                        # HTTP endpoint port (0 = disabled)
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_MAX_PENDING = 5000    # Unwritten rows kept while the DB is unreachable (oldest dropped first)
+
+_current = ContextVar("metrics_span", default=None)
+
+class Span:
+    """One timed unit of work. Usage recorded on a span also counts for every span enclosing it."""
+    def __init__(self, kind, name, parent=None, artifact_id=None, stage=None):
+        self.kind = kind                # stage | agent | tool | llm
+        self.name = name
+        self.parent = parent
+        self.artifact_id = artifact_id or (parent.artifact_id if parent else None)
+        self.stage = stage or (parent.stage if parent else None)
+        self.model = None
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.cost_usd = 0.0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.outcome = "ok"
+        self.started_at = time.time()
+        self.duration = 0.0
+        self._t0 = time.perf_counter()
+
+    def add(self, tokens_in=0, tokens_out=0, cost_usd=0.0, bytes=0, cache_hits=0, model=None):
+        span = self
+        while span is not None:
+            span.tokens_in += tokens_in
+            span.tokens_out += tokens_out
+            span.cost_usd += cost_usd
+            span.bytes += bytes
+            span.cache_hits += cache_hits
+            if model and span.model is None:
+                span.model = model
+            span = span.parent
+
+    def fail(self, outcome="error"):
+        if self.outcome == "ok":
+            self.outcome = outcome
+
+    def row(self):
+        return {
+            "artifact_id": self.artifact_id, "stage": self.stage, "kind": self.kind, "name": self.name,
+            "model": self.model, "started_at": self.started_at, "duration_ms": int(self.duration * 1000),
+            "tokens_in": self.tokens_in, "tokens_out": self.tokens_out, "cost_usd": round(self.cost_usd, 6),
+            "bytes_fetched": self.bytes, "cache_hits": self.cache_hits, "outcome": self.outcome,
+        }
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+class MetricsRecorder:
+    """Aggregates finished spans per (kind, name) and buffers their rows for stage_metrics."""
+    def __init__(self, window=METRICS_WINDOW, max_pending=METRICS_MAX_PENDING):
+        self.window = window
+        self._durations = {}    # (kind, name) -> deque of recent seconds
+        self._totals = {}       # (kind, name) -> counters
+        self._pending = deque(maxlen=max_pending)
+        # Threading lock: the bot's loop reads snapshots while workers record
+        self._lock = threading.Lock()
+
+    def finish(self, span):
+        span.duration = time.perf_counter() - span._t0
+        key = (span.kind, span.name)
+        with self._lock:
+            self._durations.setdefault(key, deque(maxlen=self.window)).append(span.duration)
+            t = self._totals.setdefault(key, {"calls": 0, "errors": 0, "seconds": 0.0, "tokens_in": 0,
+                                              "tokens_out": 0, "cost_usd": 0.0, "bytes": 0, "cache_hits": 0})
+            t["calls"] += 1
+            t["errors"] += span.outcome != "ok"
+            t["seconds"] += span.duration
+            t["tokens_in"] += span.tokens_in
+            t["tokens_out"] += span.tokens_out
+            t["cost_usd"] += span.cost_usd
+            t["bytes"] += span.bytes
+            t["cache_hits"] += span.cache_hits
+            self._pending.append(span.row())
+
+    def drain(self):
+        with self._lock:
+            rows = list(self._pending)
+            self._pending.clear()
+        return rows
+
+    def requeue(self, rows):
+        """Puts back rows that could not be written (newer rows win if the buffer is full)."""
+        with self._lock:
+            room = self._pending.maxlen - len(self._pending)
+            if room > 0:
+                self._pending.extendleft(reversed(rows[-room:]))
+
+    def snapshot(self):
+        """kind -> name -> {calls, errors, p50_s, p95_s, avg_s, tokens, cost, bytes, cache hits} for this process."""
+        with self._lock:
+            out = {}
+            for (kind, name), t in self._totals.items():
+                recent = list(self._durations[(kind, name)])
+                out.setdefault(kind, {})[name] = {
+                    **t,
+                    "seconds": round(t["seconds"], 3),
+                    "cost_usd": round(t["cost_usd"], 6),
+                    "avg_s": round(t["seconds"] / t["calls"], 3),
+                    "p50_s": round(percentile(recent, 0.5), 3),
+                    "p95_s": round(percentile(recent, 0.95), 3),
+                }
+            return out
+
+recorder = MetricsRecorder()
+
+# --- Tracing API ---
+
+def start_span(kind, name, artifact_id=None, stage=None):
+    """A child of the current span that is NOT made current (for work spread over async generators)."""
+    return Span(kind, name, _current.get(), artifact_id, stage)
+
+def finish_span(span, outcome=None):
+    if outcome:
+        span.fail(outcome)
+    recorder.finish(span)
+
+@contextmanager
+def span(kind, name, artifact_id=None, stage=None):
+    """Times the enclosed block as the current span (tasks created inside inherit it)."""
+    s = start_span(kind, name, artifact_id, stage)
+    token = _current.set(s)
+    try:
+        yield s
+    except asyncio.CancelledError:
+        s.fail("cancelled")
+        raise
+    except asyncio.TimeoutError:
+        s.fail("timeout")
+        raise
+    except BaseException:
+        s.fail("error")
+        raise
+    finally:
+        _current.reset(token)
+        recorder.finish(s)
+
+def traced(kind="tool", name=None):
+    """Decorator for async tools: one span per call; an "ERROR..." result counts as a failure."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(kind, label) as s:
+                result = await fn(*args, **kwargs)
+                if isinstance(result, str) and result.startswith("ERROR"):
+                    s.fail()
+                return result
+        return wrapper
+    return decorate
+
+def add(**usage):
+    """Records usage (tokens_in/out, cost_usd, bytes, cache_hits, model) on the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.add(**usage)
+
+def get_metrics():
+    return recorder.snapshot()
+
+# --- Persistence ---
+
+async def flush(worker_id):
+    rows = recorder.drain()
+    if not rows:
+        return 0
+    try:
+        await adb.save_stage_metrics(worker_id, rows)
+    except Exception as e:
+        recorder.requeue(rows)
+        print(f"[Metrics] ⚠️ Could not write {len(rows)} rows: {e}")
+        return 0
+    return len(rows)
+
+async def flush_loop(worker_id, interval=METRICS_FLUSH_SECONDS):
+    """Writes buffered spans to stage_metrics until cancelled (then writes what is left)."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush(worker_id)
+    finally:
+        await asyncio.shield(flush(worker_id))
+
+# --- HTTP Endpoint ---
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def render_prometheus(snapshot=None):
+    """Prometheus text exposition of this process's span metrics."""
+    snapshot = snapshot if snapshot is not None else recorder.snapshot()
+    lines = [
+        "# TYPE curator_span_seconds summary",
+        "# TYPE curator_span_errors_total counter",
+        "# TYPE curator_llm_tokens_total counter",
+        "# TYPE curator_llm_cost_usd_total counter",
+        "# TYPE curator_bytes_fetched_total counter",
+        "# TYPE curator_cache_hits_total counter",
+    ]
+    for kind, names in sorted(snapshot.items()):
+        for name, m in sorted(names.items()):
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            lines += [
+                f'curator_span_seconds{{{labels},quantile="0.5"}} {m["p50_s"]}',
+                f'curator_span_seconds{{{labels},quantile="0.95"}} {m["p95_s"]}',
+                f"curator_span_seconds_sum{{{labels}}} {m['seconds']}",
+                f"curator_span_seconds_count{{{labels}}} {m['calls']}",
+                f"curator_span_errors_total{{{labels}}} {m['errors']}",
+                f'curator_llm_tokens_total{{{labels},direction="in"}} {m["tokens_in"]}',
+                f'curator_llm_tokens_total{{{labels},direction="out"}} {m["tokens_out"]}',
+                f"curator_llm_cost_usd_total{{{labels}}} {m['cost_usd']}",
+                f"curator_bytes_fetched_total{{{labels}}} {m['bytes']}",
+                f"curator_cache_hits_total{{{labels}}} {m['cache_hits']}",
+            ]
+    return "\n".join(lines) + "\n"
+
+async def _handle_request(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass  # Headers are not needed
+        parts = request_line.decode("latin-1").split()
+        path = parts[1].split("?", 1)[0] if len(parts) > 1 else "/"
+        if path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", render_prometheus()
+        elif path == "/metrics.json":
+            status, content_type, body = "200 OK", "application/json", json.dumps(recorder.snapshot())
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves /metrics (Prometheus) and /metrics.json until cancelled."""
+    server = await asyncio.start_server(_handle_request, host, port)
+    print(f"[Metrics] 📈 Serving /metrics on {host}:{port}")
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from modules.sites import site_key, get_site_profile
+
+# Politeness Defaults (override per museum with `rate_per_second` / `burst` in SITE_PROFILES)
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "0.2"))        # One request every 5s per domain
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "1"))      # Requests allowed back-to-back after idling
+RATE_LIMIT_MIN_FACTOR = 0.125                                     # Adaptive slowdown floor (1/8 of the configured rate)
+RATE_LIMIT_MAX_BACKOFF = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "600"))  # Cap on honoured Retry-After
+THROTTLE_STATUSES = {429, 503}
+
+def parse_retry_after(value):
+    """Retry-After as seconds (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class DomainBucket:
+    """Token bucket for one domain. Tokens may go negative: each caller reserves its slot."""
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.stats = {"requests": 0, "waited_seconds": 0.0, "throttled": 0}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now, cost=1):
+        """Takes `cost` tokens and returns how long the caller must wait before using them."""
+        self._refill(now)
+        self.tokens -= cost
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def pause(self, now, seconds):
+        """Pushes every not-yet-reserved slot back by `seconds` (callers stay staggered)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+class RateLimiter:
+    """
+    Per-domain politeness shared by the browser, the HTTP fetcher and image downloads.
+    Slots are reserved under a lock, so concurrent tasks for one museum queue up
+    instead of racing, while different museums proceed in parallel.
+    429/503 responses halve the domain's rate (and honour Retry-After);
+    successful responses slowly restore it.
+    """
+    def __init__(self, rate=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST):
+        self.default_rate = rate
+        self.default_burst = burst
+        self._buckets = {}
+        # Threading lock: the bot's loop and the worker loop share this instance; nothing awaits while it is held
+        self._lock = threading.Lock()
+
+    def _bucket(self, key, url):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            profile = get_site_profile(url)
+            rate = float(profile.get("rate_per_second") or self.default_rate)
+            burst = float(profile.get("burst") or self.default_burst)
+            bucket = self._buckets[key] = DomainBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url):
+        """Waits for this domain's next request slot."""
+        key = site_key(url)
+        with self._lock:
+            bucket = self._bucket(key, url)
+            wait = bucket.reserve(time.monotonic())
+            bucket.stats["requests"] += 1
+            bucket.stats["waited_seconds"] += wait
+        if wait > 0:
+            if wait >= 1:
+                print(f"[Politeness] ⏳ Waiting {wait:.2f}s for {key}...")
+            await asyncio.sleep(wait)
+
+    def feedback(self, url, status, retry_after=None):
+        """Adapts the domain's rate to the response it just served."""
+        key = site_key(url)
+        with self._lock:
+            bucket = self._bucket(key, url)
+            if status in THROTTLE_STATUSES:
+                bucket.stats["throttled"] += 1
+                bucket.rate = max(bucket.base_rate * RATE_LIMIT_MIN_FACTOR, bucket.rate / 2)
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = 1 / bucket.rate
+                delay = min(delay, RATE_LIMIT_MAX_BACKOFF)
+                bucket.pause(time.monotonic(), delay)
+                print(f"[Politeness] 🐢 {key} returned {status}; backing off {delay:.0f}s at {bucket.rate:.3f} req/s")
+            elif status and status < 400 and bucket.rate < bucket.base_rate:
+                bucket.rate = min(bucket.base_rate, bucket.rate * 1.1)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {**b.stats, "rate": round(b.rate, 3), "base_rate": b.base_rate}
+                    for key, b in self._buckets.items()}
+
+# Global Instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,79 @@
+import os
+from modules import db_async as adb
+from modules.db import PIPELINE_STAGES
+
+# "rules" dispatches straight from queue counts; "llm" asks the CoordinatorAgent.
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "rules").lower()
+
+# Same order as the CoordinatorAgent protocol (Downstream > Upstream).
+# Higher weight is served first; a weight of 0 disables the stage.
+DEFAULT_STAGE_WEIGHTS = {
+    "archive": 50,
+    "review": 40,
+    "analyze": 30,
+    "extract": 20,
+}
+
+STAGE_ACTIONS = {
+    "archive": "ARCHIVE_JOB",
+    "review": "REVIEW_JOB",
+    "analyze": "ANALYZE_JOB",
+    "extract": "EXTRACT_JOB",
+}
+
+def parse_stage_map(raw, defaults, cast=float, label="value"):
+    """
+    Parses per-stage settings like "archive=50,review=40,extract=20".
+    Unknown stages are ignored; missing ones keep their defaults.
+    """
+    values = dict(defaults)
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        stage, value = (x.strip() for x in item.split("=", 1))
+        if stage in values:
+            try:
+                values[stage] = cast(value)
+            except ValueError:
+                print(f"[Scheduler] ⚠️ Ignoring bad {label} '{item}'")
+    return values
+
+def load_stage_weights(raw=None):
+    """Stage weights from SCHEDULER_WEIGHTS (see DEFAULT_STAGE_WEIGHTS)."""
+    raw = raw if raw is not None else os.getenv("SCHEDULER_WEIGHTS", "")
+    return parse_stage_map(raw, DEFAULT_STAGE_WEIGHTS, float, "weight")
+
+class RuleScheduler:
+    """
+    Deterministic replacement for the per-dispatch Coordinator LLM call.
+    Reads `artifact_queue` counts, walks stages by weight and claims the
+    oldest waiting artifacts for every stage pool that has room.
+    """
+    def __init__(self, weights=None):
+        self.weights = weights or load_stage_weights()
+        self.order = [
+            stage for stage, w in sorted(self.weights.items(), key=lambda kv: kv[1], reverse=True)
+            if w > 0
+        ]
+
+    async def fill(self, executor, worker_id):
+        """
+        Claims as much work as the stage pools can accept, highest weight first,
+        in one claim_next() round-trip per stage. Returns the number of artifacts
+        dispatched and the counts it planned from.
+        """
+        counts = await adb.get_queue_counts()
+        dispatched = 0
+        for stage in self.order:
+            waiting_status = PIPELINE_STAGES[stage][0]
+            waiting = counts.get(waiting_status, 0)
+            if waiting <= 0:
+                continue
+            room = executor.capacity(stage, counts)
+            if room <= 0:
+                continue
+            claimed = await adb.claim_next(stage, worker_id, min(room, waiting))
+            for row in claimed:
+                await executor.submit(stage, row)
+            dispatched += len(claimed)
+        return dispatched, counts
@@ -1,30 +1,155 @@
+import os
+import time
+import threading
+from collections import OrderedDict
 from google.adk.sessions import InMemorySessionService
 from google.adk import Runner
 
+# Memory Limits
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "200"))   # LRU cap on live sessions
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))  # Idle sessions are dropped after this
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", "60"))        # Compact histories longer than this
+SESSION_KEEP_EVENTS = int(os.getenv("SESSION_KEEP_EVENTS", "20"))      # ...down to roughly this many
+
+class SessionManager:
+    """
+    Bounded bookkeeping around the global InMemorySessionService:
+    LRU + TTL eviction, explicit release for finished artifacts,
+    and history compaction so long-lived sessions (e.g. the coordinator)
+    stop growing their prompt on every turn.
+    """
+    def __init__(self, service, max_resident=SESSION_MAX_RESIDENT, ttl=SESSION_TTL_SECONDS,
+                 max_events=SESSION_MAX_EVENTS, keep_events=SESSION_KEEP_EVENTS):
+        self.service = service
+        self.max_resident = max_resident
+        self.ttl = ttl
+        self.max_events = max_events
+        self.keep_events = keep_events
+        self._resident = OrderedDict()   # (app, user, session_id) -> last_used
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "evicted_lru": 0, "evicted_ttl": 0, "released": 0, "compacted_events": 0}
+
+    def _stored(self, key):
+        """The live Session object (the public get_session() returns a deep copy)."""
+        app, user, sid = key
+        return getattr(self.service, "sessions", {}).get(app, {}).get(user, {}).get(sid)
+
+    async def ensure(self, session_id, user_id, app_name):
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            known = key in self._resident
+            self._resident[key] = time.monotonic()
+            self._resident.move_to_end(key)
+
+        if not known:
+            exists = await self.service.get_session(session_id=session_id, user_id=user_id, app_name=app_name)
+            if not exists:
+                await self.service.create_session(session_id=session_id, user_id=user_id, app_name=app_name)
+                self.stats["created"] += 1
+        else:
+            self.compact(key)
+        await self.evict()
+
+    def compact(self, key):
+        """
+        Drops the oldest events once a history exceeds max_events.
+        Cuts only at a user turn so tool call/response pairs stay intact.
+        """
+        session = self._stored(key)
+        if not session or len(session.events) <= self.max_events:
+            return 0
+        events = session.events
+        start = len(events) - self.keep_events
+        while start < len(events) and getattr(events[start], "author", None) != "user":
+            start += 1
+        if start >= len(events):
+            return 0
+        session.events = events[start:]
+        self.stats["compacted_events"] += start
+        return start
+
+    async def _delete(self, key):
+        app, user, sid = key
+        try:
+            await self.service.delete_session(app_name=app, user_id=user, session_id=sid)
+        except Exception as e:
+            print(f"[Sessions] ⚠️ Could not delete {sid}: {e}")
+
+    async def evict(self):
+        now = time.monotonic()
+        victims = []
+        with self._lock:
+            for key, last_used in list(self._resident.items()):
+                if now - last_used > self.ttl:
+                    victims.append(key)
+                    self.stats["evicted_ttl"] += 1
+            for key in victims:
+                del self._resident[key]
+            while len(self._resident) > self.max_resident:
+                key, _ = self._resident.popitem(last=False)
+                victims.append(key)
+                self.stats["evicted_lru"] += 1
+        for key in victims:
+            await self._delete(key)
+
+    async def release(self, session_id, user_id, app_name):
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            tracked = self._resident.pop(key, None) is not None
+        if tracked:
+            self.stats["released"] += 1
+            await self._delete(key)
+
+    def snapshot(self):
+        with self._lock:
+            keys = list(self._resident)
+        events = 0
+        for key in keys:
+            session = self._stored(key)
+            events += len(session.events) if session else 0
+        return {"resident_sessions": len(keys), "resident_events": events, **self.stats}
+
 _global_session_service = InMemorySessionService()
+session_manager = SessionManager(_global_session_service)
+
+# Runners hold no per-call state, so one per (agent, app) is shared by all tasks and threads
+_runner_cache = {}
+_runner_lock = threading.Lock()
 
 def get_agent_runner(agent, session_id: str, user_id: str = "admin", app_name: str = "IgboCurator") -> Runner:
     """
-    Factory function that returns a Runner connected to the GLOBAL memory.
+    Returns the cached Runner for this agent, connected to the GLOBAL memory.
+    The session is chosen per call in `runner.run_async(...)`, so the same
+    Runner serves every artifact.
     
     Args:
         agent: The ADK Agent instance (e.g., visual_analyst_agent)
         session_id: The unique ID for the conversation (e.g., "artifact_PRM_12345")
     """
-    return Runner(
-        agent=agent,
-        session_service=_global_session_service,
-        app_name=app_name
-    )
+    key = (id(agent), agent.name, app_name)
+    runner = _runner_cache.get(key)
+    if runner is None:
+        with _runner_lock:
+            runner = _runner_cache.get(key)
+            if runner is None:
+                runner = Runner(
+                    agent=agent,
+                    session_service=_global_session_service,
+                    app_name=app_name
+                )
+                _runner_cache[key] = runner
+    return runner
 
 async def create_session_if_needed(session_id: str, user_id: str = "admin", app_name: str = "IgboCurator"):
     """
-    Ensures a session exists in the global memory service.
+    Ensures a session exists in the global memory service
+    (and keeps the resident set within its LRU/TTL/history limits).
     """
-    exists = await _global_session_service.get_session(session_id=session_id, user_id=user_id, app_name=app_name)
-    if not exists:
-        await _global_session_service.create_session(
-            session_id=session_id,
-            user_id=user_id,
-            app_name=app_name
-        )
\ No newline at end of file
+    await session_manager.ensure(session_id, user_id, app_name)
+
+async def release_artifact_session(artifact_id: str, user_id: str = "admin", app_name: str = "IgboCurator"):
+    """Frees an artifact's conversation once it is ARCHIVED, REJECTED or FAILED."""
+    await session_manager.release(f"artifact_{artifact_id}", user_id, app_name)
+
+def get_session_stats():
+    return session_manager.snapshot()
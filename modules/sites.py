@@ -0,0 +1,66 @@
+import os
+import json
+from urllib.parse import urlparse
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+# Per-museum crawl settings. Override any key per domain via SITE_PROFILES
+# (inline JSON or a path to a JSON file), e.g.
+#   {"collections.example.org": {"block_resources": false}}
+DEFAULT_SITE_PROFILE = {
+    # Pages only render client-side: skip the HTTP fast path and go straight to the browser
+    "js_rendered": False,
+    # Skip heavy sub-resources the scraper never reads (we only need DOM text and <img src>)
+    "block_resources": True,
+    "blocked_resource_types": ["image", "media", "font"],
+    "blocked_domains": [],
+    # Page readiness: a CSS selector that marks the object record as rendered (e.g. ".object-detail"),
+    # otherwise whichever comes first of network idle / DOM quiet for ready_quiet_ms; never longer than ready_timeout
+    "ready_selector": None,
+    "ready_quiet_ms": 500,
+    "ready_timeout": 8.0,
+    # Politeness: requests/second and burst for this museum (None = RATE_LIMIT_RPS / RATE_LIMIT_BURST)
+    "rate_per_second": None,
+    "burst": None,
+}
+
+# Analytics/ads/trackers: never needed to render object pages
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "facebook.com", "connect.facebook.net", "hotjar.com", "hotjar.io",
+    "clarity.ms", "segment.io", "segment.com", "newrelic.com", "nr-data.net",
+    "matomo.cloud", "quantserve.com", "scorecardresearch.com", "twitter.com", "addthis.com",
+    "sharethis.com", "cookiebot.com", "onetrust.com", "cookielaw.org"
+] + [d.strip() for d in os.getenv("BLOCKED_DOMAINS", "").split(",") if d.strip()]
+
+def _load_profiles():
+    raw = os.getenv("SITE_PROFILES", "").strip()
+    if not raw:
+        return {}
+    try:
+        if not raw.startswith("{"):
+            with open(raw, encoding="utf-8") as f:
+                raw = f.read()
+        return {k.lower(): v for k, v in json.loads(raw).items()}
+    except Exception as e:
+        print(f"[Sites] ⚠️ Could not load SITE_PROFILES: {e}")
+        return {}
+
+SITE_PROFILES = _load_profiles()
+
+def site_key(url):
+    """Normalized domain used to key per-museum settings and stats."""
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+def host_matches(host, domain):
+    return host == domain or host.endswith("." + domain)
+
+def get_site_profile(url):
+    """DEFAULT_SITE_PROFILE merged with the most specific matching override."""
+    host = site_key(url)
+    profile = dict(DEFAULT_SITE_PROFILE)
+    matches = [d for d in SITE_PROFILES if host_matches(host, d)]
+    if matches:
+        profile.update(SITE_PROFILES[max(matches, key=len)])
+    return profile
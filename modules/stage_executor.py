@@ -0,0 +1,227 @@
+import os
+import asyncio
+from modules import db_async as adb
+from modules import metrics
+from modules.db import PIPELINE_STAGES, LEASE_SECONDS
+from modules.scheduler import parse_stage_map
+
+# Extraction is browser-bound, analysis LLM-bound, archiving upload-bound:
+# each stage gets its own worker pool so a burst of one cannot starve the others.
+DEFAULT_STAGE_CONCURRENCY = {
+    "extract": 2,
+    "analyze": 3,
+    "review": 1,
+    "archive": 2,
+}
+
+# Claimed-but-not-started artifacts each stage may hold in memory.
+DEFAULT_STAGE_QUEUE_DEPTH = {
+    "extract": 2,
+    "analyze": 3,
+    "review": 5,
+    "archive": 2,
+}
+
+# Where a stage's output lands; used for backpressure.
+# Review hands off to a human, so nothing downstream of it is automatic.
+DOWNSTREAM_STAGE = {
+    "extract": "analyze",
+    "analyze": "review",
+    "review": None,
+    "archive": None,
+}
+
+# Hard wall-clock cap per job; a timed-out job counts as a failed attempt.
+DEFAULT_STAGE_TIMEOUT = {
+    "extract": 300,
+    "analyze": 600,
+    "review": 120,
+    "archive": 600,
+}
+
+# Pause an upstream stage once this many artifacts wait (in the DB) for its downstream stage.
+STAGE_BACKLOG_LIMIT = int(os.getenv("STAGE_BACKLOG_LIMIT", "25"))
+
+class StagePool:
+    """A bounded async queue drained by a fixed number of workers."""
+    def __init__(self, name, handler, concurrency, max_queue, timeout, worker_id, on_terminal=None):
+        self.name = name
+        self.on_terminal = on_terminal
+        self.handler = handler
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.worker_id = worker_id
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.queued_ids = set()
+        self.running = {}   # artifact_id -> job task
+        self._lease_lost = set()
+        self.stats = {"done": 0, "failed": 0, "timed_out": 0, "lease_lost": 0}
+        self._workers = []
+
+    @property
+    def active(self):
+        return len(self.running)
+
+    def held_ids(self):
+        """Artifacts this pool holds a lease on (queued or running)."""
+        return self.queued_ids | set(self.running)
+
+    def start(self):
+        for i in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(i), name=f"{self.name}-{i}"))
+
+    def free_slots(self):
+        return self.queue.maxsize - self.queue.qsize()
+
+    def load(self):
+        return self.queue.qsize() + self.active
+
+    def saturated(self):
+        return self.load() >= self.concurrency + self.queue.maxsize
+
+    def cancel(self, artifact_id):
+        """Stops a job whose lease was reclaimed by the reaper (running, or still waiting in the queue)."""
+        job = self.running.get(artifact_id)
+        if job and not job.done():
+            self.stats["lease_lost"] += 1
+            self._lease_lost.add(artifact_id)
+            job.cancel()
+        elif artifact_id in self.queued_ids:
+            # Another worker may already own it; _worker drops the row instead of running it
+            self.stats["lease_lost"] += 1
+            self._lease_lost.add(artifact_id)
+            self.queued_ids.discard(artifact_id)
+
+    async def _worker(self, index):
+        while True:
+            row = await self.queue.get()
+            artifact_id = row["id"]
+            self.queued_ids.discard(artifact_id)
+            if artifact_id in self._lease_lost:
+                self._lease_lost.discard(artifact_id)
+                self.queue.task_done()
+                print(f"⚠️ [{self.name}] Lease lost for {artifact_id} while queued, dropped.")
+                continue
+            try:
+                # The job task inherits the stage span, so its agent/tool/LLM spans are keyed to this artifact
+                with metrics.span("stage", self.name, artifact_id=artifact_id, stage=self.name):
+                    job = asyncio.create_task(self.handler(row))
+                    self.running[artifact_id] = job
+                    await asyncio.wait_for(job, timeout=self.timeout)
+                self.stats["done"] += 1
+                await adb.release_lease(artifact_id, self.worker_id)
+            except asyncio.CancelledError:
+                if artifact_id not in self._lease_lost:
+                    raise  # the worker itself is shutting down
+                # Lease lost: the reaper already rescheduled this artifact
+                print(f"⚠️ [{self.name}] Lease lost for {artifact_id}, job cancelled.")
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.stats["timed_out"] += 1
+                    e = f"Timed out after {self.timeout}s in {self.name}"
+                self.stats["failed"] += 1
+                print(f"💥 [{self.name}] Task Failed for {artifact_id}: {e}")
+                try:
+                    # Retry the same stage (an archive failure must not send the artifact back through extraction)
+                    status = await adb.handle_artifact_failure(
+                        artifact_id, str(e), retry_status=PIPELINE_STAGES[self.name][0]
+                    )
+                    if status == "FAILED" and self.on_terminal:
+                        await self.on_terminal(artifact_id, status)
+                except Exception as db_err:
+                    print(f"[{self.name}] ⚠️ Could not record failure: {db_err}")
+            finally:
+                self.running.pop(artifact_id, None)
+                self._lease_lost.discard(artifact_id)
+                self.queue.task_done()
+
+    async def stop(self):
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+class StageExecutor:
+    """
+    One StagePool per pipeline stage, with backpressure: a stage only accepts
+    new work while it has queue room and its downstream stage is keeping up.
+    """
+    def __init__(self, handlers, worker_id, concurrency=None, queue_depth=None, timeouts=None,
+                 backlog_limit=STAGE_BACKLOG_LIMIT, lease_seconds=LEASE_SECONDS, on_terminal=None):
+        """`on_terminal(artifact_id, status)` is awaited when a failure kills an artifact."""
+        concurrency = concurrency or parse_stage_map(
+            os.getenv("STAGE_CONCURRENCY"), DEFAULT_STAGE_CONCURRENCY, int, "concurrency")
+        queue_depth = queue_depth or parse_stage_map(
+            os.getenv("STAGE_QUEUE_DEPTH"), DEFAULT_STAGE_QUEUE_DEPTH, int, "queue depth")
+        timeouts = timeouts or parse_stage_map(
+            os.getenv("STAGE_TIMEOUT"), DEFAULT_STAGE_TIMEOUT, float, "timeout")
+        self.worker_id = worker_id
+        self.backlog_limit = backlog_limit
+        self.lease_seconds = lease_seconds
+        self.pools = {
+            stage: StagePool(stage, handler, max(1, concurrency[stage]), max(1, queue_depth[stage]),
+                             timeouts[stage], worker_id, on_terminal)
+            for stage, handler in handlers.items()
+        }
+        self._heartbeat = None
+
+    def start(self):
+        for pool in self.pools.values():
+            pool.start()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        """Renews every lease this process holds, in one UPDATE per beat."""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            held = {aid: pool for pool in self.pools.values() for aid in pool.held_ids()}
+            if not held:
+                continue
+            try:
+                renewed = set(await adb.renew_leases(list(held), self.worker_id, self.lease_seconds))
+            except Exception as e:
+                print(f"[Executor] ⚠️ Heartbeat failed: {e}")
+                continue
+            for aid, pool in held.items():
+                if aid not in renewed:
+                    pool.cancel(aid)
+
+    def capacity(self, stage, counts=None):
+        """How many more artifacts `stage` can accept right now (0 = apply backpressure)."""
+        pool = self.pools.get(stage)
+        if not pool:
+            return 0
+        downstream = DOWNSTREAM_STAGE.get(stage)
+        if downstream:
+            if downstream in self.pools and self.pools[downstream].saturated():
+                return 0
+            if counts is not None:
+                backlog = counts.get(PIPELINE_STAGES[downstream][0], 0)
+                if backlog >= self.backlog_limit:
+                    return 0
+        return pool.free_slots()
+
+    def has_capacity(self):
+        return any(self.capacity(stage) > 0 for stage in self.pools)
+
+    async def submit(self, stage, row):
+        pool = self.pools[stage]
+        pool.queued_ids.add(row["id"])
+        await pool.queue.put(row)
+
+    def snapshot(self):
+        return {
+            stage: {
+                "queued": pool.queue.qsize(),
+                "active": pool.active,
+                "concurrency": pool.concurrency,
+                **pool.stats
+            }
+            for stage, pool in self.pools.items()
+        }
+
+    async def stop(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        await asyncio.gather(*(pool.stop() for pool in self.pools.values()))
@@ -0,0 +1,289 @@
+import os
+import re
+import json
+import html as html_lib
+from urllib.parse import urljoin
+from modules.sites import site_key
+
+# Deterministic metadata extraction from what museums already embed in their pages:
+# schema.org JSON-LD / microdata, Dublin Core and OpenGraph <meta>, and IIIF manifests.
+# Produces the keys save_draft_tool expects, so a good page never reaches the LLM.
+
+DC_FIELDS = ["title", "accession_number", "creator", "subject", "spatial", "temporal", "desc"]
+STRUCTURED_MIN_FIELDS = int(os.getenv("STRUCTURED_MIN_FIELDS", "3"))   # Fields besides title needed to skip the LLM
+
+# schema.org property -> Dublin Core key (first match wins)
+SCHEMA_PROPERTIES = {
+    "title": ["name", "headline", "alternateName"],
+    "accession_number": ["identifier", "sku", "accessionNumber", "productID"],
+    "creator": ["creator", "author", "artist", "producer", "manufacturer"],
+    "subject": ["artform", "genre", "additionalType", "about", "keywords", "category"],
+    "spatial": ["locationCreated", "contentLocation", "spatialCoverage", "countryOfOrigin"],
+    "temporal": ["dateCreated", "temporalCoverage", "temporal", "dateIssued"],
+    "desc": ["description", "abstract", "disambiguatingDescription"],
+}
+SCHEMA_IMAGE_PROPERTIES = ["image", "associatedMedia", "thumbnailUrl"]
+
+# <meta name/property> -> Dublin Core key (lower-cased, in priority order)
+META_NAMES = {
+    "title": ["dc.title", "dcterms.title", "og:title", "twitter:title"],
+    "accession_number": ["dc.identifier", "dcterms.identifier"],
+    "creator": ["dc.creator", "dcterms.creator", "author"],
+    "subject": ["dc.subject", "dcterms.subject", "dc.type", "dcterms.type"],
+    "spatial": ["dcterms.spatial", "dc.coverage", "dcterms.coverage"],
+    "temporal": ["dcterms.temporal", "dcterms.created", "dc.date", "dcterms.date"],
+    "desc": ["dc.description", "dcterms.description", "og:description", "description", "twitter:description"],
+}
+META_IMAGE_NAMES = ["og:image", "og:image:url", "og:image:secure_url", "twitter:image"]
+
+# Catalogue field labels (IIIF metadata, label/value tables) -> Dublin Core key
+FIELD_LABELS = [
+    ("accession_number", re.compile(r"\b(accession|object|inventory|catalogue|catalog|registration|museum)\s*(no|number|num|id)\b|^identifier$|^id$", re.I)),
+    ("title", re.compile(r"^(title|name|object name)$", re.I)),
+    ("creator", re.compile(r"\b(creator|artist|maker|author|made by|production person)\b", re.I)),
+    ("temporal", re.compile(r"\b(date|dated|period|era|production date|century)\b", re.I)),
+    ("spatial", re.compile(r"\b(place|origin|geography|country|region|location|findspot|culture)\b", re.I)),
+    ("subject", re.compile(r"\b(object type|classification|category|type|subject|medium|materials?)\b", re.I)),
+    ("desc", re.compile(r"\b(description|summary|notes|curatorial comment)\b", re.I)),
+]
+
+_TAGS = re.compile(r"<[^>]+>")
+
+def clean_value(value):
+    """Collapses whitespace, strips markup/entities; None for empty values."""
+    if value is None:
+        return None
+    text = " ".join(html_lib.unescape(_TAGS.sub(" ", str(value))).split())
+    return text or None
+
+def label_field(label):
+    """The Dublin Core key a catalogue label (e.g. 'Object number') maps to, or None."""
+    label = clean_value(label) or ""
+    label = label.rstrip(":").strip()
+    for field, pattern in FIELD_LABELS:
+        if pattern.search(label):
+            return field
+    return None
+
+def _as_text(value):
+    """Flattens schema.org values (strings, lists, nested Things) to one string."""
+    if isinstance(value, list):
+        parts = [_as_text(v) for v in value]
+        return ", ".join(p for p in parts if p) or None
+    if isinstance(value, dict):
+        for key in ("name", "@value", "value", "text", "description"):
+            if value.get(key):
+                return _as_text(value[key])
+        address = value.get("address")
+        return _as_text(address) if address else None
+    return clean_value(value)
+
+def _image_urls(value, base_url):
+    if isinstance(value, list):
+        return [u for v in value for u in _image_urls(v, base_url)]
+    if isinstance(value, dict):
+        url = value.get("contentUrl") or value.get("url") or value.get("@id")
+        return [urljoin(base_url, url)] if isinstance(url, str) else []
+    if isinstance(value, str) and value.strip():
+        return [urljoin(base_url, value.strip())]
+    return []
+
+def _json_ld_items(parsed):
+    items = []
+    for node in parsed.tree.css('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(node.text(deep=True) or "")
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            item = stack.pop(0)
+            if not isinstance(item, dict):
+                continue
+            if "@graph" in item:
+                stack.extend(item["@graph"] if isinstance(item["@graph"], list) else [item["@graph"]])
+            items.append(item)
+    return items
+
+def _is_page_chrome(item):
+    """WebSite/Organization/BreadcrumbList blocks describe the museum site, not the object."""
+    types = item.get("@type", [])
+    types = types if isinstance(types, list) else [types]
+    return bool(types) and all(t in ("WebSite", "WebPage", "Organization", "Museum", "BreadcrumbList",
+                                     "SearchAction", "ItemList", "ImageObject") for t in types)
+
+def from_json_ld(parsed):
+    found, media = {}, []
+    for item in _json_ld_items(parsed):
+        if _is_page_chrome(item):
+            continue
+        for field, props in SCHEMA_PROPERTIES.items():
+            if field in found:
+                continue
+            for prop in props:
+                value = _as_text(item.get(prop))
+                if value:
+                    found[field] = value
+                    break
+        for prop in SCHEMA_IMAGE_PROPERTIES:
+            media += _image_urls(item.get(prop), parsed.url)
+    return found, media
+
+def from_microdata(parsed):
+    found, media = {}, []
+    props = {}
+    for node in parsed.tree.css("[itemscope] [itemprop]"):
+        name = node.attributes.get("itemprop")
+        if not name:
+            continue
+        attrs = node.attributes
+        if name in SCHEMA_IMAGE_PROPERTIES:
+            src = attrs.get("src") or attrs.get("href") or attrs.get("content")
+            if src:
+                media.append(urljoin(parsed.url, src))
+            continue
+        value = clean_value(attrs.get("content") or attrs.get("datetime") or node.text(deep=True))
+        if value:
+            props.setdefault(name, value)
+    for field, names in SCHEMA_PROPERTIES.items():
+        for name in names:
+            if props.get(name):
+                found[field] = props[name]
+                break
+    return found, media
+
+def from_meta(parsed):
+    found, media = {}, []
+    meta = {}
+    for node in parsed.tree.css("meta"):
+        attrs = node.attributes
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        content = attrs.get("content")
+        if not name or not content:
+            continue
+        if name in META_IMAGE_NAMES:
+            media.append(urljoin(parsed.url, content.strip()))
+        meta.setdefault(name, clean_value(content))
+    for field, names in META_NAMES.items():
+        for name in names:
+            if meta.get(name):
+                found[field] = meta[name]
+                break
+    return found, media
+
+def find_iiif_manifest(parsed):
+    """URL of the page's IIIF manifest, if it advertises one."""
+    for node in parsed.tree.css("link[href], a[href], [data-manifest], [data-iiif-manifest]"):
+        attrs = node.attributes
+        href = attrs.get("data-iiif-manifest") or attrs.get("data-manifest") or attrs.get("href") or ""
+        rel = (attrs.get("rel") or "").lower()
+        kind = (attrs.get("type") or "").lower()
+        if "manifest" in href.lower() and ("iiif" in href.lower() or "iiif" in kind or rel == "alternate" or "data-manifest" in attrs):
+            return urljoin(parsed.url, href)
+        if "iiif" in kind and "json" in kind and href:
+            return urljoin(parsed.url, href)
+    return None
+
+def _iiif_text(value):
+    """IIIF v2 strings/lists/@value objects and v3 language maps -> text."""
+    if isinstance(value, dict) and "@value" not in value:
+        value = value.get("en") or value.get("none") or next(iter(value.values()), None)
+    if isinstance(value, list):
+        parts = [_iiif_text(v) for v in value]
+        return "; ".join(p for p in parts if p) or None
+    if isinstance(value, dict):
+        return clean_value(value.get("@value"))
+    return clean_value(value)
+
+def from_iiif_manifest(manifest, base_url):
+    found, media = {}, []
+    if not isinstance(manifest, dict):
+        return found, media
+    title = _iiif_text(manifest.get("label"))
+    if title:
+        found["title"] = title
+    desc = _iiif_text(manifest.get("summary") or manifest.get("description"))
+    if desc:
+        found["desc"] = desc
+    for entry in manifest.get("metadata") or []:
+        if not isinstance(entry, dict):
+            continue
+        field = label_field(_iiif_text(entry.get("label")))
+        value = _iiif_text(entry.get("value"))
+        if field and value:
+            found.setdefault(field, value)
+
+    # v2: sequences -> canvases -> images -> resource ; v3: items (canvases) -> items (pages) -> items (annotations) -> body
+    for sequence in manifest.get("sequences") or []:
+        for canvas in sequence.get("canvases") or []:
+            for image in canvas.get("images") or []:
+                media += _image_urls((image.get("resource") or {}).get("@id"), base_url)
+    for canvas in manifest.get("items") or []:
+        for page in canvas.get("items") or []:
+            for annotation in page.get("items") or []:
+                body = annotation.get("body") or {}
+                media += _image_urls(body.get("id") if isinstance(body, dict) else None, base_url)
+    return found, media
+
+def merge_sources(sources):
+    """Merges (name, found, media) in priority order: first non-empty value per field wins."""
+    data, media, used = {}, [], []
+    for name, found, urls in sources:
+        contributed = False
+        for field in DC_FIELDS:
+            if field not in data and found.get(field):
+                data[field] = found[field]
+                contributed = True
+        for url in urls:
+            if url not in media:
+                media.append(url)
+                contributed = True
+        if contributed:
+            used.append(name)
+    data["media_urls"] = media
+    return data, used
+
+def extract_structured(parsed, manifest=None):
+    """
+    All embedded metadata on `parsed` (a ParsedPage), plus the IIIF manifest if given.
+    Returns (data, sources) with data keyed like save_draft_tool expects.
+    """
+    sources = [("json_ld", *from_json_ld(parsed)), ("microdata", *from_microdata(parsed))]
+    if manifest is not None:
+        sources.append(("iiif", *from_iiif_manifest(manifest, parsed.url)))
+    sources.append(("meta", *from_meta(parsed)))
+    return merge_sources(sources)
+
+def is_sufficient(data, min_fields=STRUCTURED_MIN_FIELDS):
+    """Title, object images and enough other fields that the LLM would add little."""
+    title = data.get("title") or ""
+    if len(title) <= 3 or title.lower() == "unknown" or not data.get("media_urls"):
+        return False
+    return sum(1 for f in DC_FIELDS[1:] if data.get(f)) >= min_fields
+
+def fill_missing(data, structured):
+    """Backfills fields an LLM left empty/"Unknown" from the structured extraction."""
+    for field in DC_FIELDS:
+        if structured.get(field) and (not data.get(field) or data.get(field) == "Unknown"):
+            data[field] = structured[field]
+    if not data.get("media_urls") and structured.get("media_urls"):
+        data["media_urls"] = structured["media_urls"]
+    return data
+
+# --- Per-museum hit rate ---
+
+structured_stats = {}   # domain -> {"pages": n, "hits": n, "partial": n, "json_ld": n, "microdata": n, "iiif": n, "meta": n}
+
+def record_structured(url, sources, hit):
+    entry = structured_stats.setdefault(site_key(url), {"pages": 0, "hits": 0, "partial": 0})
+    entry["pages"] += 1
+    if hit:
+        entry["hits"] += 1
+    elif sources:
+        entry["partial"] += 1
+    for name in sources:
+        entry[name] = entry.get(name, 0) + 1
+
+def get_structured_stats():
+    return {domain: {**s, "hit_rate": round(s["hits"] / s["pages"], 3) if s["pages"] else 0.0}
+            for domain, s in structured_stats.items()}
@@ -0,0 +1,312 @@
+import os
+import re
+import time
+import asyncio
+from urllib.parse import urljoin
+from modules import db_async as adb
+from modules.sites import site_key
+from modules.html_parse import node_text, child_elements, in_noise, MIN_IMG_SRC
+from modules.content import is_boilerplate
+from modules.structured_data import DC_FIELDS, is_sufficient, label_field
+
+# Per-museum extraction templates: selectors learned from successful LLM extractions,
+# confirmed on further pages, then used instead of the LLM for the rest of the museum.
+TEMPLATE_MIN_CONFIRMATIONS = int(os.getenv("TEMPLATE_MIN_CONFIRMATIONS", "3"))  # Pages a rule must agree on before use
+TEMPLATE_MAX_FAILURES = int(os.getenv("TEMPLATE_MAX_FAILURES", "3"))            # Consecutive misses before re-learning
+TEMPLATE_REFRESH_SECONDS = 60   # Re-read templates other workers may have updated
+
+_STABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z_-]*$")   # ids/classes without digits (generated ones change per page)
+_TEMPLATE_FIELDS = DC_FIELDS + ["media_urls"]
+
+# Plausible value lengths; a selector that drifted onto another node tends to land outside them
+FIELD_LENGTH_BOUNDS = {"title": (2, 300), "accession_number": (1, 80), "desc": (10, 20000)}
+DEFAULT_LENGTH_BOUNDS = (1, 500)
+# Identity fields cross-checked against the page's catalogue labels and structured data
+# (free-text fields legitimately differ in wording between sources)
+_CROSS_CHECKED = ("title", "accession_number")
+
+def _norm(value):
+    return " ".join(str(value).lower().split()).strip(" .;:,")
+
+def _has_value(value):
+    return bool(value) and value != "Unknown"
+
+# --- Selector Derivation ---
+
+def css_path(tree, node, unique=True):
+    """
+    A CSS selector for `node`: tag.class steps up to the nearest stable id.
+    With unique=True, :nth-of-type() is added (deepest first) until it selects `node` first.
+    """
+    nodes, steps = [], []
+    current = node
+    while current is not None and current.is_element_node and current.tag not in ("html", "body"):
+        ident = current.attributes.get("id")
+        if ident and _STABLE_NAME.match(ident):
+            nodes.append(None)
+            steps.append(f"#{ident}")
+            break
+        classes = [c for c in (current.attributes.get("class") or "").split() if _STABLE_NAME.match(c)][:2]
+        nodes.append(current)
+        steps.append(current.tag + "".join("." + c for c in classes))
+        current = current.parent
+    if not steps:
+        return None
+    nodes.reverse()
+    steps.reverse()
+    selector = " > ".join(steps)
+    if not unique:
+        return selector
+
+    for i in range(len(steps) - 1, -1, -1):
+        first = tree.css_first(selector)
+        if first is not None and first.mem_id == node.mem_id:
+            return selector
+        step_node = nodes[i]
+        if step_node is None or step_node.parent is None:
+            continue
+        same_tag = [c for c in child_elements(step_node.parent) if c.tag == step_node.tag]
+        position = next(k for k, c in enumerate(same_tag, 1) if c.mem_id == step_node.mem_id)
+        steps[i] += f":nth-of-type({position})"
+        selector = " > ".join(steps)
+    first = tree.css_first(selector)
+    return selector if first is not None and first.mem_id == node.mem_id else None
+
+def _find_text_node(parsed, value):
+    """Deepest element whose whole text equals `value`."""
+    target = _norm(value)
+    body = parsed.tree.body
+    if body is None or not target:
+        return None
+    for node in body.traverse():
+        if _norm(node_text(node)) != target:
+            continue
+        # Descend while a single child still carries the whole text
+        while True:
+            inner = next((c for c in child_elements(node) if _norm(node_text(c)) == target), None)
+            if inner is None:
+                return node
+            node = inner
+    return None
+
+def derive_rule(parsed, field, value):
+    """A rule that reproduces `value` on this page: a catalogue label if there is one, else a CSS path."""
+    if field == "media_urls":
+        wanted = {u for u in value if isinstance(u, str)}
+        for img in parsed.tree.css("img"):
+            for attr in ("src", "data-src", "data-original"):
+                src = img.attributes.get(attr)
+                if src and urljoin(parsed.url, src) in wanted:
+                    selector = css_path(parsed.tree, img, unique=False)
+                    return {"css": selector, "attr": attr} if selector else None
+        return None
+
+    target = _norm(value)
+    for label, pair_value in parsed.label_pairs():
+        if _norm(pair_value) == target:
+            return {"label": label}
+    node = _find_text_node(parsed, value)
+    selector = css_path(parsed.tree, node) if node is not None else None
+    return {"css": selector} if selector else None
+
+# --- Applying Rules ---
+
+def apply_rule(parsed, field, rule):
+    if field == "media_urls":
+        urls = []
+        for img in parsed.tree.css(rule["css"]):
+            src = img.attributes.get(rule.get("attr", "src"))
+            if src and len(src) > MIN_IMG_SRC:
+                url = urljoin(parsed.url, src)
+                if url not in urls:
+                    urls.append(url)
+        return urls
+    if "label" in rule:
+        wanted = _norm(rule["label"])
+        return next((value for label, value in parsed.label_pairs() if _norm(label) == wanted), None)
+    node = parsed.tree.css_first(rule["css"])
+    return (node_text(node) or None) if node is not None else None
+
+def apply_rules(parsed, rules, min_hits=TEMPLATE_MIN_CONFIRMATIONS):
+    data = {"media_urls": []}
+    for field, rule in rules.items():
+        if rule.get("hits", 0) < min_hits:
+            continue
+        try:
+            value = apply_rule(parsed, field, rule)
+        except Exception:
+            value = None  # Selector no longer valid for this page
+        if value:
+            data[field] = value
+    return data
+
+def _agrees(parsed, field, rule, value):
+    try:
+        found = apply_rule(parsed, field, rule)
+    except Exception:
+        return False
+    if field == "media_urls":
+        return bool(set(found) & set(value))
+    return found is not None and _norm(found) == _norm(value)
+
+def learn_rules(parsed, data, rules):
+    """Confirms rules that reproduce this page's extraction and re-derives those that don't."""
+    rules = {field: dict(rule) for field, rule in rules.items()}
+    for field in _TEMPLATE_FIELDS:
+        value = data.get(field)
+        if not _has_value(value):
+            continue  # No evidence either way on this page
+        existing = rules.get(field)
+        if existing and _agrees(parsed, field, existing, value):
+            existing["hits"] = existing.get("hits", 0) + 1
+            continue
+        fresh = derive_rule(parsed, field, value)
+        if fresh:
+            fresh["hits"] = 1
+            rules[field] = fresh
+        else:
+            rules.pop(field, None)
+    return rules
+
+# --- Validation ---
+
+def _same(a, b):
+    a, b = _norm(a), _norm(b)
+    return bool(a) and bool(b) and (a == b or a in b or b in a)
+
+def _in_chrome(node):
+    """Node sits in navigation or related-object chrome (menus, breadcrumbs, carousels, footers)."""
+    if in_noise(node):
+        return True
+    while node is not None and node.is_element_node and node.tag not in ("html", "body"):
+        if is_boilerplate(node):
+            return True
+        node = node.parent
+    return False
+
+def check_values(parsed, rules, data, structured=None):
+    """
+    Reasons the template's output looks wrong for this page (empty = plausible):
+    values outside length bounds, read from page chrome, or disagreeing with the
+    page's own catalogue labels or embedded structured data.
+    """
+    problems = []
+    labelled = {}
+    for label, value in parsed.label_pairs():
+        field = label_field(label)
+        if field in _CROSS_CHECKED:
+            labelled.setdefault(field, []).append(value)
+
+    for field in DC_FIELDS:
+        value = data.get(field)
+        if not value:
+            continue
+        low, high = FIELD_LENGTH_BOUNDS.get(field, DEFAULT_LENGTH_BOUNDS)
+        if not low <= len(value) <= high:
+            problems.append(f"{field} is {len(value)} chars")
+            continue
+        rule = rules.get(field, {})
+        if "css" in rule:
+            node = parsed.tree.css_first(rule["css"])
+            if node is not None and _in_chrome(node):
+                problems.append(f"{field} read from navigation")
+                continue
+        if field not in _CROSS_CHECKED:
+            continue
+        if "label" not in rule and labelled.get(field) and not any(_same(value, v) for v in labelled[field]):
+            problems.append(f"{field} disagrees with the page's labels")
+        elif structured and structured.get(field) and not _same(value, structured[field]):
+            problems.append(f"{field} disagrees with structured data")
+
+    media_rule = rules.get("media_urls")
+    if data.get("media_urls") and media_rule:
+        if any(_in_chrome(img) for img in parsed.tree.css(media_rule["css"])):
+            problems.append("media_urls include navigation/related-object images")
+    return problems
+
+def is_ready(rules, min_hits=TEMPLATE_MIN_CONFIRMATIONS):
+    """Active once it could on its own produce a draft good enough to skip the LLM."""
+    confirmed = {field for field, rule in rules.items() if rule.get("hits", 0) >= min_hits}
+    sample = {field: "x" * 10 for field in confirmed}
+    sample["media_urls"] = ["x"] if "media_urls" in confirmed else []
+    return is_sufficient(sample)
+
+# --- Store ---
+
+template_stats = {}   # domain -> {"hits": n, "fallbacks": n, "learned": n}
+
+def _stat(domain, key):
+    entry = template_stats.setdefault(domain, {"hits": 0, "fallbacks": 0, "learned": 0})
+    entry[key] += 1
+
+class TemplateStore:
+    """Read-through cache over extraction_templates (refreshed so workers pick up each other's learning)."""
+    def __init__(self, refresh_seconds=TEMPLATE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._cache = {}    # domain -> (template row or None, loaded_at)
+        self._locks = {}    # domain -> asyncio.Lock serializing read-modify-write
+
+    def lock(self, domain):
+        return self._locks.setdefault(domain, asyncio.Lock())
+
+    async def get(self, domain, fresh=False):
+        cached = self._cache.get(domain)
+        if cached and not fresh and time.monotonic() - cached[1] < self.refresh_seconds:
+            return cached[0]
+        row = await adb.get_extraction_template(domain)
+        template = dict(row) if row else None
+        self._cache[domain] = (template, time.monotonic())
+        return template
+
+    async def save(self, domain, rules, status, pages_learned, failures=0):
+        await adb.save_extraction_template(domain, rules, status, pages_learned, failures)
+        self._cache[domain] = ({"domain": domain, "rules": rules, "status": status,
+                                "pages_learned": pages_learned, "failures": failures}, time.monotonic())
+
+template_store = TemplateStore()
+
+async def extract_with_template(url, parsed, structured=None):
+    """
+    Draft from the museum's ACTIVE template, or None (no template, or it failed validation).
+    Output that is complete but implausible (see check_values) counts as a failure.
+    """
+    domain = site_key(url)
+    template = await template_store.get(domain)
+    if not template or template["status"] != "ACTIVE":
+        return None
+
+    data = apply_rules(parsed, template["rules"])
+    ok = is_sufficient(data)
+    if ok:
+        problems = check_values(parsed, template["rules"], data, structured)
+        if problems:
+            print(f"[Templates] ⚠️ {domain} template output rejected for {url}: {'; '.join(problems)}")
+            ok = False
+    failures = await adb.record_template_use(domain, ok)
+    if ok:
+        _stat(domain, "hits")
+        return data
+
+    _stat(domain, "fallbacks")
+    if failures >= TEMPLATE_MAX_FAILURES:
+        # Layout changed: go back to learning from LLM extractions
+        async with template_store.lock(domain):
+            print(f"[Templates] ⚠️ {domain} template failed {failures}x in a row. Re-learning.")
+            await template_store.save(domain, template["rules"], "LEARNING", template["pages_learned"], failures)
+    return None
+
+async def learn_template(url, parsed, data):
+    """Feeds a successful LLM extraction into the museum's template."""
+    domain = site_key(url)
+    async with template_store.lock(domain):
+        template = await template_store.get(domain, fresh=True)
+        rules = learn_rules(parsed, data, template["rules"] if template else {})
+        pages = (template["pages_learned"] if template else 0) + 1
+        status = "ACTIVE" if is_ready(rules) else "LEARNING"
+        if status == "ACTIVE" and (not template or template["status"] != "ACTIVE"):
+            print(f"[Templates] 🧩 {domain} template active after {pages} pages ({', '.join(sorted(rules))}).")
+        await template_store.save(domain, rules, status, pages)
+    _stat(domain, "learned")
+
+def get_template_stats():
+    return dict(template_stats)
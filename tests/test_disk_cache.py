@@ -0,0 +1,79 @@
+import os
+import itertools
+import pytest
+from modules import disk_cache
+from modules.disk_cache import DiskCache
+
+BODY_SIZE = 1000   # Random bytes barely compress, so each entry is ~1 KB on disk
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing timestamps, so access order never ties
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(disk_cache.time, "time", lambda: float(next(ticks)))
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    c = DiskCache(str(tmp_path), max_bytes=int(BODY_SIZE * 2.5))
+    yield c
+    c.close()
+
+def body():
+    return os.urandom(BODY_SIZE)
+
+def test_round_trip_with_meta(cache):
+    cache.put("page", "<html>Mask</html>", meta={"etag": '"abc"'})
+    data, meta, age = cache.get("page")
+    assert data == b"<html>Mask</html>"
+    assert meta == {"etag": '"abc"'}
+    assert age >= 0
+    assert cache.get("missing") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+def test_evicts_least_recently_stored(cache):
+    cache.put("a", body())
+    cache.put("b", body())
+    cache.put("c", body())
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.snapshot()["bytes"] <= cache.max_bytes
+
+def test_get_refreshes_lru_position(cache):
+    cache.put("a", body())
+    cache.put("b", body())
+    cache.get("a")                     # "b" is now the least recently used
+    cache.put("c", body())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+def test_touch_refreshes_lru_position_and_merges_meta(cache):
+    cache.put("a", body(), meta={"etag": "1", "rendered": True})
+    cache.put("b", body())
+    cache.touch("a", meta={"etag": "2"})
+    cache.put("c", body())
+    assert cache.get("b") is None
+    _, meta, _ = cache.get("a")
+    assert meta == {"etag": "2", "rendered": True}
+
+def test_evicted_body_files_are_removed(cache, tmp_path):
+    for key in "abcd":
+        cache.put(key, body())
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".gz")]
+    assert len(files) == cache.snapshot()["entries"] == 2
+
+def test_lost_body_file_counts_as_miss(cache, tmp_path):
+    cache.put("a", body())
+    for name in os.listdir(tmp_path):
+        if name.endswith(".gz"):
+            os.remove(tmp_path / name)
+    assert cache.get("a") is None
+    assert cache.snapshot()["entries"] == 0
+
+def test_index_survives_reopen(tmp_path, clock):
+    first = DiskCache(str(tmp_path), max_bytes=10_000)
+    first.put("a", b"kept")
+    first.close()
+    second = DiskCache(str(tmp_path), max_bytes=10_000)
+    assert second.get("a")[0] == b"kept"
+    second.close()
@@ -0,0 +1,63 @@
+import pytest
+from modules.llm_output import JsonStream, ArtifactRecord, CoordinatorDecision, extract_json, parse_model
+
+def feed_all(chunks):
+    stream = JsonStream()
+    for chunk in chunks:
+        stream.feed(chunk)
+    return stream
+
+def test_object_members_split_across_chunks():
+    stream = feed_all(['{"tit', 'le": "Gelede ', 'Mask", "acc', 'ession_number": "Af1', '923,01"', '}'])
+    assert stream.done
+    assert stream.value() == {"title": "Gelede Mask", "accession_number": "Af1923,01"}
+
+def test_member_available_before_document_closes():
+    stream = feed_all(['{"title": "Mask", ', '"creator": "Yoruba"', ', "desc": "long text still stream'])
+    assert not stream.done
+    assert stream.has(["title", "creator"])
+    assert not stream.has(["desc"])
+    assert stream.value() == {"title": "Mask", "creator": "Yoruba"}
+
+def test_nested_values_and_escaped_quotes_do_not_split_members():
+    stream = feed_all(['{"desc": "a \\"quoted\\", word", "media_urls": ["a", ', '"b"], "title": "x"}'])
+    assert stream.value() == {"desc": 'a "quoted", word', "media_urls": ["a", "b"], "title": "x"}
+
+def test_array_items_decoded_one_by_one():
+    stream = feed_all(['[{"page_id": "1"}, {"page_', 'id": "2"}'])
+    assert stream.kind == "array"
+    assert stream.items == [{"page_id": "1"}]
+    stream.feed("]")
+    assert stream.done and stream.value() == [{"page_id": "1"}, {"page_id": "2"}]
+
+def test_text_after_the_document_is_ignored():
+    stream = feed_all(['{"a": 1}', ' trailing {"b": 2}'])
+    assert stream.value() == {"a": 1}
+
+def test_malformed_member_is_counted_and_skipped():
+    stream = feed_all(['{"a": 1, "b": nope, "c": 3}'])
+    assert stream.malformed == 1
+    assert stream.members == {"a": 1, "c": 3}
+
+def test_value_is_none_before_the_document_starts():
+    assert JsonStream().feed("Here is the record: ").value() is None
+
+def test_extract_json_skips_fences_and_prose():
+    text = 'Sure!\n```json\n{"action": "SLEEP", "reasoning": "queues empty"}\n```'
+    assert extract_json(text) == {"action": "SLEEP", "reasoning": "queues empty"}
+
+def test_extract_json_incomplete_document():
+    assert extract_json('{"title": "Mask"') is None
+    assert extract_json(None) is None
+
+def test_parse_model_validates_and_joins_lists():
+    record = parse_model(ArtifactRecord, '{"title": "Mask", "creator": ["A", "B"], "temporal": 1890}')
+    assert record.creator == "A; B"
+    assert record.temporal == "1890"
+    assert record.to_dict() == {"title": "Mask", "creator": "A; B", "temporal": "1890", "media_urls": []}
+
+def test_parse_model_rejects_missing_or_mismatched_json():
+    with pytest.raises(ValueError, match="no JSON"):
+        parse_model(CoordinatorDecision, "SLEEP")
+    with pytest.raises(ValueError, match="CoordinatorDecision"):
+        parse_model(CoordinatorDecision, '{"action": "DANCE"}')
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from email.utils import formatdate
+import pytest
+from modules import rate_limit
+from modules.rate_limit import DomainBucket, RateLimiter, parse_retry_after, RATE_LIMIT_MIN_FACTOR
+
+# --- parse_retry_after ---
+
+@pytest.mark.parametrize("value, expected", [("120", 120.0), (" 7.5 ", 7.5), (30, 30.0), ("-5", 0.0)])
+def test_retry_after_delta_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+def test_retry_after_http_date():
+    delay = parse_retry_after(formatdate(time.time() + 90, usegmt=True))
+    assert 85 <= delay <= 90
+
+def test_retry_after_date_in_the_past_is_zero():
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+@pytest.mark.parametrize("value", [None, "", "soon", "Mon, 99 Foo"])
+def test_retry_after_unusable(value):
+    assert parse_retry_after(value) is None
+
+# --- DomainBucket ---
+
+def test_bucket_burst_then_spaced_slots():
+    bucket = DomainBucket(rate=0.5, burst=2)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == pytest.approx(2.0)   # One token every 2s
+    assert bucket.reserve(now) == pytest.approx(4.0)   # Callers queue up instead of racing
+
+def test_bucket_refills_up_to_burst():
+    bucket = DomainBucket(rate=1.0, burst=2)
+    now = bucket.updated
+    bucket.reserve(now)
+    bucket.reserve(now)
+    assert bucket.reserve(now + 1.0) == 0.0            # One token back after 1s
+    bucket.reserve(now + 100.0)
+    assert bucket.tokens == pytest.approx(1.0)         # Idle time never banks more than `burst`
+
+def test_bucket_reserve_cost():
+    bucket = DomainBucket(rate=100.0, burst=1000)      # Token-per-minute style bucket
+    now = bucket.updated
+    assert bucket.reserve(now, cost=1000) == 0.0
+    assert bucket.reserve(now, cost=500) == pytest.approx(5.0)
+
+def test_bucket_pause_pushes_back_every_slot():
+    bucket = DomainBucket(rate=1.0, burst=1)
+    now = bucket.updated
+    bucket.pause(now, 10)
+    assert bucket.reserve(now) == pytest.approx(11.0)
+    assert bucket.reserve(now) == pytest.approx(12.0)
+
+# --- RateLimiter feedback ---
+
+URL = "https://collections.example.org/object/1"
+
+def _bucket(limiter):
+    return next(iter(limiter._buckets.values()))
+
+def test_throttle_halves_rate_and_honours_retry_after():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    limiter.feedback(URL, 429, retry_after="30")
+    bucket = _bucket(limiter)
+    assert bucket.rate == 0.5
+    assert bucket.reserve(bucket.updated) == pytest.approx(32.0)   # 30s pause, then one 2s slot
+    assert limiter.snapshot()["collections.example.org"]["throttled"] == 1
+
+def test_throttle_without_retry_after_waits_one_slot():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    limiter.feedback(URL, 503)
+    bucket = _bucket(limiter)
+    assert bucket.reserve(bucket.updated) == pytest.approx(4.0)    # 1/rate pause, then one slot at 0.5/s
+
+def test_throttle_rate_floor_and_recovery():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    for _ in range(10):
+        limiter.feedback(URL, 429, retry_after="0")
+    bucket = _bucket(limiter)
+    assert bucket.rate == RATE_LIMIT_MIN_FACTOR
+    for _ in range(100):
+        limiter.feedback(URL, 200)
+    assert bucket.rate == 1.0                                      # Restored, never above base
+
+def test_client_errors_leave_rate_alone():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    limiter.feedback(URL, 429, retry_after="0")
+    limiter.feedback(URL, 404)
+    assert _bucket(limiter).rate == 0.5
+
+def test_acquire_sleeps_for_reserved_slot(monkeypatch):
+    slept = []
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(rate=0.5, burst=1)
+
+    async def run():
+        await limiter.acquire(URL)
+        await limiter.acquire(URL)
+    asyncio.run(run())
+    assert len(slept) == 1 and slept[0] == pytest.approx(2.0, abs=0.05)
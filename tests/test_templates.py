@@ -0,0 +1,91 @@
+from modules.html_parse import ParsedPage
+from modules.templates import (
+    check_values, apply_rules, learn_rules, derive_rule, is_ready, TEMPLATE_MIN_CONFIRMATIONS
+)
+
+def page(title="Gelede Mask", acc="Af1923,01", date="1890"):
+    return ParsedPage(f"https://museum.example.org/object/{acc}", f"""<html><body>
+    <nav class="breadcrumb"><ol><li><a href="/">Home</a></li><li><a href="/c">Collection</a></li></ol></nav>
+    <main>
+      <h1 class="object-title">{title}</h1>
+      <dl><dt>Museum number</dt><dd>{acc}</dd><dt>Production date</dt><dd>{date}</dd></dl>
+      <p><strong>Culture:</strong> Yoruba</p>
+      <p class="object-desc">A carved wooden mask, used in ceremonies honouring mothers.</p>
+      <div class="object-images"><img src="/media/objects/{acc}-large.jpg"></div>
+    </main>
+    <aside class="related"><img src="/media/objects/other-object.jpg"></aside>
+    </body></html>""")
+
+def record(title="Gelede Mask", acc="Af1923,01", date="1890"):
+    return {
+        "title": title, "accession_number": acc, "temporal": date, "spatial": "Yoruba",
+        "desc": "A carved wooden mask, used in ceremonies honouring mothers.",
+        "media_urls": [f"https://museum.example.org/media/objects/{acc}-large.jpg"],
+    }
+
+def learned(pages=TEMPLATE_MIN_CONFIRMATIONS):
+    rules = {}
+    for i in range(pages):
+        acc, title = f"Af1923,0{i}", f"Mask {i}"
+        rules = learn_rules(page(title, acc), record(title, acc), rules)
+    return rules
+
+def test_label_pairs():
+    pairs = dict(page().label_pairs())
+    assert pairs["Museum number"] == "Af1923,01"
+    assert pairs["Production date"] == "1890"
+    assert pairs["Culture"] == "Yoruba"
+
+def test_derive_rule_prefers_labels_then_css():
+    p = page()
+    assert derive_rule(p, "accession_number", "Af1923,01") == {"label": "Museum number"}
+    assert derive_rule(p, "title", "Gelede Mask") == {"css": "main > h1.object-title"}
+    assert derive_rule(p, "media_urls", record()["media_urls"]) == {
+        "css": "main > div.object-images > img", "attr": "src"}
+    assert derive_rule(p, "creator", "Nobody") is None
+
+def test_rules_confirmed_across_pages_become_ready():
+    rules = learned(TEMPLATE_MIN_CONFIRMATIONS - 1)
+    assert not is_ready(rules)
+    rules = learned()
+    assert all(rule["hits"] == TEMPLATE_MIN_CONFIRMATIONS for rule in rules.values())
+    assert is_ready(rules)
+
+def test_rule_that_disagrees_is_rederived():
+    rules = learned()
+    # The LLM found a different title on this page: the old rule restarts its confirmations
+    rules = learn_rules(page(), {**record(), "title": "Collection"}, rules)
+    assert rules["title"]["hits"] == 1
+
+def test_apply_rules_reproduces_a_new_page():
+    rules = learned()
+    data = apply_rules(page("Ancestor Figure", "Af1950,07", "1920"), rules)
+    assert data["title"] == "Ancestor Figure"
+    assert data["accession_number"] == "Af1950,07"
+    assert data["temporal"] == "1920"
+    assert data["media_urls"] == ["https://museum.example.org/media/objects/Af1950,07-large.jpg"]
+
+def test_check_values_accepts_plausible_output():
+    rules = learned()
+    p = page("Ancestor Figure", "Af1950,07")
+    structured = {"title": "Ancestor Figure | Example Museum", "accession_number": "Af1950,07"}
+    assert check_values(p, rules, apply_rules(p, rules), structured) == []
+
+def test_check_values_rejects_selector_drift_onto_navigation():
+    rules = {**learned(), "title": {"css": "nav.breadcrumb > ol > li > a", "hits": 3}}
+    p = page()
+    data = apply_rules(p, rules)
+    assert data["title"] == "Home"
+    assert "title read from navigation" in check_values(p, rules, data)
+
+def test_check_values_rejects_related_object_images():
+    rules = {**learned(), "media_urls": {"css": "img", "attr": "src", "hits": 3}}
+    p = page()
+    assert check_values(p, rules, apply_rules(p, rules)) == ["media_urls include navigation/related-object images"]
+
+def test_check_values_cross_checks_identity_fields():
+    rules = learned()
+    p = page()
+    data = apply_rules(p, rules)
+    assert check_values(p, rules, data, {"title": "Ancestor Figure"}) == ["title disagrees with structured data"]
+    assert check_values(p, rules, {**data, "title": "x" * 400}) == ["title is 400 chars"]